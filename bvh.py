@@ -0,0 +1,485 @@
+from typing import Callable, Dict, Tuple
+import numpy as np
+
+from primitives import FaceCollection
+from shared_mesh import SharedMeshHandle, get_attached
+
+
+DEFAULT_LEAF_SIZE = 8
+# Number of rays traced at once. Bounds memory of (ray, node) pairs
+DEFAULT_RAY_CHUNK = 1 << 12
+# 1 + 2*gamma(3), where gamma(n) bounds relative rounding error of n
+# floating point operations
+_SLAB_ROUNDING = 1 + 2 * (3*2.0**-53) / (1 - 3*2.0**-53)
+# Crossings decided by Moller-Trumbore: barycentric coordinates of the hit
+# differ from 0 by more than _EDGE_MARGIN and the ray is not closer to
+# parallel with the face than _PARALLEL_COSINE. Errors of the coordinates
+# are well below the margin for such pairs
+_EDGE_MARGIN = 1e-7
+_PARALLEL_COSINE = 1e-6
+
+
+def _spread_bits(values: np.ndarray) -> np.ndarray:
+    '''Inserts two zero bits before each of the lower 10 bits'''
+    v = values.astype(np.uint32) & 0x3ff
+    v = (v | (v << 16)) & 0x030000ff
+    v = (v | (v << 8)) & 0x0300f00f
+    v = (v | (v << 4)) & 0x030c30c3
+    v = (v | (v << 2)) & 0x09249249
+    return v
+
+
+def _cross(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    '''Row-wise cross product of (N, 3) arrays, faster than np.cross for
+    many short vectors'''
+    return np.stack((a[:, 1]*b[:, 2] - a[:, 2]*b[:, 1],
+                     a[:, 2]*b[:, 0] - a[:, 0]*b[:, 2],
+                     a[:, 0]*b[:, 1] - a[:, 1]*b[:, 0]), axis=1)
+
+
+def _dot(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    return a[:, 0]*b[:, 0] + a[:, 1]*b[:, 1] + a[:, 2]*b[:, 2]
+
+
+def morton_codes(points: np.ndarray) -> np.ndarray:
+    '''30 bit Morton codes of points quantized inside their bounding box'''
+    lo = points.min(axis=0)
+    extent = np.maximum(points.max(axis=0) - lo, 1e-300)
+    cells = np.clip((points - lo) / extent * 1023, 0, 1023)
+    return (_spread_bits(cells[:, 0]) << 2 | _spread_bits(cells[:, 1]) << 1 |
+            _spread_bits(cells[:, 2]))
+
+
+class BVH:
+    '''Bounding volume hierarchy over triangles of a mesh.
+    Triangles are sorted along Morton curve and grouped into leaves of
+    leaf_size consecutive triangles. Leaves form the bottom level of a
+    complete binary tree stored in heap order (children of node i are 2i+1
+    and 2i+2), so the tree is built and traversed level by level with array
+    operations. Leaves are padded to a power of two with empty ones, which
+    have inverted bounds and are never hit'''
+    def __init__(self, vertices: np.ndarray, faces: np.ndarray,
+                 leaf_size: int = DEFAULT_LEAF_SIZE) -> None:
+        if leaf_size <= 0:
+            raise ValueError(f"leaf_size is {leaf_size}, "
+                             "but should be larger than 0.")
+        self.vertices = np.asarray(vertices, dtype=np.float64).reshape(-1, 3)
+        self.faces = np.asarray(faces, dtype=np.int64).reshape(-1, 3)
+        self.leaf_size = leaf_size
+        triangles = self.vertices[self.faces]
+        # corner and edges of every face used by intersection tests
+        self._corner = triangles[:, 0]
+        self._edge1 = triangles[:, 1] - triangles[:, 0]
+        self._edge2 = triangles[:, 2] - triangles[:, 0]
+        self._normal_norm = np.linalg.norm(_cross(self._edge1, self._edge2),
+                                           axis=1)
+        self.face_min = triangles.min(axis=1)
+        self.face_max = triangles.max(axis=1)
+        leaf_num = max(-(-len(self.faces) // leaf_size), 1)
+        self.depth = int(np.ceil(np.log2(leaf_num)))
+        self.leaf_num = 1 << self.depth
+        slots = self.leaf_num * leaf_size
+        self.leaf_faces = np.full(slots, -1, dtype=np.int64)
+        tri_min = np.full((slots, 3), np.inf)
+        tri_max = np.full((slots, 3), -np.inf)
+        if len(self.faces):
+            order = np.argsort(morton_codes(triangles.mean(axis=1)),
+                               kind='stable')
+            self.leaf_faces[:len(order)] = order
+            tri_min[:len(order)] = self.face_min[order]
+            tri_max[:len(order)] = self.face_max[order]
+        self.leaf_faces = self.leaf_faces.reshape(self.leaf_num, leaf_size)
+        node_num = 2*self.leaf_num - 1
+        self.node_min = np.empty((node_num, 3))
+        self.node_max = np.empty((node_num, 3))
+        first_leaf = self.leaf_num - 1
+        self.node_min[first_leaf:] = tri_min.reshape(
+                self.leaf_num, leaf_size, 3).min(axis=1)
+        self.node_max[first_leaf:] = tri_max.reshape(
+                self.leaf_num, leaf_size, 3).max(axis=1)
+        for level in reversed(range(self.depth)):
+            nodes = np.arange(2**level - 1, 2**(level + 1) - 1)
+            self.node_min[nodes] = np.minimum(self.node_min[2*nodes + 1],
+                                              self.node_min[2*nodes + 2])
+            self.node_max[nodes] = np.maximum(self.node_max[2*nodes + 1],
+                                              self.node_max[2*nodes + 2])
+
+    @classmethod
+    def from_collection(cls, collection: FaceCollection,
+                        leaf_size: int = DEFAULT_LEAF_SIZE) -> 'BVH':
+        '''Builds hierarchy over the collection with applied queued
+        transformations. Face ids are row numbers of get_face_array'''
+        return cls(collection.get_transformed_vertex_array(),
+                   collection.get_face_array(), leaf_size)
+
+    @property
+    def bounds(self) -> Tuple[np.ndarray, np.ndarray]:
+        '''Minimal and maximal corners of the whole mesh'''
+        return self.node_min[0], self.node_max[0]
+
+    def face_normals(self, faces: np.ndarray) -> np.ndarray:
+        '''Unit normals of the given faces oriented by the right hand rule'''
+        normals = _cross(self._edge1[faces], self._edge2[faces])
+        return normals / np.linalg.norm(normals, axis=1, keepdims=True)
+
+    def traverse_leaves(self, overlaps: Callable[[np.ndarray, np.ndarray],
+                                                 np.ndarray],
+                        query_num: int) -> Tuple[np.ndarray, np.ndarray]:
+        '''Descends the tree for query_num queries at once. overlaps(queries,
+        nodes) receives equal length arrays of query and node ids and returns
+        mask of pairs whose node may contain something relevant for the
+        query. Returns (queries, leaves) pairs for all reached leaves'''
+        queries = np.arange(query_num)
+        nodes = np.zeros(query_num, dtype=np.int64)
+        for _ in range(self.depth):
+            mask = overlaps(queries, nodes)
+            queries, nodes = queries[mask], nodes[mask]
+            queries = np.repeat(queries, 2)
+            nodes = np.stack((2*nodes + 1, 2*nodes + 2), axis=1).reshape(-1)
+        mask = overlaps(queries, nodes)
+        return queries[mask], nodes[mask] - (self.leaf_num - 1)
+
+    def _leaf_pairs(self, queries: np.ndarray, leaves: np.ndarray
+                    ) -> Tuple[np.ndarray, np.ndarray]:
+        '''Expands (query, leaf) pairs into (query, face) pairs'''
+        faces = self.leaf_faces[leaves].reshape(-1)
+        queries = np.repeat(queries, self.leaf_size)
+        valid = faces >= 0
+        return queries[valid], faces[valid]
+
+    def traverse(self, overlaps: Callable[[np.ndarray, np.ndarray],
+                                          np.ndarray],
+                 query_num: int) -> Tuple[np.ndarray, np.ndarray]:
+        '''Same as traverse_leaves, but returns (queries, faces) pairs for
+        all triangles in reached leaves'''
+        return self._leaf_pairs(*self.traverse_leaves(overlaps, query_num))
+
+    def overlapping_faces(self, box_min: np.ndarray, box_max: np.ndarray
+                          ) -> Tuple[np.ndarray, np.ndarray]:
+        '''Finds faces whose bounding boxes overlap the given boxes.
+        box_min and box_max are (3,) or (Q, 3) arrays of box corners.
+        Returns (boxes, faces) arrays of overlapping pairs'''
+        box_min = np.asarray(box_min, dtype=np.float64).reshape(-1, 3)
+        box_max = np.asarray(box_max, dtype=np.float64).reshape(-1, 3)
+
+        def overlaps(boxes: np.ndarray, nodes: np.ndarray) -> np.ndarray:
+            return (np.all(self.node_min[nodes] <= box_max[boxes], axis=1) &
+                    np.all(self.node_max[nodes] >= box_min[boxes], axis=1))
+        boxes, faces = self.traverse(overlaps, len(box_min))
+        keep = (np.all(self.face_min[faces] <= box_max[boxes], axis=1) &
+                np.all(self.face_max[faces] >= box_min[boxes], axis=1))
+        return boxes[keep], faces[keep]
+
+    def overlapping_face_pairs(self, other: 'BVH'
+                               ) -> Tuple[np.ndarray, np.ndarray]:
+        '''Finds pairs of faces of this and the other hierarchy whose
+        bounding boxes overlap. Leaves of the other tree are queried against
+        this tree, so only faces of overlapping leaves are paired. Returns
+        (faces, other_faces) arrays'''
+        leaves = np.flatnonzero(other.leaf_faces[:, 0] >= 0)
+        nodes = leaves + other.leaf_num - 1
+        boxes, faces = self.overlapping_faces(other.node_min[nodes],
+                                              other.node_max[nodes])
+        other_faces = other.leaf_faces[leaves[boxes]].reshape(-1)
+        faces = np.repeat(faces, other.leaf_size)
+        valid = other_faces >= 0
+        faces, other_faces = faces[valid], other_faces[valid]
+        keep = (np.all(self.face_min[faces] <= other.face_max[other_faces],
+                       axis=1) &
+                np.all(self.face_max[faces] >= other.face_min[other_faces],
+                       axis=1))
+        return faces[keep], other_faces[keep]
+
+    def _ray_overlaps(self, origins: np.ndarray, inv_dirs: np.ndarray,
+                      t_max: np.ndarray):
+        has_parallel = np.isinf(inv_dirs).any()
+
+        def overlaps(rays: np.ndarray, nodes: np.ndarray) -> np.ndarray:
+            o, inv = origins[rays], inv_dirs[rays]
+            box_min, box_max = self.node_min[nodes], self.node_max[nodes]
+            with np.errstate(over='ignore', invalid='ignore'):
+                t1 = (box_min - o) * inv
+                t2 = (box_max - o) * inv
+            lo, hi = np.minimum(t1, t2), np.maximum(t1, t2)
+            if has_parallel:
+                # rays parallel to a slab overlap it entirely or not at all
+                parallel = np.isinf(inv)
+                inside = (box_min <= o) & (o <= box_max)
+                lo = np.where(parallel, np.where(inside, -np.inf, np.inf), lo)
+                hi = np.where(parallel, np.inf, hi)
+            near = np.maximum(np.maximum(lo[:, 0], lo[:, 1]),
+                              np.maximum(lo[:, 2], 0))
+            # far distance is enlarged by the bound of rounding errors, so
+            # boxes touched by rays at their boundary are not lost (robust
+            # slab test of Ize)
+            far = np.minimum(np.minimum(hi[:, 0], hi[:, 1]),
+                             hi[:, 2]) * _SLAB_ROUNDING
+            return (near <= far) & (near <= t_max[rays])
+        return overlaps
+
+    def _candidates(self, origins: np.ndarray, directions: np.ndarray,
+                    t_max: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        with np.errstate(divide='ignore'):
+            inv_dirs = 1 / directions
+        return self.traverse(self._ray_overlaps(origins, inv_dirs, t_max),
+                             len(origins))
+
+    def _barycentrics(self, origins: np.ndarray, directions: np.ndarray,
+                      rays: np.ndarray, faces: np.ndarray
+                      ) -> Tuple[np.ndarray, np.ndarray, np.ndarray,
+                                 np.ndarray]:
+        '''Moller-Trumbore coordinates of (ray, face) pairs: barycentric
+        coordinates u and v of the hit point, its distance t along the ray
+        (in units of direction length) and the determinant of the system'''
+        e1, e2 = self._edge1[faces], self._edge2[faces]
+        d = directions[rays]
+        p = _cross(d, e2)
+        det = _dot(e1, p)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            inv_det = 1 / det
+            s = origins[rays] - self._corner[faces]
+            u = _dot(s, p) * inv_det
+            q = _cross(s, e1)
+            v = _dot(d, q) * inv_det
+            t = _dot(e2, q) * inv_det
+        return u, v, t, det
+
+    def _hit_distances(self, origins: np.ndarray, directions: np.ndarray,
+                       rays: np.ndarray, faces: np.ndarray) -> np.ndarray:
+        '''Moller-Trumbore test for (ray, face) pairs. Returns distances
+        along the rays (in units of direction length), inf for misses'''
+        u, v, t, det = self._barycentrics(origins, directions, rays, faces)
+        with np.errstate(invalid='ignore'):
+            hit = ((np.abs(det) > 1e-300) & (u >= 0) & (v >= 0) &
+                   (u + v <= 1) & (t > 0))
+        return np.where(hit, t, np.inf)
+
+    def _crosses(self, origins: np.ndarray, directions: np.ndarray,
+                 rays: np.ndarray, faces: np.ndarray) -> np.ndarray:
+        '''Checks which (ray, face) pairs cross, a ray through an edge or a
+        vertex crosses exactly one of the faces covering it on every sheet of
+        the surface. Moller-Trumbore decides pairs far from edges of faces
+        not parallel to rays, the rest is decided by _crosses_exactly'''
+        u, v, t, det = self._barycentrics(origins, directions, rays, faces)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            w = 1 - u - v
+            # cosines of angles between rays and face normals
+            cos = np.abs(det) / (self._normal_norm[faces] * np.linalg.norm(
+                    directions, axis=1)[rays])
+            hit = (u > _EDGE_MARGIN) & (v > _EDGE_MARGIN) & (w > _EDGE_MARGIN)
+            miss = (u < -_EDGE_MARGIN) | (v < -_EDGE_MARGIN) | \
+                (w < -_EDGE_MARGIN)
+            unsure = ~(hit | miss) | ~(cos > _PARALLEL_COSINE)
+        result = hit & (t > 0)
+        result[unsure] = self._crosses_exactly(origins, directions,
+                                               rays[unsure], faces[unsure])
+        return result
+
+    def _crosses_exactly(self, origins: np.ndarray, directions: np.ndarray,
+                         rays: np.ndarray, faces: np.ndarray) -> np.ndarray:
+        '''Watertight test for (ray, face) pairs. Faces are projected along
+        the rays onto planes through ray origins. Every edge is evaluated
+        as the cross product of its projected ends, which gives exactly
+        opposite values in faces sharing the edge, and rays through edges or
+        vertices are assigned to one face by the top-left rule as in
+        voxelize. Projections use only per-coordinate operations, so shared
+        vertices are projected to identical points'''
+        d = directions[rays]
+        triangles = self.vertices[self.faces[faces]] - origins[rays][:, None]
+        # axes of the projection plane, perpendicular to the ray
+        axis = np.zeros_like(d)
+        axis[np.arange(len(d)), np.argmin(np.abs(d), axis=1)] = 1
+        u = _cross(d, axis)
+        v = _cross(d, u)
+        x, y = (sum(triangles[..., i] * w[:, None, i] for i in range(3))
+                for w in (u, v))
+        nx, ny = np.roll(x, -1, axis=1), np.roll(y, -1, axis=1)
+        # values are positive for edges passing the origin counterclockwise
+        values = x*ny - y*nx
+        area = np.sign(values.sum(axis=1))[:, None]
+        values *= area
+        dx, dy = (nx - x) * area, (ny - y) * area
+        top_left = (dy > 0) | ((dy == 0) & (dx < 0))
+        inside = (area[:, 0] != 0) & np.all(
+                (values > 0) | ((values == 0) & top_left), axis=1)
+        normal = _cross(triangles[:, 1] - triangles[:, 0],
+                        triangles[:, 2] - triangles[:, 0])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t = _dot(normal, triangles[:, 0]) / _dot(normal, d)
+        return inside & (t > 0)
+
+    def intersect(self, origins: np.ndarray, directions: np.ndarray,
+                  t_max: float = np.inf,
+                  chunk_size: int = DEFAULT_RAY_CHUNK
+                  ) -> Tuple[np.ndarray, np.ndarray]:
+        '''Finds the closest hit of every ray with the mesh. Both sides of
+        faces are hit. Returns (t, face): hit point is origin + t*direction,
+        face is -1 and t is inf for rays which miss the mesh'''
+        origins = np.asarray(origins, dtype=np.float64).reshape(-1, 3)
+        directions = np.asarray(directions, dtype=np.float64).reshape(-1, 3)
+        t = np.full(len(origins), np.inf)
+        face = np.full(len(origins), -1, dtype=np.int64)
+        for start in range(0, len(origins), chunk_size):
+            o = origins[start:start + chunk_size]
+            d = directions[start:start + chunk_size]
+            limit = np.full(len(o), t_max, dtype=np.float64)
+            rays, faces = self._candidates(o, d, limit)
+            hits = self._hit_distances(o, d, rays, faces)
+            keep = np.isfinite(hits) & (hits <= t_max)
+            rays, faces, hits = rays[keep], faces[keep], hits[keep]
+            order = np.lexsort((hits, rays))
+            rays, faces, hits = rays[order], faces[order], hits[order]
+            first = np.ones(len(rays), dtype=bool)
+            first[1:] = rays[1:] != rays[:-1]
+            t[start + rays[first]] = hits[first]
+            face[start + rays[first]] = faces[first]
+        return t, face
+
+    def count_crossings(self, origins: np.ndarray, directions: np.ndarray,
+                        chunk_size: int = DEFAULT_RAY_CHUNK) -> np.ndarray:
+        '''Number of faces crossed by every ray. A ray through an edge or a
+        vertex shared by faces crosses only one of them, see _crosses'''
+        origins = np.asarray(origins, dtype=np.float64).reshape(-1, 3)
+        directions = np.broadcast_to(np.asarray(directions, dtype=np.float64),
+                                     origins.shape)
+        counts = np.zeros(len(origins), dtype=np.int64)
+        for start in range(0, len(origins), chunk_size):
+            o = origins[start:start + chunk_size]
+            d = directions[start:start + chunk_size]
+            rays, faces = self._candidates(o, d, np.full(len(o), np.inf))
+            hits = self._crosses(o, d, rays, faces)
+            counts[start:start + len(o)] = np.bincount(rays[hits],
+                                                       minlength=len(o))
+        return counts
+
+    def _near_distances(self, points: np.ndarray,
+                        nodes: np.ndarray) -> np.ndarray:
+        '''Squared distances from points to boxes of nodes (pairwise), inf
+        for empty nodes'''
+        lo, hi = self.node_min[nodes], self.node_max[nodes]
+        with np.errstate(invalid='ignore'):
+            near = np.maximum(np.maximum(lo - points, points - hi), 0)
+        return _dot(near, near)
+
+    def _distance_bound(self, points: np.ndarray) -> np.ndarray:
+        '''Upper bound of squared distance from every point to the mesh.
+        Every point descends into the closer child down to a leaf, the bound
+        is the distance to the closest face of this leaf'''
+        nodes = np.zeros(len(points), dtype=np.int64)
+        for _ in range(self.depth):
+            left = 2*nodes + 1
+            closer = (self._near_distances(points, left) <=
+                      self._near_distances(points, left + 1))
+            nodes = np.where(closer, left, left + 1)
+        queries, faces = self._leaf_pairs(np.arange(len(points)),
+                                          nodes - (self.leaf_num - 1))
+        diff = points[queries] - self._closest_on_faces(points[queries], faces)
+        bound = np.full(len(points), np.inf)
+        np.minimum.at(bound, queries, _dot(diff, diff))
+        return bound
+
+    def _closest_on_faces(self, points: np.ndarray, faces: np.ndarray
+                          ) -> np.ndarray:
+        '''Closest points of faces to the given points (pairwise)'''
+        a, e1, e2 = self._corner[faces], self._edge1[faces], self._edge2[faces]
+        normal = _cross(e1, e2)
+        norm2 = _dot(normal, normal)
+        w = points - a
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # barycentric coordinates of the projection onto face plane
+            u = _dot(_cross(w, e2), normal) / norm2
+            v = _dot(_cross(e1, w), normal) / norm2
+        inside = (norm2 > 0) & (u >= 0) & (v >= 0) & (u + v <= 1)
+        result = a + u[:, None] * e1 + v[:, None] * e2
+        best = np.full(len(points), np.inf)
+        best[inside] = 0
+        for start, edge in ((a, e1), (a, e2), (a + e1, e2 - e1)):
+            length2 = _dot(edge, edge)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                t = np.clip(_dot(points - start, edge) / length2, 0, 1)
+            t = np.where(length2 > 0, t, 0)
+            candidate = start + t[:, None] * edge
+            diff = points - candidate
+            dist = _dot(diff, diff)
+            better = ~inside & (dist < best)
+            best[better] = dist[better]
+            result[better] = candidate[better]
+        return result
+
+    def closest_points(self, points: np.ndarray,
+                       chunk_size: int = DEFAULT_RAY_CHUNK
+                       ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        '''Finds the closest point of the mesh for every point. Returns
+        (distances, closest points, faces).
+        Leaves reached by every point are visited in the order of their
+        distance in rounds of growing size, leaves farther than the closest
+        face found so far are skipped'''
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        distances = np.full(len(points), np.inf)
+        closest = np.full((len(points), 3), np.nan)
+        face = np.full(len(points), -1, dtype=np.int64)
+        if not len(self.faces):
+            return distances, closest, face
+        for start in range(0, len(points), chunk_size):
+            p = points[start:start + chunk_size]
+            rows = slice(start, start + len(p))
+            # slightly enlarged, so that the face giving the bound is kept
+            best = self._distance_bound(p) * (1 + 1e-9) + 1e-300
+
+            def overlaps(queries: np.ndarray, nodes: np.ndarray):
+                return self._near_distances(p[queries], nodes) <= \
+                    best[queries]
+            queries, leaves = self.traverse_leaves(overlaps, len(p))
+            near = self._near_distances(p[queries],
+                                        leaves + self.leaf_num - 1)
+            order = np.lexsort((near, queries))
+            queries, leaves, near = queries[order], leaves[order], near[order]
+            first = np.searchsorted(queries, queries)
+            rank = np.arange(len(queries)) - first
+            best[:] = np.inf
+            lo = 0
+            while True:
+                hi = 2*lo + 1
+                selected = (rank >= lo) & (rank < hi)
+                selected[selected] &= near[selected] <= best[queries[selected]]
+                if not selected.any():
+                    break
+                self._update_closest(p, *self._leaf_pairs(queries[selected],
+                                                          leaves[selected]),
+                                     best, closest[rows], face[rows])
+                lo = hi
+            distances[rows] = np.sqrt(best)
+        return distances, closest, face
+
+    def _update_closest(self, points: np.ndarray, queries: np.ndarray,
+                        faces: np.ndarray, best: np.ndarray,
+                        closest: np.ndarray, face: np.ndarray) -> None:
+        '''Replaces best squared distances, closest points and faces of
+        queries when some of the given faces is closer'''
+        candidates = self._closest_on_faces(points[queries], faces)
+        diff = points[queries] - candidates
+        dist = _dot(diff, diff)
+        order = np.lexsort((dist, queries))
+        queries = queries[order]
+        first = np.ones(len(queries), dtype=bool)
+        first[1:] = queries[1:] != queries[:-1]
+        winners = order[first]
+        queries = queries[first]
+        better = dist[winners] < best[queries]
+        queries, winners = queries[better], winners[better]
+        best[queries] = dist[winners]
+        closest[queries] = candidates[winners]
+        face[queries] = faces[winners]
+
+
+_shared_bvh: Dict[str, BVH] = {}
+
+
+def shared_bvh(handle: SharedMeshHandle) -> BVH:
+    '''BVH over the mesh published in shared memory, built once in every
+    process and reused by later calls with the same handle'''
+    bvh = _shared_bvh.get(handle.name)
+    if bvh is None:
+        mesh = get_attached(handle)
+        bvh = _shared_bvh[handle.name] = BVH(mesh.vertices, mesh.faces)
+    return bvh
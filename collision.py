@@ -0,0 +1,95 @@
+from typing import List, NamedTuple, Sequence, Tuple
+import numpy as np
+
+from bvh import BVH, _cross, _dot
+
+
+class Contact(NamedTuple):
+    '''Pair of intersecting meshes (first < second) and their intersecting
+    faces. faces[i] of the first mesh intersects other_faces[i] of the
+    second one'''
+    first: int
+    second: int
+    faces: np.ndarray
+    other_faces: np.ndarray
+
+
+def sweep_and_prune(box_min: np.ndarray, box_max: np.ndarray) -> np.ndarray:
+    '''Finds all pairs of overlapping axis aligned boxes given by (N, 3)
+    arrays of corners. Boxes are sorted by their minimum along the axis with
+    the largest spread, every box is paired only with following boxes which
+    start before it ends, remaining axes are checked for these candidates.
+    Returns (P, 2) array of index pairs (i < j) in lexicographic order'''
+    box_min = np.asarray(box_min, dtype=np.float64).reshape(-1, 3)
+    box_max = np.asarray(box_max, dtype=np.float64).reshape(-1, 3)
+    if not len(box_min):
+        return np.empty((0, 2), dtype=np.int64)
+    axis = int(np.argmax(np.var(box_min + box_max, axis=0)))
+    order = np.argsort(box_min[:, axis], kind='stable')
+    starts = box_min[order, axis]
+    ends = np.searchsorted(starts, box_max[order, axis], side='right')
+    counts = np.maximum(ends - np.arange(len(order)) - 1, 0)
+    first = np.repeat(np.arange(len(order)), counts)
+    second = first + 1 + np.arange(counts.sum()) - np.repeat(
+            np.cumsum(counts) - counts, counts)
+    a, b = order[first], order[second]
+    keep = (np.all(box_min[a] <= box_max[b], axis=1) &
+            np.all(box_min[b] <= box_max[a], axis=1))
+    pairs = np.sort(np.stack((a[keep], b[keep]), axis=1), axis=1)
+    return pairs[np.lexsort((pairs[:, 1], pairs[:, 0]))]
+
+
+def _segments_cross(starts: np.ndarray, ends: np.ndarray,
+                    triangles: np.ndarray) -> np.ndarray:
+    '''Checks which segments cross triangles (pairwise), touching counts'''
+    corner = triangles[:, 0]
+    e1 = triangles[:, 1] - corner
+    e2 = triangles[:, 2] - corner
+    d = ends - starts
+    p = _cross(d, e2)
+    det = _dot(e1, p)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        inv_det = 1 / det
+        s = starts - corner
+        u = _dot(s, p) * inv_det
+        q = _cross(s, e1)
+        v = _dot(d, q) * inv_det
+        t = _dot(e2, q) * inv_det
+        return ((np.abs(det) > 1e-300) & (u >= 0) & (v >= 0) &
+                (u + v <= 1) & (t >= 0) & (t <= 1))
+
+
+def triangles_intersect(first: np.ndarray, second: np.ndarray) -> np.ndarray:
+    '''Checks which triangles of (P, 3, 3) arrays intersect (pairwise).
+    Non coplanar triangles intersect exactly when an edge of one of them
+    crosses the other one. Coplanar overlaps are not reported'''
+    result = np.zeros(len(first), dtype=bool)
+    for a, b in ((first, second), (second, first)):
+        for i in range(3):
+            result |= _segments_cross(a[:, i], a[:, (i + 1) % 3], b)
+    return result
+
+
+def intersecting_faces(first: BVH, second: BVH
+                       ) -> Tuple[np.ndarray, np.ndarray]:
+    '''Narrow phase: pairs faces of two meshes by traversing the first
+    hierarchy with leaves of the second one and tests only faces with
+    overlapping bounds exactly. Returns (faces, other_faces) arrays'''
+    faces, other_faces = first.overlapping_face_pairs(second)
+    hit = triangles_intersect(first.vertices[first.faces[faces]],
+                              second.vertices[second.faces[other_faces]])
+    return faces[hit], other_faces[hit]
+
+
+def find_contacts(meshes: Sequence[BVH]) -> List[Contact]:
+    '''Finds intersecting pairs of meshes and their intersecting faces.
+    Candidate pairs come from sweep and prune over mesh bounds, only they
+    get to the narrow phase'''
+    box_min = np.array([m.bounds[0] for m in meshes]).reshape(-1, 3)
+    box_max = np.array([m.bounds[1] for m in meshes]).reshape(-1, 3)
+    contacts = []
+    for i, j in sweep_and_prune(box_min, box_max):
+        faces, other_faces = intersecting_faces(meshes[i], meshes[j])
+        if len(faces):
+            contacts.append(Contact(int(i), int(j), faces, other_faces))
+    return contacts
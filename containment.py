@@ -0,0 +1,102 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+import numpy as np
+
+from primitives import FaceCollection
+from shared_mesh import SharedMesh, SharedMeshHandle, get_attached
+from bvh import BVH, DEFAULT_RAY_CHUNK, shared_bvh, _cross, _dot
+
+
+# Direction of rays deciding whether a point is inside. Rays through edges
+# and vertices are counted once by BVH.count_crossings, the direction is
+# not parallel to coordinate planes, so it is rarely parallel to faces
+INSIDE_RAY = np.array([0.8660254037844386, 0.4112612, 0.2846049])
+
+# Number of (point, face) pairs evaluated at once by winding_numbers
+DEFAULT_WINDING_CHUNK = 1 << 18
+
+_METHODS = ('parity', 'winding')
+
+
+def winding_numbers(vertices: np.ndarray, faces: np.ndarray,
+                    points: np.ndarray,
+                    chunk_size: int = DEFAULT_WINDING_CHUNK) -> np.ndarray:
+    '''Generalized winding numbers of points: sums of signed solid angles of
+    faces seen from the points divided by 4 pi. They are close to 1 inside
+    closed outward oriented surfaces and to 0 outside, and degrade
+    gracefully for surfaces with holes. Costs O(points * faces), evaluated
+    in chunks of at most chunk_size pairs'''
+    triangles = np.asarray(vertices, dtype=np.float64)[faces]
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    result = np.zeros(len(points))
+    step = max(1, chunk_size // max(len(triangles), 1))
+    for start in range(0, len(points), step):
+        p = points[start:start + step]
+        # (points, faces, corners, coords) vectors from points to corners
+        v = triangles[None] - p[:, None, None]
+        a, b, c = (v[:, :, i].reshape(-1, 3) for i in range(3))
+        la, lb, lc = (np.linalg.norm(x, axis=1) for x in (a, b, c))
+        numerator = _dot(a, _cross(b, c))
+        denominator = (la*lb*lc + _dot(a, b)*lc + _dot(b, c)*la +
+                       _dot(c, a)*lb)
+        angles = 2*np.arctan2(numerator, denominator)
+        result[start:start + len(p)] = angles.reshape(len(p), -1).sum(
+                axis=1) / (4*np.pi)
+    return result
+
+
+def _contains(vertices: np.ndarray, faces: np.ndarray, points: np.ndarray,
+              method: str, bvh: Optional[BVH]) -> np.ndarray:
+    if method == 'winding':
+        return winding_numbers(vertices, faces, points) > 0.5
+    if bvh is None:
+        bvh = BVH(vertices, faces)
+    return bvh.count_crossings(points, INSIDE_RAY) % 2 == 1
+
+
+def _contains_shared(handle: SharedMeshHandle, points: np.ndarray,
+                     method: str) -> np.ndarray:
+    mesh = get_attached(handle)
+    bvh = shared_bvh(handle) if method == 'parity' else None
+    return _contains(mesh.vertices, mesh.faces, points, method, bvh)
+
+
+def contains(scene, points: np.ndarray, method: str = 'parity',
+             chunk_size: int = DEFAULT_RAY_CHUNK,
+             max_workers: Optional[int] = 1) -> np.ndarray:
+    '''Checks which points are inside the closed surface of the scene
+    (Object, FaceCollection with applied queued transformations or BVH).
+    method='parity' counts crossings of a ray from every point with the BVH,
+    method='winding' thresholds generalized winding numbers, which is slower
+    but tolerates small holes and open seams. Points are processed in chunks
+    of chunk_size. With max_workers other than 1 the chunks are distributed
+    over a pool of processes (all cores for None), which get the mesh
+    through shared memory'''
+    if method not in _METHODS:
+        raise ValueError(f"method is {method}, but should be one of "
+                         f"{list(_METHODS)}.")
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    if isinstance(scene, BVH):
+        bvh, vertices, faces = scene, scene.vertices, scene.faces
+    else:
+        collection: FaceCollection = getattr(scene, 'description', scene)
+        bvh = None
+        vertices = collection.get_transformed_vertex_array()
+        faces = collection.get_face_array()
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    chunks = [points[start:start + chunk_size]
+              for start in range(0, len(points), chunk_size)]
+    if max_workers == 1 or len(chunks) < 2:
+        if method == 'parity' and bvh is None:
+            bvh = BVH(vertices, faces)
+        results = [_contains(vertices, faces, chunk, method, bvh)
+                   for chunk in chunks]
+    else:
+        with SharedMesh(vertices, faces) as shared, \
+                ProcessPoolExecutor(max_workers) as pool:
+            results = list(pool.map(
+                    _contains_shared, [shared.handle] * len(chunks), chunks,
+                    [method] * len(chunks)))
+    return np.concatenate(results) if results else np.zeros(0, dtype=bool)
@@ -0,0 +1,196 @@
+import heapq
+from typing import Optional, Tuple
+import numpy as np
+
+from primitives import FaceCollection
+
+
+# Weight of quadrics which keep boundary edges in place. Boundary vertices
+# can still slide along the boundary, but leaving it becomes expensive.
+BOUNDARY_WEIGHT = 1e3
+
+
+def _planes(normals: np.ndarray, points: np.ndarray) -> np.ndarray:
+    '''Returns (N, 4, 4) quadrics of planes given by unit normals and points
+    on them'''
+    offsets = -np.einsum('ij,ij->i', normals, points)
+    p = np.concatenate((normals, offsets[:, None]), axis=1)
+    return p[:, :, None] * p[:, None, :]
+
+
+def _unit(vectors: np.ndarray) -> np.ndarray:
+    lengths = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return np.divide(vectors, lengths, out=np.zeros_like(vectors),
+                     where=lengths > 0)
+
+
+def _vertex_quadrics(vertices: np.ndarray, faces: np.ndarray,
+                     boundary: np.ndarray) -> np.ndarray:
+    '''Sums quadrics of planes of incident faces for every vertex. boundary
+    is (B, 3) array of boundary edges (start, end, face)'''
+    tri = vertices[faces]
+    normals = _unit(np.cross(tri[:, 1] - tri[:, 0], tri[:, 2] - tri[:, 0]))
+    face_quadrics = _planes(normals, tri[:, 0])
+    quadrics = np.zeros((len(vertices), 4, 4))
+    for k in range(3):
+        np.add.at(quadrics, faces[:, k], face_quadrics)
+    if len(boundary):
+        start, end = vertices[boundary[:, 0]], vertices[boundary[:, 1]]
+        side = _unit(np.cross(end - start, normals[boundary[:, 2]]))
+        side_quadrics = BOUNDARY_WEIGHT * _planes(side, start)
+        np.add.at(quadrics, boundary[:, 0], side_quadrics)
+        np.add.at(quadrics, boundary[:, 1], side_quadrics)
+    return quadrics
+
+
+def _collapse_targets(quadrics: np.ndarray, lhs: np.ndarray,
+                      rhs: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    '''For every edge with endpoint positions lhs and rhs and summed quadric
+    returns (cost, position) of the best point to collapse the edge into.
+    Candidates are the quadric minimum (if it is well defined), both
+    endpoints and the middle of the edge'''
+    candidates = [lhs, rhs, (lhs + rhs) / 2]
+    a = quadrics[:, :3, :3]
+    b = -quadrics[:, :3, 3]
+    solvable = np.abs(np.linalg.det(a)) > 1e-12 * np.abs(a).sum(axis=(1, 2))**3
+    optimal = candidates[2].copy()
+    if np.any(solvable):
+        optimal[solvable] = np.linalg.solve(a[solvable],
+                                            b[solvable][:, :, None])[:, :, 0]
+    candidates.append(optimal)
+    points = np.stack(candidates, axis=1)
+    homogeneous = np.concatenate((points, np.ones(points.shape[:2] + (1,))),
+                                 axis=2)
+    costs = np.einsum('ekj,eij,eki->ek', homogeneous, quadrics, homogeneous)
+    costs[~solvable, 3] = np.inf
+    best = np.argmin(costs, axis=1)
+    rows = np.arange(len(best))
+    return np.maximum(costs[rows, best], 0), points[rows, best]
+
+
+class _CollapseEngine:
+    '''Greedy edge collapse in the order of increasing quadric error.
+    Heap entries are invalidated lazily with per-vertex versions'''
+    def __init__(self, vertices: np.ndarray, faces: np.ndarray,
+                 boundary: np.ndarray) -> None:
+        self.positions = vertices.copy()
+        self.faces = faces.copy()
+        self.quadrics = _vertex_quadrics(vertices, faces, boundary)
+        self.face_alive = np.ones(len(faces), dtype=bool)
+        self.face_num = len(faces)
+        self.version = np.zeros(len(vertices), dtype=np.int64)
+        self.vertex_faces = [set() for _ in range(len(vertices))]
+        for f, face in enumerate(faces.tolist()):
+            for v in face:
+                self.vertex_faces[v].add(f)
+        self.heap = []
+
+    def _neighbours(self, v: int) -> set:
+        result = set(self.faces[list(self.vertex_faces[v])].reshape(-1))
+        result.discard(v)
+        return result
+
+    def push_edges(self, lhs: np.ndarray, rhs: np.ndarray) -> None:
+        if not len(lhs):
+            return
+        costs, targets = _collapse_targets(
+                self.quadrics[lhs] + self.quadrics[rhs],
+                self.positions[lhs], self.positions[rhs])
+        for cost, i, j, target in zip(costs.tolist(), lhs.tolist(),
+                                      rhs.tolist(), targets.tolist()):
+            heapq.heappush(self.heap, (cost, i, j, int(self.version[i]),
+                                       int(self.version[j]), target))
+
+    def _folds(self, i: int, j: int, target: np.ndarray,
+               changed: list) -> bool:
+        '''Checks whether moving i and j into target flips any face'''
+        if not changed:
+            return False
+        faces = self.faces[changed]
+        tri = self.positions[faces]
+        moved = tri.copy()
+        moved[(faces == i) | (faces == j)] = target
+        before = np.cross(tri[:, 1] - tri[:, 0], tri[:, 2] - tri[:, 0])
+        after = np.cross(moved[:, 1] - moved[:, 0], moved[:, 2] - moved[:, 0])
+        return bool(np.any(np.einsum('ij,ij->i', before, after) <= 0))
+
+    def collapse(self, i: int, j: int, target: list) -> bool:
+        '''Moves vertex i into target and merges vertex j into it. Returns
+        False if the collapse would break manifoldness or fold faces'''
+        shared = self.vertex_faces[i] & self.vertex_faces[j]
+        if not shared:
+            return False
+        common = self._neighbours(i) & self._neighbours(j)
+        if len(common) != len(shared):
+            return False
+        target = np.array(target)
+        changed = list((self.vertex_faces[i] | self.vertex_faces[j]) - shared)
+        if self._folds(i, j, target, changed):
+            return False
+        for f in shared:
+            self.face_alive[f] = False
+            for v in self.faces[f].tolist():
+                self.vertex_faces[v].discard(f)
+        self.face_num -= len(shared)
+        for f in self.vertex_faces[j]:
+            self.faces[f][self.faces[f] == j] = i
+            self.vertex_faces[i].add(f)
+        self.vertex_faces[j] = set()
+        self.positions[i] = target
+        self.quadrics[i] += self.quadrics[j]
+        self.version[i] += 1
+        self.version[j] += 1
+        neighbours = np.array(sorted(self._neighbours(i)), dtype=np.int64)
+        self.push_edges(np.full(len(neighbours), i), neighbours)
+        return True
+
+    def run(self, target_faces: int, max_error: Optional[float]) -> None:
+        limit = np.inf if max_error is None else max_error**2
+        while self.face_num > target_faces and self.heap:
+            cost, i, j, version_i, version_j, target = heapq.heappop(self.heap)
+            if (self.version[i] != version_i or
+                    self.version[j] != version_j):
+                continue
+            if cost > limit:
+                break
+            self.collapse(i, j, target)
+
+    def result(self) -> Tuple[np.ndarray, np.ndarray]:
+        '''Returns vertices used by the alive faces and the faces
+        renumbered accordingly'''
+        used, faces = np.unique(self.faces[self.face_alive],
+                                return_inverse=True)
+        return self.positions[used], faces.reshape(-1, 3)
+
+
+def decimate(collection: FaceCollection, target_faces: int = None,
+             max_error: float = None) -> FaceCollection:
+    '''Simplifies the collection with quadric error metric edge collapses.
+    Edges are collapsed in the order of increasing error until the number of
+    faces drops to target_faces or the error of the cheapest collapse
+    exceeds max_error. Error is the square root of the sum of squared
+    distances from the new vertex to the planes of the original faces around
+    it. When neither limit is given, the number of faces is halved.
+    Collapses which would fold faces over or break manifoldness are skipped,
+    boundaries of open surfaces are preserved. Queued transformations are
+    copied to the result'''
+    if target_faces is None:
+        target_faces = 0 if max_error is not None else len(collection.faces)//2
+    if target_faces < 0:
+        raise ValueError(f"target_faces is {target_faces}, "
+                         "but should not be negative.")
+    vertices = collection.get_vertex_array().astype(np.float64)
+    faces = collection.get_face_array()
+    adjacency = collection.get_adjacency()
+    half_edges = adjacency.boundary_half_edges()
+    boundary = np.stack((adjacency.half_edge_start[half_edges],
+                         adjacency.half_edge_end[half_edges],
+                         half_edges // 3), axis=1)
+    engine = _CollapseEngine(vertices, faces, boundary)
+    engine.push_edges(adjacency.edges[:, 0], adjacency.edges[:, 1])
+    engine.run(target_faces, max_error)
+    result = FaceCollection.from_arrays(*engine.result(),
+                                        precision=collection.precision)
+    result.moves = dict(collection.moves)
+    result.rotations = dict(collection.rotations)
+    return result
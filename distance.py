@@ -0,0 +1,83 @@
+from typing import NamedTuple, Optional
+import numpy as np
+
+from primitives import FaceCollection
+from bvh import BVH, DEFAULT_RAY_CHUNK
+from containment import contains
+
+
+class ClosestPoints(NamedTuple):
+    '''Distances to the mesh, closest points of the mesh and faces (row
+    numbers of get_face_array) they belong to'''
+    distances: np.ndarray
+    points: np.ndarray
+    faces: np.ndarray
+
+
+def _as_bvh(scene) -> BVH:
+    '''Accepts BVH, Object or FaceCollection'''
+    if isinstance(scene, BVH):
+        return scene
+    collection: FaceCollection = getattr(scene, 'description', scene)
+    return BVH.from_collection(collection)
+
+
+def closest_points(scene, points: np.ndarray,
+                   chunk_size: int = DEFAULT_RAY_CHUNK) -> ClosestPoints:
+    '''Finds the closest point of the scene surface for every point. scene
+    is an Object, a FaceCollection (with applied queued transformations) or
+    BVH built for one of them, which is reused between calls'''
+    return ClosestPoints(*_as_bvh(scene).closest_points(points, chunk_size))
+
+
+def signed_distance(scene, points: np.ndarray,
+                    chunk_size: int = DEFAULT_RAY_CHUNK) -> np.ndarray:
+    '''Distances from points to the closed surface of the scene, negative
+    inside'''
+    bvh = _as_bvh(scene)
+    distances = bvh.closest_points(points, chunk_size)[0]
+    inside = contains(bvh, points, chunk_size=chunk_size)
+    return np.where(inside, -distances, distances)
+
+
+class SDFGrid(NamedTuple):
+    '''Signed distances sampled in nodes of a regular grid. Node (i, j, k)
+    is at origin + spacing*(i, j, k)'''
+    values: np.ndarray
+    origin: np.ndarray
+    spacing: float
+
+    def __call__(self, points: np.ndarray) -> np.ndarray:
+        '''Trilinear interpolation of the distance in points. Points outside
+        the grid get values of the closest border cell extrapolated
+        linearly'''
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        scaled = (points - self.origin) / self.spacing
+        shape = np.array(self.values.shape)
+        cell = np.clip(np.floor(scaled).astype(np.int64), 0,
+                       np.maximum(shape - 2, 0))
+        frac = scaled - cell
+        result = np.zeros(len(points))
+        for corner in np.ndindex(2, 2, 2):
+            idx = np.minimum(cell + corner, shape - 1)
+            weight = np.prod(np.where(corner, frac, 1 - frac), axis=1)
+            result += weight * self.values[idx[:, 0], idx[:, 1], idx[:, 2]]
+        return result
+
+
+def bake_sdf(scene, spacing: float, padding: int = 2,
+             chunk_size: int = DEFAULT_RAY_CHUNK,
+             bvh: Optional[BVH] = None) -> SDFGrid:
+    '''Samples signed distance of the scene in nodes of a grid covering its
+    bounds plus padding nodes, so that later lookups take constant time'''
+    if spacing <= 0:
+        raise ValueError(f"spacing is {spacing}, but should be larger than 0.")
+    bvh = _as_bvh(scene) if bvh is None else bvh
+    lo, hi = bvh.bounds
+    if not np.all(np.isfinite(lo)):
+        raise ValueError("Cannot bake distance field of empty scene.")
+    origin = lo - padding * spacing
+    shape = np.ceil((hi - lo) / spacing - 1e-9).astype(int) + 1 + 2*padding
+    nodes = origin + np.indices(shape).reshape(3, -1).T * spacing
+    values = signed_distance(bvh, nodes, chunk_size).reshape(shape)
+    return SDFGrid(values, origin, spacing)
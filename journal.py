@@ -0,0 +1,147 @@
+import json
+import os
+import threading
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from primitives import FaceCollection
+from mesh_io import open_temp_file
+
+
+JOURNAL_SUFFIX = '.journal'
+
+
+def _write_atomically(path: Path, text: str) -> None:
+    '''Writes text into temporary file next to path and renames it into
+    path, so that readers never see partially written file'''
+    fd, tmp_name = open_temp_file(path.parent, prefix=f'.{path.name}.',
+                                  suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as fout:
+            fout.write(text)
+            fout.flush()
+            os.fsync(fout.fileno())
+        os.replace(tmp_name, path)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+
+
+def _serialize(content: dict) -> dict:
+    '''Converts parts of snapshot content into json serializable form'''
+    return dict(content, parts=[p.to_dict() for p in content['parts']])
+
+
+class WorldJournal:
+    '''Incremental storage of a World: snapshot file plus append-only
+    journal of changes next to it (filename + '.journal').
+    Every change gets a sequence number, the snapshot records the last
+    change it includes. Loading reads the snapshot and replays later
+    changes only, so a crash between writing the snapshot and trimming
+    the journal does not apply changes twice, and a partially written last
+    journal line is ignored. Compaction writes new snapshot and drops
+    changes included in it, it may run in a background thread while new
+    changes are appended'''
+    def __init__(self, filename: str) -> None:
+        self.filename = Path(filename)
+        self.journal_filename = Path(str(filename) + JOURNAL_SUFFIX)
+        # sequence number of the last written change
+        self.seq = 0
+        self._lock = threading.Lock()
+        self._compaction: Optional[threading.Thread] = None
+
+    def append(self, changes: List[dict]) -> None:
+        '''Appends changes to the journal and flushes it to disk'''
+        if not changes:
+            return
+        with self._lock:
+            with open(self.journal_filename, 'a') as fout:
+                for change in changes:
+                    self.seq += 1
+                    fout.write(json.dumps(dict(change, seq=self.seq)) + '\n')
+                fout.flush()
+                os.fsync(fout.fileno())
+
+    def journal_size(self) -> int:
+        try:
+            return self.journal_filename.stat().st_size
+        except FileNotFoundError:
+            return 0
+
+    def snapshot_size(self) -> int:
+        try:
+            return self.filename.stat().st_size
+        except FileNotFoundError:
+            return 0
+
+    def _write_snapshot(self, content: dict, seq: int) -> None:
+        _write_atomically(self.filename,
+                          json.dumps(dict(_serialize(content), seq=seq)))
+        with self._lock:
+            kept = [line for line in self._read_journal()
+                    if json.loads(line)['seq'] > seq]
+            _write_atomically(self.journal_filename, ''.join(kept))
+
+    def create(self, content: dict) -> None:
+        '''Starts new storage with content as the snapshot, journal left by
+        previous storage in the same file is removed'''
+        self.wait()
+        self.seq = 0
+        self.journal_filename.unlink(missing_ok=True)
+        self._write_snapshot(content, self.seq)
+
+    def compact(self, content: dict, background: bool = False
+                ) -> Optional[threading.Thread]:
+        '''Writes content (see World.snapshot_content) as the new snapshot
+        including all changes appended so far. With background the snapshot
+        is written by a thread, which is returned. Content should not be
+        modified while it is written'''
+        self.wait()
+        seq = self.seq
+        if not background:
+            self._write_snapshot(content, seq)
+            return None
+        self._compaction = threading.Thread(target=self._write_snapshot,
+                                            args=(content, seq))
+        self._compaction.start()
+        return self._compaction
+
+    def wait(self) -> None:
+        '''Waits for background compaction to finish'''
+        if self._compaction is not None:
+            self._compaction.join()
+            self._compaction = None
+
+    def _read_journal(self) -> List[str]:
+        '''Returns complete lines of the journal'''
+        try:
+            with open(self.journal_filename, 'r') as fin:
+                lines = fin.readlines()
+        except FileNotFoundError:
+            return []
+        result = []
+        for line in lines:
+            try:
+                json.loads(line)
+            except json.JSONDecodeError:
+                # interrupted append, nothing after it was acknowledged
+                break
+            result.append(line if line.endswith('\n') else line + '\n')
+        return result
+
+    def load(self) -> Tuple[dict, List[dict]]:
+        '''Returns snapshot content with parts as FaceCollections and
+        changes made after it'''
+        with open(self.filename, 'r') as fin:
+            content = json.load(fin)
+        content['parts'] = [FaceCollection.from_dict(p)
+                            for p in content['parts']]
+        seq = content.pop('seq')
+        lines = self._read_journal()
+        if sum(map(len, lines)) != self.journal_size():
+            # drop interrupted append, so that new changes follow valid ones
+            _write_atomically(self.journal_filename, ''.join(lines))
+        changes = [json.loads(line) for line in lines]
+        changes = [c for c in changes if c['seq'] > seq]
+        self.seq = max([seq] + [c['seq'] for c in changes])
+        return content, changes
@@ -0,0 +1,86 @@
+from typing import List, NamedTuple
+import numpy as np
+
+
+class MassProperties(NamedTuple):
+    '''Mass properties of a solid bounded by a closed triangle mesh.
+    volume is signed: negative when faces are oriented inwards. mass is
+    density times absolute volume, inertia is the (3, 3) inertia tensor
+    about the centroid. centroid and inertia are nan for zero volume'''
+    volume: float
+    area: float
+    mass: float
+    centroid: np.ndarray
+    inertia: np.ndarray
+
+
+def _face_moments(triangles: np.ndarray):
+    '''Returns signed volumes, areas, first moments (F, 3) and second
+    moments (F, 3, 3) of tetrahedra formed by (F, 3, 3) triangles and the
+    origin (divergence theorem)'''
+    a, b, c = triangles[:, 0], triangles[:, 1], triangles[:, 2]
+    cross = np.cross(b - a, c - a)
+    areas = np.linalg.norm(cross, axis=1) / 2
+    volumes = np.einsum('ij,ij->i', a, np.cross(b, c)) / 6
+    corner_sum = a + b + c
+    first = volumes[:, None] * corner_sum / 4
+    # integral of x x^T over the tetrahedron with vertices 0, a, b, c
+    second = (np.einsum('fki,fkj->fij', triangles, triangles) +
+              np.einsum('fi,fj->fij', corner_sum, corner_sum))
+    second *= volumes[:, None, None] / 20
+    return volumes, areas, first, second
+
+
+def _finish(volume: np.ndarray, area: np.ndarray, first: np.ndarray,
+            second: np.ndarray, reference: np.ndarray,
+            density: float) -> List[MassProperties]:
+    '''Converts summed moments of groups about reference points into mass
+    properties'''
+    result = []
+    for v, s, f, m, ref in zip(volume, area, first, second, reference):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            local = f / v
+        # second moment about the centroid by the parallel axis theorem
+        central = (m - v * np.outer(local, local)) * np.sign(v) * density
+        inertia = np.trace(central) * np.eye(3) - central
+        if v == 0:
+            inertia = np.full((3, 3), np.nan)
+        result.append(MassProperties(float(v), float(s),
+                                     float(abs(v) * density), local + ref,
+                                     inertia))
+    return result
+
+
+def grouped_mass_properties(vertices: np.ndarray, faces: np.ndarray,
+                            groups: np.ndarray, group_num: int,
+                            density: float = 1.0) -> List[MassProperties]:
+    '''Computes mass properties of group_num solids in one pass. groups
+    holds the solid number of every face. Moments of every solid are taken
+    about its first vertex, which keeps precision far from the origin'''
+    vertices = np.asarray(vertices, dtype=np.float64)
+    triangles = vertices[faces]
+    groups = np.asarray(groups, dtype=np.int64)
+    reference = np.zeros((group_num, 3))
+    # the last face of a group wins, any vertex of the group will do
+    reference[groups] = triangles[:, 0]
+    volumes, areas, first, second = _face_moments(
+            triangles - reference[groups][:, None])
+
+    def total(values: np.ndarray) -> np.ndarray:
+        shape = values.shape[1:]
+        flat = values.reshape(len(values), int(np.prod(shape)))
+        sums = np.stack([np.bincount(groups, flat[:, i], minlength=group_num)
+                         for i in range(flat.shape[1])], axis=-1)
+        return sums.reshape((group_num,) + shape)
+
+    return _finish(total(volumes), total(areas), total(first),
+                   total(second), reference, density)
+
+
+def mass_properties(vertices: np.ndarray, faces: np.ndarray,
+                    density: float = 1.0) -> MassProperties:
+    '''Computes volume, surface area, mass, centroid and inertia tensor of
+    the solid bounded by the mesh given as (N, 3) vertex and (F, 3) face
+    arrays'''
+    return grouped_mass_properties(vertices, faces, np.zeros(len(faces)), 1,
+                                   density)[0]
@@ -0,0 +1,122 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Iterable, Optional
+from zipfile import BadZipFile
+import numpy as np
+
+from primitives import FaceCollection, Angle
+from mesh_io import open_temp_file
+
+
+# Increase when tessellation of any primitive changes, so that meshes stored
+# by previous versions are not reused
+CACHE_FORMAT_VERSION = 1
+
+_SUFFIX = '.npz'
+
+
+class MeshCache:
+    '''Content addressed storage of tessellated primitives on disk.
+    Every mesh is stored as compressed npz archive with vertex and face
+    arrays, file name is the key of the mesh. Files are written atomically,
+    so concurrent processes never read partially written meshes. When total
+    size of stored files exceeds max_bytes, least recently used meshes are
+    removed'''
+    def __init__(self, directory: str, max_bytes: int = 1 << 30) -> None:
+        if max_bytes <= 0:
+            raise ValueError(f"max_bytes is {max_bytes}, "
+                             "but should be larger than 0.")
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def make_key(kind: str, parameters: Iterable) -> str:
+        '''Creates key from the primitive kind (class name) and numeric
+        values of its parameters. Angles are represented by their values'''
+        values = [float(p.value if isinstance(p, Angle) else p)
+                  for p in parameters]
+        text = json.dumps([CACHE_FORMAT_VERSION, kind, values])
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / (key + _SUFFIX)
+
+    def __contains__(self, key: str) -> bool:
+        return self._path(key).exists()
+
+    def load(self, key: str) -> Optional[FaceCollection]:
+        '''Returns stored mesh or None if there is no mesh with this key'''
+        path = self._path(key)
+        try:
+            with np.load(path) as data:
+                vertices, faces = data['vertices'], data['faces']
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError, EOFError, BadZipFile):
+            # damaged file is treated as missing one
+            path.unlink(missing_ok=True)
+            return None
+        return FaceCollection.from_arrays(vertices, faces, weld=False)
+
+    def store(self, key: str, collection: FaceCollection) -> None:
+        '''Stores mesh of the collection under the key. Queued
+        transformations of the collection are not stored'''
+        fd, tmp_name = open_temp_file(self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as fout:
+                np.savez_compressed(fout,
+                                    vertices=collection.get_vertex_array(),
+                                    faces=collection.get_face_array().astype(
+                                        np.int32))
+            os.replace(tmp_name, self._path(key))
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+        self.evict()
+
+    def size(self) -> int:
+        '''Total size of stored meshes in bytes'''
+        return sum(entry.stat().st_size for entry in self._entries())
+
+    def _entries(self):
+        return [entry for entry in os.scandir(self.directory)
+                if entry.name.endswith(_SUFFIX)]
+
+    def evict(self) -> None:
+        '''Removes least recently used meshes until total size fits into
+        max_bytes'''
+        entries = []
+        for entry in self._entries():
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            Path(path).unlink(missing_ok=True)
+            total -= size
+
+    def clear(self) -> None:
+        for entry in self._entries():
+            Path(entry.path).unlink(missing_ok=True)
+
+
+_mesh_cache = None
+
+
+def set_mesh_cache(cache: Optional[MeshCache]) -> None:
+    '''Enables usage of the given cache by primitive constructors.
+    Passing None disables caching, which is the default'''
+    global _mesh_cache
+    _mesh_cache = cache
+
+
+def get_mesh_cache() -> Optional[MeshCache]:
+    return _mesh_cache
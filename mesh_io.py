@@ -0,0 +1,441 @@
+import os
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import islice, repeat
+from pathlib import Path
+from typing import List, Mapping, NamedTuple, Optional, Tuple
+import numpy as np
+
+from primitives import FaceCollection
+
+
+# Number of faces (or vertices) converted and written at once. Keeps memory
+# used for intermediate buffers bounded independently of the mesh size.
+DEFAULT_CHUNK_SIZE = 1 << 16
+
+
+def open_temp_file(directory: str, prefix: str = '',
+                   suffix: str = '') -> Tuple[int, str]:
+    '''Creates new file in directory as tempfile.mkstemp does and returns
+    its descriptor and name. Unlike mkstemp, which creates files readable
+    by the owner only, the file gets permissions of files created by open()
+    since the umask of the process is applied to it by the kernel'''
+    flags = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_BINARY', 0)
+    while True:
+        name = os.path.join(directory,
+                            f'{prefix}{os.urandom(6).hex()}{suffix}')
+        try:
+            return os.open(name, flags, 0o666), name
+        except FileExistsError:
+            continue
+
+
+_STL_HEADER_SIZE = 80
+_STL_FACE_DTYPE = np.dtype([('normal', '<f4', (3,)),
+                            ('vertices', '<f4', (3, 3)),
+                            ('attribute', '<u2')])
+_PLY_FACE_DTYPE = np.dtype([('count', 'u1'), ('indices', '<i4', (3,))])
+_PLY_TYPES = {'char': 'i1', 'int8': 'i1', 'uchar': 'u1', 'uint8': 'u1',
+              'short': 'i2', 'int16': 'i2', 'ushort': 'u2', 'uint16': 'u2',
+              'int': 'i4', 'int32': 'i4', 'uint': 'u4', 'uint32': 'u4',
+              'float': 'f4', 'float32': 'f4', 'double': 'f8', 'float64': 'f8'}
+_PLY_ENDIANNESS = {'binary_little_endian': '<', 'binary_big_endian': '>'}
+# Bytes which separate tokens of text formats
+_WHITESPACE = np.zeros(256, dtype=bool)
+_WHITESPACE[list(b' \t\r\n\v\f')] = True
+
+
+def save_stl(collection: FaceCollection, filename: str,
+             chunk_size: int = DEFAULT_CHUNK_SIZE) -> None:
+    '''Saves collection into binary STL file. Queued transformations are
+    applied to the saved coordinates. Face normals are calculated according
+    to the face orientation (right hand rule). Faces are converted in chunks,
+    the transformed vertex array is built at once, because faces refer to
+    arbitrary vertices'''
+    vertices = collection.get_transformed_vertex_array()
+    with open(filename, 'wb') as fout:
+        fout.write(b'ObjLike binary STL'.ljust(_STL_HEADER_SIZE, b' '))
+        fout.write(np.array(len(collection.faces), dtype='<u4').tobytes())
+        for faces in collection.iter_face_arrays(chunk_size):
+            triangles = vertices[faces]
+            normals = np.cross(triangles[:, 1] - triangles[:, 0],
+                               triangles[:, 2] - triangles[:, 0])
+            lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+            np.divide(normals, lengths, out=normals, where=lengths > 0)
+            records = np.zeros(len(triangles), dtype=_STL_FACE_DTYPE)
+            records['normal'] = normals
+            records['vertices'] = triangles
+            fout.write(records.tobytes())
+
+
+def save_ply(collection: FaceCollection, filename: str,
+             chunk_size: int = DEFAULT_CHUNK_SIZE) -> None:
+    '''Saves collection into binary little endian PLY file. Queued
+    transformations are applied to the saved coordinates. Coordinates are
+    stored with the precision of the collection vertex array. Vertices and
+    faces are converted and written in chunks'''
+    ply_type = 'float' if collection.vertex_dtype == np.float32 else 'double'
+    vertex_dtype = '<f4' if ply_type == 'float' else '<f8'
+    header = ('ply\n'
+              'format binary_little_endian 1.0\n'
+              'comment ObjLike export\n'
+              f'element vertex {len(collection.points)}\n'
+              f'property {ply_type} x\n'
+              f'property {ply_type} y\n'
+              f'property {ply_type} z\n'
+              f'element face {len(collection.faces)}\n'
+              'property list uchar int vertex_indices\n'
+              'end_header\n')
+    with open(filename, 'wb') as fout:
+        fout.write(header.encode('ascii'))
+        for vertices in collection.iter_vertex_arrays(chunk_size):
+            fout.write(vertices.astype(vertex_dtype).tobytes())
+        for faces in collection.iter_face_arrays(chunk_size):
+            records = np.empty(len(faces), dtype=_PLY_FACE_DTYPE)
+            records['count'] = 3
+            records['indices'] = faces
+            fout.write(records.tobytes())
+
+
+def save_obj(collection: FaceCollection, filename: str,
+             chunk_size: int = DEFAULT_CHUNK_SIZE) -> None:
+    '''Saves collection into Wavefront OBJ file. Queued transformations are
+    applied to the saved coordinates. Coordinates are written without loss
+    of precision. Vertices and faces are converted and written in chunks'''
+    with open(filename, 'w') as fout:
+        fout.write('# ObjLike export\n')
+        for vertices in collection.iter_vertex_arrays(chunk_size):
+            np.savetxt(fout, vertices, fmt='v %.17g %.17g %.17g')
+        for faces in collection.iter_face_arrays(chunk_size):
+            np.savetxt(fout, faces + 1, fmt='f %d %d %d')
+
+
+_SAVERS = {'.stl': save_stl, '.ply': save_ply, '.obj': save_obj}
+
+
+def save_mesh(collection: FaceCollection, filename: str,
+              chunk_size: int = DEFAULT_CHUNK_SIZE) -> None:
+    '''Saves collection into the file with format chosen according to the
+    file extension. Supported extensions are .stl, .ply and .obj'''
+    suffix = Path(filename).suffix.lower()
+    if suffix not in _SAVERS:
+        raise ValueError(f"Unsupported mesh format '{suffix}'. "
+                         f"Expected one of {sorted(_SAVERS)}")
+    _SAVERS[suffix](collection, filename, chunk_size)
+
+
+def _fan_triangulate(indices: np.ndarray, sizes: np.ndarray) -> np.ndarray:
+    '''Splits convex polygons given as flat array of their vertex indices
+    and array of their vertex numbers into (T, 3) triangles preserving
+    order and orientation of polygons'''
+    if np.any(sizes < 3):
+        raise ValueError(f"Polygon should have at least 3 vertices, "
+                         f"but has {sizes.min()}")
+    tri_nums = sizes - 2
+    heads = np.repeat(np.cumsum(sizes) - sizes, tri_nums)
+    # number of every triangle inside its polygon
+    local = np.arange(len(heads)) - np.repeat(np.cumsum(tri_nums) - tri_nums,
+                                              tri_nums)
+    return np.stack((indices[heads], indices[heads + local + 1],
+                     indices[heads + local + 2]), axis=1)
+
+
+def _is_binary_stl(data: bytes) -> bool:
+    if len(data) < _STL_HEADER_SIZE + 4:
+        return False
+    count = np.frombuffer(data, dtype='<u4', count=1,
+                          offset=_STL_HEADER_SIZE)[0]
+    return (len(data) == _STL_HEADER_SIZE + 4 +
+            int(count) * _STL_FACE_DTYPE.itemsize)
+
+
+def read_stl(filename: str) -> FaceCollection:
+    '''Reads binary or ASCII STL file. Coinciding vertices of neighbouring
+    triangles are welded, stored normals are ignored'''
+    data = Path(filename).read_bytes()
+    if _is_binary_stl(data):
+        records = np.frombuffer(data, dtype=_STL_FACE_DTYPE,
+                                offset=_STL_HEADER_SIZE + 4)
+        vertices = records['vertices'].reshape(-1, 3)
+    else:
+        tokens = np.array(data.split())
+        positions = np.flatnonzero(tokens == b'vertex')
+        vertices = tokens[positions[:, None] + np.arange(1, 4)].astype(
+                np.float64)
+    faces = np.arange(len(vertices)).reshape(-1, 3)
+    return FaceCollection.from_arrays(vertices, faces)
+
+
+def _read_ply_header(fin) -> Tuple[str, List]:
+    '''Returns format and list of elements described as
+    (name, count, [(property name, type, list count type or None)])'''
+    if fin.readline().strip() != b'ply':
+        raise ValueError("File is not in PLY format")
+    fmt = None
+    elements = []
+    for line in fin:
+        words = line.decode('ascii').split()
+        if not words or words[0] in ('comment', 'obj_info'):
+            continue
+        if words[0] == 'end_header':
+            return fmt, elements
+        if words[0] == 'format':
+            fmt = words[1]
+        elif words[0] == 'element':
+            elements.append((words[1], int(words[2]), []))
+        elif words[0] == 'property' and words[1] == 'list':
+            elements[-1][2].append((words[4], _PLY_TYPES[words[3]],
+                                    _PLY_TYPES[words[2]]))
+        elif words[0] == 'property':
+            elements[-1][2].append((words[2], _PLY_TYPES[words[1]], None))
+    raise ValueError("PLY header is not terminated")
+
+
+def _read_ply_list_element(data: bytes, offset: int, endian: str,
+                           count: int, count_type: str,
+                           item_type: str) -> Tuple[np.ndarray, int]:
+    '''Reads element which consists of single list property. Returns
+    (count, K) array of lists and offset after the element. All lists are
+    expected to have the same length K'''
+    if count == 0:
+        return np.empty((0, 3), dtype=np.int64), offset
+    size = np.frombuffer(data, dtype=endian + count_type, count=1,
+                         offset=offset)[0]
+    record = np.dtype([('count', endian + count_type),
+                       ('items', endian + item_type, (int(size),))])
+    records = np.frombuffer(data, dtype=record, count=count, offset=offset)
+    if np.any(records['count'] != size):
+        raise ValueError("Only PLY faces with equal vertex number "
+                         "are supported")
+    return records['items'], offset + count * record.itemsize
+
+
+def read_ply(filename: str) -> FaceCollection:
+    '''Reads binary or ASCII PLY file. Only vertex coordinates and vertex
+    indices of faces are used, other properties are skipped'''
+    with open(filename, 'rb') as fin:
+        fmt, elements = _read_ply_header(fin)
+        data = fin.read()
+    vertices = np.empty((0, 3))
+    faces = np.empty((0, 3), dtype=np.int64)
+    if fmt == 'ascii':
+        lines = iter(data.splitlines())
+        for name, count, props in elements:
+            rows = [ln.split() for ln in islice(lines, count)]
+            if name == 'vertex':
+                columns = [p[0] for p in props]
+                table = np.array(rows, dtype=np.float64).reshape(count, -1)
+                vertices = table[:, [columns.index(c) for c in 'xyz']]
+            elif name == 'face':
+                faces = _fan_triangulate(
+                        np.array([v for row in rows
+                                  for v in row[1:1+int(row[0])]],
+                                 dtype=np.int64),
+                        np.array([int(row[0]) for row in rows],
+                                 dtype=np.int64))
+        return FaceCollection.from_arrays(vertices, faces)
+    if fmt not in _PLY_ENDIANNESS:
+        raise ValueError(f"Unknown PLY format '{fmt}'")
+    endian = _PLY_ENDIANNESS[fmt]
+    offset = 0
+    for name, count, props in elements:
+        if any(p[2] is not None for p in props):
+            if len(props) != 1:
+                raise ValueError(f"Element '{name}' with list property "
+                                 "should not have other properties")
+            items, offset = _read_ply_list_element(data, offset, endian, count,
+                                                   props[0][2], props[0][1])
+            if name == 'face':
+                faces = _fan_triangulate(items.reshape(-1).astype(np.int64),
+                                         np.full(len(items), items.shape[1]))
+            continue
+        record = np.dtype([(p[0], endian + p[1]) for p in props])
+        table = np.frombuffer(data, dtype=record, count=count, offset=offset)
+        offset += count * record.itemsize
+        if name == 'vertex':
+            vertices = np.stack([table[c].astype(np.float64) for c in 'xyz'],
+                                axis=1)
+    return FaceCollection.from_arrays(vertices, faces)
+
+
+def _parse_numbers(data: np.ndarray, dtype, count: int) -> np.ndarray:
+    '''Parses count whitespace separated numbers from array of bytes'''
+    with warnings.catch_warnings():
+        # numpy warns about data it cannot parse, it is reported below
+        warnings.simplefilter('ignore', DeprecationWarning)
+        values = np.fromstring(data.tobytes(), dtype=dtype, sep=' ')
+    if len(values) != count:
+        raise ValueError("Mesh file contains malformed numbers.")
+    return values
+
+
+def _read_obj_block(block: bytes, vertex_num: int
+                    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    '''Tokenizes block of complete OBJ lines at once. vertex_num is the
+    number of vertices read before the block. Returns (V, 3) vertex
+    positions, zero based vertex indices of all polygons in file order and
+    numbers of vertices of polygons'''
+    data = np.frombuffer(block + b'\n', dtype=np.uint8).copy()
+    ends = np.flatnonzero(data == ord('\n'))
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    lengths = ends - starts + 1
+    comments = np.flatnonzero(data == ord('#'))
+    if len(comments):
+        # bytes from # to the end of its line are blanked
+        marks = np.zeros(len(data) + 1, dtype=np.int64)
+        np.add.at(marks, comments, 1)
+        np.add.at(marks, ends[np.searchsorted(ends, comments)], -1)
+        data[np.cumsum(marks[:-1]) > 0] = ord(' ')
+    separated = _WHITESPACE[data[np.minimum(starts + 1, len(data) - 1)]]
+    is_vertex = (data[starts] == ord('v')) & separated
+    is_face = (data[starts] == ord('f')) & separated
+    data[starts[is_vertex | is_face]] = ord(' ')
+    space = _WHITESPACE[data]
+    token_starts = ~space
+    token_starts[1:] &= space[:-1]
+    token_count = np.cumsum(token_starts)
+    token_nums = token_count[ends] - token_count[starts] + token_starts[starts]
+
+    counts = token_nums[is_vertex]
+    if np.any(counts < 3):
+        raise ValueError("OBJ vertex should have three coordinates.")
+    values = _parse_numbers(data[np.repeat(is_vertex, lengths)], np.float64,
+                            counts.sum())
+    # optional w or vertex colour values follow x, y and z
+    offsets = np.cumsum(counts) - counts
+    vertices = values[offsets[:, None] + np.arange(3)].reshape(-1, 3)
+
+    sizes = token_nums[is_face]
+    if not len(sizes):
+        return vertices, np.empty(0, dtype=np.int64), sizes
+    face_bytes = np.repeat(is_face, lengths)
+    if b'/' in block:
+        # texture and normal indices follow the first slash of face tokens
+        slashes = data == ord('/')
+        slash_count = np.cumsum(slashes)
+        token_of = np.maximum(token_count - 1, 0)
+        after_slash = (slash_count >
+                       (slash_count - slashes)[token_starts][token_of])
+        data[after_slash & face_bytes] = ord(' ')
+    indices = _parse_numbers(data[face_bytes], np.int64, sizes.sum())
+    # negative indices count back from the last vertex read before the face
+    before = np.repeat(vertex_num + np.cumsum(is_vertex)[is_face], sizes)
+    indices = np.where(indices > 0, indices - 1, before + indices)
+    return vertices, indices, sizes
+
+
+def read_obj(filename: str,
+             chunk_size: int = DEFAULT_CHUNK_SIZE) -> FaceCollection:
+    '''Reads Wavefront OBJ file. Only vertex positions and faces are used,
+    extra values of vertex lines (w or colour) are ignored. Polygonal faces
+    are split into triangles, which keep the order of faces in the file.
+    The file is tokenized with numpy in blocks of chunk_size lines'''
+    vertex_chunks = []
+    index_chunks = []
+    size_chunks = []
+    vertex_num = 0
+    with open(filename, 'rb') as fin:
+        while True:
+            block = b''.join(islice(fin, chunk_size))
+            if not block:
+                break
+            vertices, indices, sizes = _read_obj_block(block, vertex_num)
+            vertex_chunks.append(vertices)
+            index_chunks.append(indices)
+            size_chunks.append(sizes)
+            vertex_num += len(vertices)
+    vertices = (np.concatenate(vertex_chunks) if vertex_chunks
+                else np.empty((0, 3)))
+    indices = (np.concatenate(index_chunks) if index_chunks
+               else np.empty(0, dtype=np.int64))
+    if np.any((indices < 0) | (indices >= len(vertices))):
+        raise ValueError(f"Face refers to missing vertex in {filename}.")
+    faces = _fan_triangulate(indices, np.concatenate(size_chunks or [[]])
+                             .astype(np.int64))
+    return FaceCollection.from_arrays(vertices, faces)
+
+
+_READERS = {'.stl': read_stl, '.ply': read_ply, '.obj': read_obj}
+
+
+def load_mesh(filename: str) -> FaceCollection:
+    '''Reads mesh from the file with format chosen according to the file
+    extension. Supported extensions are .stl, .ply and .obj'''
+    suffix = Path(filename).suffix.lower()
+    if suffix not in _READERS:
+        raise ValueError(f"Unsupported mesh format '{suffix}'. "
+                         f"Expected one of {sorted(_READERS)}")
+    return _READERS[suffix](filename)
+
+
+class SaveReport(NamedTuple):
+    '''Summary of save_many call'''
+    written: List[Path]
+    skipped: List[Path]
+    bytes_written: int
+    seconds: float
+
+    @property
+    def files_per_second(self) -> float:
+        return len(self.written) / self.seconds if self.seconds else 0.0
+
+    @property
+    def bytes_per_second(self) -> float:
+        return self.bytes_written / self.seconds if self.seconds else 0.0
+
+
+def _save_atomically(collection: FaceCollection, path: Path,
+                     skip_unchanged: bool) -> Optional[int]:
+    '''Writes collection into temporary file in the target directory and
+    renames it into path, so that readers never see partially written file.
+    Returns size of the written file or None if saving was skipped'''
+    suffix = path.suffix.lower()
+    if suffix == '.json' and skip_unchanged and collection.is_saved_in(path):
+        return None
+    fd, tmp_name = open_temp_file(path.parent, prefix=f'.{path.name}.',
+                                  suffix='.tmp')
+    os.close(fd)
+    try:
+        if suffix == '.json':
+            collection.save_to_file(tmp_name)
+        else:
+            _SAVERS[suffix](collection, tmp_name)
+        os.replace(tmp_name, path)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+    return path.stat().st_size
+
+
+def save_many(items: Mapping, directory: str, max_workers: int = None,
+              use_processes: bool = False,
+              skip_unchanged: bool = False) -> SaveReport:
+    '''Saves many objects or face collections into the directory.
+    items maps file name to the object, format is chosen according to the
+    file extension: .json (see FaceCollection.save_to_file), .stl, .ply or
+    .obj. Files are serialized concurrently in thread pool or, if
+    use_processes is set, in process pool. Every file is written atomically.
+    With skip_unchanged json files which already contain the same content
+    are not rewritten'''
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    paths = [directory / name for name in items]
+    for path in paths:
+        suffix = path.suffix.lower()
+        if suffix != '.json' and suffix not in _SAVERS:
+            raise ValueError(f"Unsupported format '{suffix}' of {path.name}. "
+                             f"Expected one of {sorted(_SAVERS) + ['.json']}")
+    collections = [getattr(item, 'description', item)
+                   for item in items.values()]
+    executor = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+    start = time.perf_counter()
+    with executor(max_workers) as pool:
+        sizes = list(pool.map(_save_atomically, collections, paths,
+                              repeat(skip_unchanged)))
+    seconds = time.perf_counter() - start
+    return SaveReport(written=[p for p, s in zip(paths, sizes)
+                               if s is not None],
+                      skipped=[p for p, s in zip(paths, sizes) if s is None],
+                      bytes_written=sum(s for s in sizes if s is not None),
+                      seconds=seconds)
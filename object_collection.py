@@ -1,18 +1,29 @@
-from copy import deepcopy
-from itertools import tee
-from typing import List, Tuple, Iterable
-from functools import reduce
+from itertools import islice, tee
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Iterable, Sequence
 import numpy as np
 
 import matplotlib.pyplot as plt
 from mpl_toolkits.mplot3d import Axes3D
-from mpl_toolkits.mplot3d.art3d import Poly3DCollection
+from mpl_toolkits.mplot3d.art3d import Poly3DCollection, Line3DCollection
 
-from primitives import Point, FaceCollection, Angle
+from primitives import (Point, PointArray, PointCollection, FaceCollection,
+                        Angle, AngleArray)
+from shared_mesh import SharedMesh
+import mesh_cache
+import mesh_io
+import decimation
+import sampling
+import voxelize
+import distance
+import containment
+import collision
+import plotting
+import mass
+from bvh import BVH
+from journal import WorldJournal
 
 
-# TODO delete objects from world?
-
 # TODO replace by itertools.pairwise when it is available
 def pairwise(iterable):
     '''Generates as following (1,2,3) -> (1,2), (2, 3)'''
@@ -42,30 +53,225 @@ def _throw_if_le_zero(var, var_name):
         raise ValueError(f"{var_name} is {var}, but should be larger than 0.")
 
 
+def _chord_num(radius: float, angle: float, tolerance: float) -> int:
+    '''Smallest number of equal chords approximating an arc of the given
+    angle, such that distance between the arc and chords (sagitta) does not
+    exceed tolerance'''
+    _throw_if_le_zero(tolerance, "tolerance")
+    max_angle = 2*np.arccos(max(1 - tolerance/radius, -1.0))
+    return max(1, int(np.ceil(angle / max_angle - 1e-12)))
+
+
+def _ring_layer_num(radius: float, tolerance: float) -> int:
+    '''layer_num of Circle based primitives for the given tolerance. Outer
+    ring of such primitives consists of 6*layer_num chords'''
+    return int(np.ceil(_chord_num(radius, 2*np.pi, tolerance) / 6))
+
+
 class Object:
+    # Names of attributes which completely define the mesh of a primitive.
+    # Only primitives which declare them are stored in the mesh cache.
+    _mesh_parameters: Tuple[str, ...] = ()
 
     def __init__(self) -> None:
-        self.description = FaceCollection()
+        self._description: Optional[FaceCollection] = FaceCollection()
+        # transformations made before tessellation as (FaceCollection method
+        # name, arguments)
+        self._pending_transforms: List[Tuple[str, tuple]] = []
+        self._lod_cache = None
+
+    def _defer_tessellation(self) -> None:
+        '''Makes the primitive parametric: its description is built on the
+        first access, see description'''
+        self._description = None
+
+    @property
+    def description(self) -> FaceCollection:
+        '''Faces of the object. Primitives are tessellated on the first
+        access, transformations made before it are applied to the result'''
+        if self._description is None:
+            description = self._build_description()
+            for name, args in self._pending_transforms:
+                getattr(description, name)(*args)
+            self._pending_transforms = []
+            self._description = description
+        return self._description
+
+    @description.setter
+    def description(self, description: FaceCollection) -> None:
+        self._description = description
+        self._pending_transforms = []
+
+    def is_tessellated(self) -> bool:
+        return self._description is not None
+
+    def _local_bounds(self) -> np.ndarray:
+        '''(2, 3) array with corners of the box bounding the exact
+        (not tessellated) primitive before its transformations'''
+        raise TypeError(f"{type(self).__name__} has no parametric shape")
+
+    def analytic_bounds(self) -> np.ndarray:
+        '''Returns (2, 3) array with min and max corners of the box bounding
+        the object with its transformations. Primitives which are not
+        tessellated yet are bounded by their exact shape (rotated shapes by
+        the box of their rotated bounding box corners), otherwise bounds of
+        the transformed description are returned, so they follow changes
+        made to the description directly'''
+        if self.is_tessellated():
+            vertices = self.description.get_transformed_vertex_array()
+        else:
+            lo, hi = self._local_bounds()
+            corners = np.array([[(lo, hi)[(i >> axis) & 1][axis]
+                                 for axis in range(3)] for i in range(8)])
+            holder = FaceCollection()
+            holder.points = PointCollection.from_array(
+                    np.unique(corners, axis=0))
+            for name, args in self._pending_transforms:
+                getattr(holder, name)(*args)
+            vertices = holder.get_transformed_vertex_array()
+        if not len(vertices):
+            return np.array([[np.inf]*3, [-np.inf]*3])
+        return np.stack((vertices.min(axis=0), vertices.max(axis=0)))
+
+    def analytic_area(self) -> float:
+        '''Surface area of the exact (not tessellated) primitive. Objects
+        without parametric shape return area of their description'''
+        return self.mass_properties().area
+
+    def analytic_volume(self) -> float:
+        '''Volume enclosed by the exact primitive, 0 for open surfaces.
+        Objects without parametric shape return signed volume enclosed by
+        their description, see mass_properties'''
+        return self.mass_properties().volume
+
+    def _tessellate(self) -> FaceCollection:
+        '''Builds description of the primitive from its parameters'''
+        raise TypeError(f"{type(self).__name__} has no tessellation")
+
+    def _build_description(self) -> FaceCollection:
+        '''Returns tessellated primitive. When mesh cache is enabled, mesh
+        built earlier with the same parameters is taken from the cache'''
+        cache = mesh_cache.get_mesh_cache()
+        if cache is None or not self._mesh_parameters:
+            return self._tessellate()
+        key = cache.make_key(type(self).__name__,
+                             [getattr(self, p) for p in self._mesh_parameters])
+        description = cache.load(key)
+        if description is None:
+            description = self._tessellate()
+            cache.store(key, description)
+        return description
+
+    def _transform(self, name: str, *args) -> None:
+        '''Applies transformation to the description or records it until
+        the primitive is tessellated'''
+        if self.is_tessellated():
+            getattr(self.description, name)(*args)
+        else:
+            self._pending_transforms.append((name, args))
 
     def move(self, x: float = 0, y: float = 0, z: float = 0) -> None:
-        self.description.move(x, y, z)
+        self._transform('move', x, y, z)
 
     def rotate(self, x=Angle(0), y=Angle(0), z=Angle(0)) -> None:
-        self.description.rotate(x, y, z)
+        self._transform('rotate', x, y, z)
 
     def accept_transformations(self) -> None:
-        self.description.accept_transformations()
+        self._transform('accept_transformations')
+
+    def save_to_file(self, filename: str,
+                     skip_unchanged: bool = False) -> bool:
+        return self.description.save_to_file(filename, skip_unchanged)
 
-    def save_to_file(self, filename: str) -> None:
-        self.description.save_to_file(filename)
+    def content_hash(self) -> str:
+        return self.description.content_hash()
+
+    def save_mesh(self, filename: str) -> None:
+        '''Exports object into STL, PLY or OBJ file according to the
+        filename extension'''
+        mesh_io.save_mesh(self.description, filename)
 
     def invert(self) -> None:
         self.description.invert()
 
+    def sample_surface(self, num: int, seed=None) -> sampling.SurfaceSamples:
+        '''Draws num points uniformly distributed over the surface of the
+        object, see sampling.SurfaceSampler'''
+        return sampling.sample_surface(self.description, num, seed)
+
+    def voxelize(self, voxel_size: float,
+                 fill: str = None) -> voxelize.VoxelGrid:
+        '''Returns occupancy grid of the object, see voxelize.voxelize'''
+        return voxelize.voxelize(self.description, voxel_size, fill)
+
+    def closest_points(self, points: np.ndarray) -> distance.ClosestPoints:
+        '''Closest points of the object surface, see distance.closest_points'''
+        return distance.closest_points(self.description, points)
+
+    def contains(self, points: np.ndarray, method: str = 'parity',
+                 max_workers: int = 1) -> np.ndarray:
+        '''Checks which points are inside the object, see
+        containment.contains'''
+        return containment.contains(self.description, points, method,
+                                    max_workers=max_workers)
+
+    def signed_distance(self, points: np.ndarray) -> np.ndarray:
+        '''Distances from points to the object surface, negative inside'''
+        return distance.signed_distance(self.description, points)
+
+    def mass_properties(self, density: float = 1.0) -> mass.MassProperties:
+        '''Returns volume, surface area, centroid and inertia tensor of the
+        object, see FaceCollection.mass_properties'''
+        return self.description.mass_properties(density)
+
+    def share(self) -> SharedMesh:
+        '''Publishes transformed mesh of the object in shared memory, see
+        FaceCollection.share'''
+        return self.description.share()
+
+    def repair_orientation(self) -> int:
+        return self.description.repair_orientation()
+
+    def lod_chain(self, ratios: Iterable[float] = (0.5, 0.25, 0.125)
+                  ) -> List[FaceCollection]:
+        '''Returns levels of detail of the object: description itself
+        followed by its decimations down to the given fractions of faces.
+        Every level is decimated from the previous one. The chain is cached
+        and rebuilt only when the description or ratios change'''
+        ratios = tuple(ratios)
+        if any(not 0 < r <= 1 for r in ratios):
+            raise ValueError(f"ratios are {ratios}, but should be in (0, 1].")
+        key = (self.description.content_hash(), ratios)
+        if self._lod_cache is not None and self._lod_cache[0] == key:
+            return self._lod_cache[1]
+        face_num = len(self.description.faces)
+        chain = [self.description]
+        for ratio in ratios:
+            chain.append(decimation.decimate(
+                chain[-1], target_faces=int(round(face_num * ratio))))
+        self._lod_cache = (key, chain)
+        return chain
+
+    def get_lod(self, level: int,
+                ratios: Iterable[float] = (0.5, 0.25, 0.125)
+                ) -> FaceCollection:
+        '''Returns level of detail from lod_chain, level 0 is the
+        description itself'''
+        return self.lod_chain(ratios)[level]
+
     @classmethod
     def from_json_file(cls, filename: str) -> "Object":
         result = cls()
         result.description = FaceCollection.from_json_file(filename)
+        return result
+
+    @classmethod
+    def from_mesh_file(cls, filename: str) -> "Object":
+        '''Creates object from STL, PLY or OBJ file according to the
+        filename extension'''
+        result = cls()
+        result.description = mesh_io.load_mesh(filename)
+        return result
 
     def get_max_x(self) -> float:
         return max(map(lambda p: p.x, self.description.points))
@@ -85,20 +291,47 @@ class Object:
     def get_min_z(self) -> float:
         return min(map(lambda p: p.z, self.description.points))
 
-    def plot(self) -> None:
-        ''' Returns figure with plotted object on it'''
+    def plot(self, view_direction: Sequence[float] = None,
+             limits: Tuple[Sequence[float], Sequence[float]] = None,
+             min_face_pixels: float = 0, wireframe: bool = True):
+        ''' Returns figure with plotted object on it.
+        With view_direction the camera looks along it with orthographic
+        projection and faces turned away from it are not drawn (closed
+        outward oriented objects only). limits
+        (min corner, max corner) set the visible box, faces outside it are
+        dropped. With min_face_pixels the mesh is decimated by vertex
+        clustering, so that details smaller than this number of pixels of
+        the figure are merged. Edges are drawn once as one collection'''
         fig = plt.figure()
         ax = Axes3D(fig)
-        ax.set_xlim3d(self.get_min_x(), self.get_max_x())
-        ax.set_ylim3d(self.get_min_y(), self.get_max_y())
-        ax.set_zlim3d(self.get_min_z(), self.get_max_z())
+        vertices = self.description.get_vertex_array().astype(np.float64)
+        lo, hi = ((vertices.min(axis=0), vertices.max(axis=0))
+                  if limits is None else map(np.asarray, limits))
+        ax.set_xlim3d(lo[0], hi[0])
+        ax.set_ylim3d(lo[1], hi[1])
+        ax.set_zlim3d(lo[2], hi[2])
         ax.set_xlabel("X")
         ax.set_ylabel("Y")
         ax.set_zlabel("Z")
         fig.add_axes(ax, label="main")
-        faces = list(map(lambda face: (face[0], face[1], face[2]),
-                         self.description.faced_points()))
-        ax.add_collection3d(Poly3DCollection(faces, edgecolor="black"))
+        if view_direction is not None:
+            ax.view_init(*plotting.view_angles(view_direction))
+            # faces are culled for parallel rays along view_direction, which
+            # perspective projection would show near the figure borders
+            ax.set_proj_type('ortho')
+        cell_size = 0
+        if min_face_pixels > 0:
+            pixels = max(fig.get_size_inches() * fig.dpi)
+            cell_size = min_face_pixels * np.max(hi - lo) / pixels
+        vertices, faces = plotting.prepare_mesh(
+                vertices, self.description.get_face_array(), view_direction,
+                limits, cell_size)
+        ax.add_collection3d(Poly3DCollection(vertices[faces],
+                                             edgecolor="none"))
+        if wireframe:
+            edges = vertices[plotting.unique_edges(faces)]
+            ax.add_collection3d(Line3DCollection(edges, colors="black",
+                                                 linewidths=0.5))
         return fig
 
 
@@ -110,12 +343,28 @@ class Plane(Object):
         super().__init__()
         self.width = width
         self.height = height
+        self._defer_tessellation()
+
+    def _local_bounds(self) -> np.ndarray:
+        return np.array([[-self.width/2, -self.height/2, 0],
+                         [self.width/2, self.height/2, 0]])
+
+    def analytic_area(self) -> float:
+        return self.width * self.height
+
+    def analytic_volume(self) -> float:
+        return 0.0
+
+    def _tessellate(self) -> FaceCollection:
+        width, height = self.width, self.height
+        description = FaceCollection()
         left_bot = Point(-width/2, -height/2, 0)
         left_top = Point(-width/2, height/2, 0)
         right_bot = Point(width/2, -height/2, 0)
         right_top = Point(width/2, height/2, 0)
-        self.description.add_face(left_bot, right_bot, right_top)
-        self.description.add_face(left_bot, right_top, left_top)
+        description.add_face(left_bot, right_bot, right_top)
+        description.add_face(left_bot, right_top, left_top)
+        return description
 
 
 class Box(Object):
@@ -128,6 +377,22 @@ class Box(Object):
         self.width = width
         self.height = height
         self.depth = depth
+        self._defer_tessellation()
+
+    def _local_bounds(self) -> np.ndarray:
+        half = np.array([self.width, self.depth, self.height]) / 2
+        return np.stack((-half, half))
+
+    def analytic_area(self) -> float:
+        return 2*(self.width*self.height + self.width*self.depth +
+                  self.height*self.depth)
+
+    def analytic_volume(self) -> float:
+        return self.width * self.height * self.depth
+
+    def _tessellate(self) -> FaceCollection:
+        width, height, depth = self.width, self.height, self.depth
+        description = FaceCollection()
         bot = Plane(width=width, height=depth).description.move(z=-height/2)
         bot.invert()
         top = Plane(width=width, height=depth).description.move(z=height/2)
@@ -143,13 +408,17 @@ class Box(Object):
         back.invert()
         for pl in (bot, top, right, left, front, back):
             pl.accept_transformations()
-            self.description = FaceCollection.merge(self.description, pl)
+            description = FaceCollection.merge(description, pl)
+        return description
 
 
 class CircleSegment(Object):
     '''Circle segment in xy plane with center in (0, 0, 0).
     If one need to create CircleSegment(0, 2*np.pi) one should use Circle
-    class instead'''
+    class instead. With fan the segment is a single layer of faces around
+    the center, its arc is the same as with layer_num layers'''
+    _mesh_parameters = ('phi_from', 'phi_to', 'radius', 'layer_num', 'fan')
+
     @staticmethod
     def _layer_iterator(layer_num: int, radius: float):
         '''Generates point num on layer and layer radius as iterable'''
@@ -165,19 +434,30 @@ class CircleSegment(Object):
 
     @staticmethod
     def _build_segment_quant(phi_from: Angle, phi_to: Angle, radius: float,
-                             layer_num: int) -> (FaceCollection, Tuple[Point]):
+                             layer_num: int,
+                             fan: bool = False) -> FaceCollection:
         faces = FaceCollection()
-        prev_points = [Point(0, 0, 0)]
+        center = Point(0, 0, 0)
+        if fan:
+            angles = AngleArray.linspace(phi_from, phi_to, layer_num + 1,
+                                         endpoint=True)
+            arc = PointArray.from_spherical(radius, angles,
+                                            Angle(np.pi/2)).to_points()
+            for cl, cr in pairwise(arc):
+                faces.add_face(cr, center, cl)
+            return faces
+        prev_points = [center]
         for pts_num, r in CircleSegment._layer_iterator(layer_num, radius):
-            angles = Angle.linspace(phi_from, phi_to, pts_num, endpoint=True)
-            curr_points = [Point.from_spherical(r, phi, Angle(np.pi/2))
-                           for phi in angles]
+            angles = AngleArray.linspace(phi_from, phi_to, pts_num,
+                                         endpoint=True)
+            curr_points = PointArray.from_spherical(
+                    r, angles, Angle(np.pi/2)).to_points()
             CircleSegment._add_layer(faces, prev_points, curr_points)
             prev_points = curr_points
         return faces
 
     def __init__(self, phi_from: Angle, phi_to: Angle, radius: float,
-                 layer_num: int) -> None:
+                 layer_num: int, fan: bool = False) -> None:
         if not isinstance(layer_num, int):
             raise TypeError("layer_num should be integer")
         _throw_if_le_zero(radius, "radius")
@@ -189,17 +469,62 @@ class CircleSegment(Object):
         self.phi_from = phi_from
         self.phi_to = phi_to
         self.layer_num = layer_num
-        quant_num = int(np.ceil((phi_to - phi_from).value / (2*np.pi / 3)))
-        angles = Angle.linspace(phi_from, phi_to, quant_num+1, endpoint=True)
+        self.fan = fan
+        self._defer_tessellation()
+
+    @staticmethod
+    def _quant_num(phi_from: Angle, phi_to: Angle) -> int:
+        return int(np.ceil((phi_to - phi_from).value / (2*np.pi / 3)))
+
+    @classmethod
+    def from_tolerance(cls, phi_from: Angle, phi_to: Angle, radius: float,
+                       tolerance: float) -> "CircleSegment":
+        '''Creates segment with the smallest layer_num for which its arc
+        deviates from the exact one by at most tolerance. The segment is
+        a fan, inner layers do not improve a flat surface'''
+        _throw_if_le_zero(radius, "radius")
+        quant_num = cls._quant_num(phi_from, phi_to)
+        chords = _chord_num(radius, (phi_to - phi_from).value, tolerance)
+        return cls(phi_from, phi_to, radius,
+                   int(np.ceil(chords / max(quant_num, 1))), fan=True)
+
+    def _local_bounds(self) -> np.ndarray:
+        lo, hi = self.phi_from.value, self.phi_to.value
+        # extreme points are the center, the arc ends and the arc points on
+        # the axes
+        angles = np.array([lo, hi] + [a for a in np.arange(4)*np.pi/2
+                                      if lo < a < hi])
+        xy = np.concatenate(([[0, 0]], self.radius * np.stack(
+                (np.cos(angles), np.sin(angles)), axis=1)))
+        return np.stack((np.append(xy.min(axis=0), 0),
+                         np.append(xy.max(axis=0), 0)))
+
+    def analytic_area(self) -> float:
+        return (self.phi_to - self.phi_from).value * self.radius**2 / 2
+
+    def analytic_volume(self) -> float:
+        return 0.0
+
+    def _tessellate(self) -> FaceCollection:
+        description = FaceCollection()
+        quant_num = self._quant_num(self.phi_from, self.phi_to)
+        angles = Angle.linspace(self.phi_from, self.phi_to, quant_num+1,
+                                endpoint=True)
         for lo, hi in pairwise(angles):
-            add_descr = self._build_segment_quant(lo, hi, radius, layer_num)
-            self.description = FaceCollection.merge(
-                    self.description, add_descr)
+            add_descr = self._build_segment_quant(lo, hi, self.radius,
+                                                  self.layer_num, self.fan)
+            description = FaceCollection.merge(description, add_descr)
+        return description
 
 
 class Circle(Object):
-    '''Circle in xy plane with center in (0, 0, 0)'''
-    def __init__(self, radius: float, layer_num: int) -> None:
+    '''Circle in xy plane with center in (0, 0, 0). Its border consists of
+    6*layer_num chords. With fan the circle is a single layer of faces
+    around the center instead of layer_num layers'''
+    _mesh_parameters = ('radius', 'layer_num', 'fan')
+
+    def __init__(self, radius: float, layer_num: int,
+                 fan: bool = False) -> None:
         if not isinstance(layer_num, int):
             raise TypeError("layer_num should be integer")
         _throw_if_le_zero(radius, "radius")
@@ -207,24 +532,53 @@ class Circle(Object):
         super().__init__()
         self.radius = radius
         self.layer_num = layer_num
+        self.fan = fan
+        self._defer_tessellation()
+
+    @classmethod
+    def from_tolerance(cls, radius: float, tolerance: float) -> "Circle":
+        '''Creates fan circle with the smallest layer_num for which its
+        border deviates from the exact one by at most tolerance'''
+        _throw_if_le_zero(radius, "radius")
+        return cls(radius, _ring_layer_num(radius, tolerance), fan=True)
+
+    def _local_bounds(self) -> np.ndarray:
+        return np.array([[-self.radius, -self.radius, 0],
+                         [self.radius, self.radius, 0]])
+
+    def analytic_area(self) -> float:
+        return np.pi * self.radius**2
+
+    def analytic_volume(self) -> float:
+        return 0.0
+
+    def _tessellate(self) -> FaceCollection:
+        description = FaceCollection()
         angles = Angle.linspace(Angle(0), Angle(2*np.pi), 7, endpoint=True)
         for lo, hi in pairwise(angles):
             add_descr = CircleSegment._build_segment_quant(
-                    lo, hi, radius, layer_num)
-            self.description = FaceCollection.merge(
-                    self.description, add_descr)
+                    lo, hi, self.radius, self.layer_num, self.fan)
+            description = FaceCollection.merge(description, add_descr)
+        return description
 
 
 class Tube(Object):
     '''Tube parallel to Z axis. Tube center point is in (0, 0, 0)'''
+    _mesh_parameters = ('radius', 'height', 'r_layer_num', 'h_layer_num')
+
     @staticmethod
-    def _connect_layers(faces: FaceCollection, prev_layer: List[Point],
-                        curr_layer: List[Point]) -> None:
-        iterator = zip(pairwise(curr_layer),
-                       pairwise(prev_layer))
-        for (cl, cr), (pl, pr) in iterator:
-            faces.add_face(pl, cr, cl)
-            faces.add_face(pr, cr, pl)
+    def _side_surface(ring: PointArray, heights: np.ndarray) -> FaceCollection:
+        '''Connects copies of the ring moved along Z axis to each of the
+        heights. Ring is expected to be closed, i.e. end with its first point
+        '''
+        layers = np.stack([ring.move(z=h).coords for h in heights])
+        idx = np.arange(len(heights) * len(ring)).reshape(len(heights), -1)
+        pl, pr = idx[:-1, :-1], idx[:-1, 1:]
+        cl, cr = idx[1:, :-1], idx[1:, 1:]
+        faces = np.stack((np.stack((pl, cr, cl), axis=-1),
+                          np.stack((pr, cr, pl), axis=-1)), axis=-2)
+        return FaceCollection.from_arrays(layers.reshape(-1, 3),
+                                          faces.reshape(-1, 3))
 
     def __init__(self, radius: float, height: float, r_layer_num: int,
                  h_layer_num: int) -> None:
@@ -241,23 +595,44 @@ class Tube(Object):
         self.height = height
         self.r_layer_num = r_layer_num
         self.h_layer_num = h_layer_num
-        angles = Angle.linspace(Angle(0), Angle(2*np.pi), 6*r_layer_num + 1,
-                                endpoint=True)
-        heights = np.linspace(0, height, h_layer_num+1, endpoint=True)
-        point_layers = []
-        for h in heights:
-            point_layers.append([
-                    Point.from_spherical(radius, phi, Angle(np.pi/2)).move(z=h)
-                    for phi in angles])
-        for prev, curr in pairwise(point_layers):
-            Tube._connect_layers(self.description, prev, curr)
+        self._defer_tessellation()
+
+    @classmethod
+    def from_tolerance(cls, radius: float, height: float,
+                       tolerance: float) -> "Tube":
+        '''Creates tube which deviates from the exact one by at most
+        tolerance with the smallest number of faces. Side surface is straight
+        along Z axis, so it needs only one layer in height'''
+        _throw_if_le_zero(radius, "radius")
+        return cls(radius, height, _ring_layer_num(radius, tolerance), 1)
+
+    def _local_bounds(self) -> np.ndarray:
+        return np.array([[-self.radius, -self.radius, 0],
+                         [self.radius, self.radius, self.height]])
+
+    def analytic_area(self) -> float:
+        return 2*np.pi * self.radius * self.height
+
+    def analytic_volume(self) -> float:
+        return 0.0
+
+    def _tessellate(self) -> FaceCollection:
+        angles = AngleArray.linspace(Angle(0), Angle(2*np.pi),
+                                     6*self.r_layer_num + 1, endpoint=True)
+        ring = PointArray.from_spherical(self.radius, angles, Angle(np.pi/2))
+        heights = np.linspace(0, self.height, self.h_layer_num+1,
+                              endpoint=True)
+        return Tube._side_surface(ring, heights)
 
 
 class Cylinder(Object):
     '''Simple cylinder parallel to Z axis with base circle center in (0, 0, 0)
-    '''
+    With fan the bases are fan circles, see Circle'''
+    _mesh_parameters = ('radius', 'height', 'r_layer_num', 'h_layer_num',
+                        'fan')
+
     def __init__(self, radius: float, height: float, r_layer_num: int,
-                 h_layer_num: int) -> None:
+                 h_layer_num: int, fan: bool = False) -> None:
         if not isinstance(r_layer_num, int):
             raise TypeError("r_layer_num should be integer")
         if not isinstance(h_layer_num, int):
@@ -271,25 +646,53 @@ class Cylinder(Object):
         self.height = height
         self.r_layer_num = r_layer_num
         self.h_layer_num = h_layer_num
-        bot_descr = Circle(radius, r_layer_num).description
+        self.fan = fan
+        self._defer_tessellation()
+
+    @classmethod
+    def from_tolerance(cls, radius: float, height: float,
+                       tolerance: float) -> "Cylinder":
+        '''Creates cylinder which deviates from the exact one by at most
+        tolerance with the smallest number of faces: fan bases and one layer
+        of the side surface'''
+        _throw_if_le_zero(radius, "radius")
+        return cls(radius, height, _ring_layer_num(radius, tolerance), 1,
+                   fan=True)
+
+    def _local_bounds(self) -> np.ndarray:
+        return np.array([[-self.radius, -self.radius, 0],
+                         [self.radius, self.radius, self.height]])
+
+    def analytic_area(self) -> float:
+        return 2*np.pi * self.radius * (self.radius + self.height)
+
+    def analytic_volume(self) -> float:
+        return np.pi * self.radius**2 * self.height
+
+    def _tessellate(self) -> FaceCollection:
+        radius, height = self.radius, self.height
+        bot_descr = Circle(radius, self.r_layer_num, self.fan).description
         bot_descr.invert()
-        top_base = Circle(radius, r_layer_num).description.move(z=height)
+        top_base = Circle(radius, self.r_layer_num,
+                          self.fan).description.move(z=height)
         top_base.accept_transformations()
-        heights = np.linspace(0, height, h_layer_num+1, endpoint=True)
+        heights = np.linspace(0, height, self.h_layer_num+1, endpoint=True)
         outer = _select_points_with_r(bot_descr.points, radius)
-        point_layers = []
-        for h in heights:
-            point_layers.append([p.move(z=h) for p in _last_cycled(outer)])
-        for prev, curr in pairwise(point_layers):
-            Tube._connect_layers(self.description, prev, curr)
+        ring = PointArray.from_points(_last_cycled(outer))
+        description = Tube._side_surface(ring, heights)
         for descr in (bot_descr, top_base):
-            self.description = FaceCollection.merge(self.description, descr)
+            description = FaceCollection.merge(description, descr)
+        return description
 
 
 class ConeNoBase(Object):
     '''Simple cone parallel to Z axis with base circle center in (0, 0, 0)
-        but without base plane'''
-    def __init__(self, radius: float, height: float, layer_num: int) -> None:
+        but without base plane. With fan its side is a single layer of faces
+        along the generators'''
+    _mesh_parameters = ('radius', 'height', 'layer_num', 'fan')
+
+    def __init__(self, radius: float, height: float, layer_num: int,
+                 fan: bool = False) -> None:
         if not isinstance(layer_num, int):
             raise TypeError("layer_num should be integer")
         _throw_if_le_zero(radius, "radius")
@@ -299,16 +702,47 @@ class ConeNoBase(Object):
         self.radius = radius
         self.height = height
         self.layer_num = layer_num
-        side_descr = Circle(radius, layer_num).description
+        self.fan = fan
+        self._defer_tessellation()
+
+    @classmethod
+    def from_tolerance(cls, radius: float, height: float,
+                       tolerance: float) -> "ConeNoBase":
+        '''Creates fan cone with the smallest layer_num for which its base
+        circle deviates from the exact one by at most tolerance'''
+        _throw_if_le_zero(radius, "radius")
+        return cls(radius, height, _ring_layer_num(radius, tolerance),
+                   fan=True)
+
+    def _local_bounds(self) -> np.ndarray:
+        return np.array([[-self.radius, -self.radius, 0],
+                         [self.radius, self.radius, self.height]])
+
+    def analytic_area(self) -> float:
+        return np.pi * self.radius * np.hypot(self.radius, self.height)
+
+    def analytic_volume(self) -> float:
+        return 0.0
+
+    def _tessellate(self) -> FaceCollection:
+        radius, height = self.radius, self.height
+        description = FaceCollection()
+        side_descr = Circle(radius, self.layer_num, self.fan).description
         for p1, p2, p3 in side_descr.faced_points():
-            self.description.add_face(p1.move(z=(radius - p1.r)/radius*height),
-                                      p2.move(z=(radius - p2.r)/radius*height),
-                                      p3.move(z=(radius - p3.r)/radius*height))
+            description.add_face(p1.move(z=(radius - p1.r)/radius*height),
+                                 p2.move(z=(radius - p2.r)/radius*height),
+                                 p3.move(z=(radius - p3.r)/radius*height))
+        return description
 
 
 class Cone(Object):
-    '''Simple cone parallel to Z axis with base circle center in (0, 0, 0)'''
-    def __init__(self, radius: float, height: float, layer_num: int) -> None:
+    '''Simple cone parallel to Z axis with base circle center in (0, 0, 0).
+    With fan its side and base are single layers of faces, see ConeNoBase
+    and Circle'''
+    _mesh_parameters = ('radius', 'height', 'layer_num', 'fan')
+
+    def __init__(self, radius: float, height: float, layer_num: int,
+                 fan: bool = False) -> None:
         if not isinstance(layer_num, int):
             raise TypeError("layer_num should be integer")
         _throw_if_le_zero(radius, "radius")
@@ -318,28 +752,62 @@ class Cone(Object):
         self.radius = radius
         self.height = height
         self.layer_num = layer_num
-        bot_descr = Circle(radius, layer_num).description
+        self.fan = fan
+        self._defer_tessellation()
+
+    @classmethod
+    def from_tolerance(cls, radius: float, height: float,
+                       tolerance: float) -> "Cone":
+        '''Creates fan cone with the smallest layer_num for which its base
+        circle deviates from the exact one by at most tolerance'''
+        _throw_if_le_zero(radius, "radius")
+        return cls(radius, height, _ring_layer_num(radius, tolerance),
+                   fan=True)
+
+    def _local_bounds(self) -> np.ndarray:
+        return np.array([[-self.radius, -self.radius, 0],
+                         [self.radius, self.radius, self.height]])
+
+    def analytic_area(self) -> float:
+        return np.pi * self.radius * (self.radius +
+                                      np.hypot(self.radius, self.height))
+
+    def analytic_volume(self) -> float:
+        return np.pi * self.radius**2 * self.height / 3
+
+    def _tessellate(self) -> FaceCollection:
+        bot_descr = Circle(self.radius, self.layer_num, self.fan).description
         bot_descr.invert()
-        side_descr = ConeNoBase(radius, height, layer_num).description
-        self.description = FaceCollection.merge(side_descr, bot_descr)
+        side_descr = ConeNoBase(self.radius, self.height, self.layer_num,
+                                self.fan).description
+        return FaceCollection.merge(side_descr, bot_descr)
 
 
 class Sphere(Object):
     '''Simple sphere with center in (0, 0, 0)'''
+    _mesh_parameters = ('radius', 'split_num')
+
     @staticmethod
-    def _between_points_on_sphere(p1: Point, p2: Point) -> Point:
+    def _between_points_on_sphere(p1: PointArray,
+                                  p2: PointArray) -> PointArray:
         '''Expects that p1 and p2 are on the sphere'''
-        ml = Point((p1.x + p2.x)/2,
-                   (p1.y + p2.y)/2,
-                   (p1.z + p2.z)/2)
-        return Point.from_spherical(0.5*(p1.r + p2.r), ml.phi, ml.theta)
+        ml = PointArray((p1.coords + p2.coords)/2)
+        return PointArray.from_spherical(0.5*(p1.r + p2.r), ml.phi, ml.theta)
 
     @staticmethod
-    def _split_face(p1: Point, p2: Point, p3: Point):
-        ml = Sphere._between_points_on_sphere(p1, p2)
-        mr = Sphere._between_points_on_sphere(p2, p3)
-        mb = Sphere._between_points_on_sphere(p1, p3)
-        return ((p1, ml, mb), (ml, mr, mb), (mb, mr, p3), (ml, p2, mr))
+    def _split_faces(faces: np.ndarray) -> np.ndarray:
+        '''Splits each face of (F, 3, 3) array into four faces. Returns
+        (4*F, 3, 3) array where children of each face follow each other'''
+        p1, p2, p3 = (PointArray(faces[:, i]) for i in range(3))
+        ml = Sphere._between_points_on_sphere(p1, p2).coords
+        mr = Sphere._between_points_on_sphere(p2, p3).coords
+        mb = Sphere._between_points_on_sphere(p1, p3).coords
+        p1, p2, p3 = p1.coords, p2.coords, p3.coords
+        return np.stack((np.stack((p1, ml, mb), axis=1),
+                         np.stack((ml, mr, mb), axis=1),
+                         np.stack((mb, mr, p3), axis=1),
+                         np.stack((ml, p2, mr), axis=1)),
+                        axis=1).reshape(-1, 3, 3)
 
     def __init__(self, radius: float, split_num: int) -> None:
         if not isinstance(split_num, int):
@@ -349,33 +817,370 @@ class Sphere(Object):
         super().__init__()
         self.radius = radius
         self.split_num = split_num
+        self._defer_tessellation()
+
+    @staticmethod
+    def _octahedron(radius: float) -> np.ndarray:
         top = Point(0, 0, radius)
         xp = Point(radius, 0, 0)
         yp = Point(0, radius, 0)
         xm = Point(-radius, 0, 0)
         ym = Point(0, -radius, 0)
         bot = Point(0, 0, -radius)
-        faces = ((yp, top, xp), (xm, top, yp), (ym, top, xm), (xp, top, ym),
-                 (xp, bot, yp), (yp, bot, xm), (xm, bot, ym), (ym, bot, xp))
-        for _ in range(split_num-1):
-            faces = reduce(lambda initial, f: initial + Sphere._split_face(*f),
-                           faces, tuple())
-        for f in faces:
-            self.description.add_face(*f)
+        return np.array(((yp, top, xp), (xm, top, yp), (ym, top, xm),
+                         (xp, top, ym), (xp, bot, yp), (yp, bot, xm),
+                         (xm, bot, ym), (ym, bot, xp)), dtype=np.float64)
+
+    @staticmethod
+    def _deviations(faces: np.ndarray) -> np.ndarray:
+        '''Distances between faces of (F, 3, 3) array inscribed into unit
+        sphere and the sphere itself'''
+        normals = np.cross(faces[:, 1] - faces[:, 0],
+                           faces[:, 2] - faces[:, 0])
+        normals /= np.linalg.norm(normals, axis=1, keepdims=True)
+        return 1 - np.abs(np.einsum('ij,ij->i', normals, faces[:, 0]))
+
+    @classmethod
+    def from_tolerance(cls, radius: float, tolerance: float) -> "Sphere":
+        '''Creates sphere with the smallest split_num for which its surface
+        deviates from the exact one by at most tolerance'''
+        _throw_if_le_zero(radius, "radius")
+        _throw_if_le_zero(tolerance, "tolerance")
+        # all octahedron faces are alike and the worst face of every split
+        # is a child of the worst face of the previous one, so following
+        # one face is enough
+        face = cls._octahedron(1.0)[:1]
+        split_num = 1
+        while cls._deviations(face)[0] * radius > tolerance:
+            children = cls._split_faces(face)
+            face = children[[np.argmax(cls._deviations(children))]]
+            split_num += 1
+        return cls(radius, split_num)
+
+    def _local_bounds(self) -> np.ndarray:
+        return np.array([[-self.radius]*3, [self.radius]*3])
+
+    def analytic_area(self) -> float:
+        return 4*np.pi * self.radius**2
+
+    def analytic_volume(self) -> float:
+        return 4/3*np.pi * self.radius**3
+
+    @staticmethod
+    def _split_indexed(vertices: np.ndarray,
+                       faces: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        '''Same as _split_faces for (V, 3) vertex and (F, 3) index arrays,
+        the midpoint of every edge is computed once and shared by both faces
+        of the edge'''
+        edges = np.concatenate((faces[:, [0, 1]], faces[:, [1, 2]],
+                                faces[:, [0, 2]]))
+        edges.sort(axis=1)
+        _, first, inverse = np.unique(edges[:, 0]*len(vertices) +
+                                      edges[:, 1], return_index=True,
+                                      return_inverse=True)
+        ends = edges[first]
+        middles = Sphere._between_points_on_sphere(
+            PointArray(vertices[ends[:, 0]]), PointArray(vertices[ends[:, 1]]))
+        ml, mr, mb = (len(vertices) + inverse.reshape(3, -1))
+        p1, p2, p3 = faces.T
+        faces = np.stack((np.stack((p1, ml, mb), axis=1),
+                          np.stack((ml, mr, mb), axis=1),
+                          np.stack((mb, mr, p3), axis=1),
+                          np.stack((ml, p2, mr), axis=1)),
+                         axis=1).reshape(-1, 3)
+        return np.concatenate((vertices, middles.coords)), faces
+
+    def _tessellate(self) -> FaceCollection:
+        vertices, faces = np.unique(
+            Sphere._octahedron(self.radius).reshape(-1, 3), axis=0,
+            return_inverse=True)
+        faces = faces.reshape(-1, 3)
+        for _ in range(self.split_num-1):
+            vertices, faces = Sphere._split_indexed(vertices, faces)
+        # points are numbered in the order of their first use as add_face
+        # would number them
+        used, first = np.unique(faces, return_index=True)
+        order = used[np.argsort(first)]
+        numbers = np.empty(len(order), dtype=np.int64)
+        numbers[order] = np.arange(len(order))
+        return FaceCollection.from_arrays(vertices[order], numbers[faces],
+                                          weld=False)
 
 
 class World(Object):
     '''Aggregation of different objects'''
+    def __init__(self, precision: str = 'double') -> None:
+        '''precision is the storage precision of the world description,
+        'single' rounds its points to float32 values and halves its vertex
+        and face arrays, see FaceCollection'''
+        super().__init__()
+        self.description = FaceCollection(precision)
+        # transformed descriptions of added objects and their bounds, used
+        # by contact detection
+        self.parts: List[FaceCollection] = []
+        self.part_bounds = np.empty((0, 2, 3))
+        self._part_bvh: Dict[int, BVH] = {}
+        # numbers of points and faces every part added to the description
+        self._part_sizes: List[Tuple[int, int]] = []
+        # journal of save_incremental and changes not written into it yet
+        self._journal: Optional[WorldJournal] = None
+        self._pending: List[tuple] = []
+
+    def _record(self, *change) -> None:
+        if self._journal is not None:
+            self._pending.append(change)
+
+    @staticmethod
+    def _part_bounds(part: FaceCollection) -> np.ndarray:
+        vertices = part.get_vertex_array()
+        if not len(vertices):
+            return np.array([[np.inf]*3, [-np.inf]*3])
+        return np.stack((vertices.min(axis=0), vertices.max(axis=0)))
+
+    def _append_part(self, description: FaceCollection,
+                     part: FaceCollection) -> FaceCollection:
+        '''Appends part to description in place and records what it added.
+        Empty description is replaced by a clone of part, so that they share
+        geometry'''
+        point_num, face_num = len(description.points), len(description.faces)
+        if not description.faces:
+            description = FaceCollection.merge(description, part)
+        else:
+            description.extend(part)
+        self._part_sizes.append((len(description.points) - point_num,
+                                 len(description.faces) - face_num))
+        return description
+
+    def _add_part(self, part: FaceCollection) -> None:
+        self.description = self._append_part(self.description, part)
+        self.parts.append(part)
+        self.part_bounds = np.concatenate((self.part_bounds,
+                                           self._part_bounds(part)[None]))
+        self._record('add', part)
+
     def add_object(self, obj: Object) -> None:
         '''Adds object to the world'''
-        if (any(x != 0 for x in self.description.moves.values()) or
-            any(x != Angle(0) for x in self.description.rotations.values())):
+        if self.description.has_transformations():
             raise RuntimeError("Cannot add object to the world with not"
                                "accepted transformations")
         if not isinstance(obj, Object):
             raise TypeError("Only object can be added to the world")
-        input_description = FaceCollection()
-        input_description.points = obj.description.get_transformed_points()
-        input_description.faces = deepcopy(obj.description.faces)
-        self.description = FaceCollection.merge(self.description,
-                                                input_description)
+        # shares geometry with the object unless it has queued transformations
+        input_description = obj.description.clone()
+        input_description.accept_transformations()
+        self._add_part(input_description)
+
+    def remove_object(self, index: int) -> None:
+        '''Removes object with the given number (order of add_object among
+        remaining objects) from the world'''
+        if not -len(self.parts) <= index < len(self.parts):
+            raise IndexError(f"index is {index}, but world has "
+                             f"{len(self.parts)} objects.")
+        index %= len(self.parts)
+        spliced = self._splice_part(index)
+        del self.parts[index]
+        self.part_bounds = np.delete(self.part_bounds, index, axis=0)
+        self._part_bvh.clear()
+        if spliced:
+            del self._part_sizes[index]
+        else:
+            self._rebuild_description()
+        self._record('remove', index)
+
+    def _splice_part(self, index: int) -> bool:
+        '''Removes points and faces added by the part from the description
+        and renumbers the later ones, which gives the same description as
+        adding the remaining parts one by one. Only the part and points
+        added after it are touched. Returns False without changes when
+        added points and faces cannot be told apart: later parts use points
+        of the part or lost faces equal to its faces, or the description
+        was changed directly'''
+        description = self.description
+        sizes = np.array(self._part_sizes, dtype=np.int64).reshape(-1, 2)
+        if sizes.sum(axis=0).tolist() != [len(description.points),
+                                          len(description.faces)]:
+            return False
+        later = zip(self.parts[index+1:], sizes[index+1:, 1])
+        if any(len(part.faces) != face_num for part, face_num in later):
+            return False
+        point_from, face_from = sizes[:index].sum(axis=0).tolist()
+        point_num, face_num = sizes[index].tolist()
+        point_to = point_from + point_num
+        tail = np.array(list(islice(description.faces, face_from + face_num,
+                                    None)), dtype=np.int64).reshape(-1, 3)
+        if np.any((tail >= point_from) & (tail < point_to)):
+            return False
+        tail[tail >= point_to] -= point_num
+        points = description.points.copy()
+        index_of = points.point_to_index
+        moved = list(islice(index_of.items(), point_from, None))
+        for p, _ in moved[:point_num]:
+            del index_of[p]
+        for p, i in moved[point_num:]:
+            index_of[p] = i - point_num
+        points.next_index -= point_num
+        description.points = points
+        description.faces = (list(islice(description.faces, face_from)) +
+                             list(zip(*tail.T.tolist())))
+        return True
+
+    def _rebuild_description(self) -> None:
+        '''Builds description from parts, it equals the result of adding
+        them one by one'''
+        description = FaceCollection(self.description.precision)
+        self._part_sizes = []
+        for part in self.parts:
+            description = self._append_part(description, part)
+        description.moves = self.description.moves
+        description.rotations = self.description.rotations
+        self.description = description
+
+    def move(self, x: float = 0, y: float = 0, z: float = 0) -> None:
+        super().move(x, y, z)
+        self._record('move', x, y, z)
+
+    def rotate(self, x=Angle(0), y=Angle(0), z=Angle(0)) -> None:
+        super().rotate(x, y, z)
+        self._record('rotate', x.value, y.value, z.value)
+
+    def accept_transformations(self) -> None:
+        '''Applies queued transformations to the world and all its
+        objects'''
+        for part in self.parts:
+            part.moves = dict(self.description.moves)
+            part.rotations = dict(self.description.rotations)
+            part.accept_transformations()
+        super().accept_transformations()
+        self.part_bounds = np.array([self._part_bounds(p)
+                                     for p in self.parts]).reshape(-1, 2, 3)
+        self._part_bvh.clear()
+        self._record('accept')
+
+    def snapshot_content(self) -> dict:
+        '''Content of the world for WorldJournal snapshots. Parts are
+        clones, so capturing it is cheap and later changes of the world do
+        not affect it'''
+        return {"precision": self.description.precision,
+                "moves": dict(self.description.moves),
+                "rotations": {k: a.value for k, a in
+                              self.description.rotations.items()},
+                "parts": [p.clone() for p in self.parts]}
+
+    @staticmethod
+    def _change_dict(change: tuple) -> dict:
+        kind, *args = change
+        if kind == 'add':
+            return {"op": kind, "part": args[0].to_dict()}
+        if kind == 'remove':
+            return {"op": kind, "index": args[0]}
+        if kind in ('move', 'rotate'):
+            return {"op": kind, **dict(zip('xyz', args))}
+        return {"op": kind}
+
+    def _apply_change(self, change: dict) -> None:
+        kind = change['op']
+        if kind == 'add':
+            self._add_part(FaceCollection.from_dict(change['part']))
+        elif kind == 'remove':
+            self.remove_object(change['index'])
+        elif kind == 'move':
+            self.move(change['x'], change['y'], change['z'])
+        elif kind == 'rotate':
+            self.rotate(*(Angle(change[k]) for k in 'xyz'))
+        elif kind == 'accept':
+            self.accept_transformations()
+        else:
+            raise ValueError(f"Unknown change '{kind}' in the journal.")
+
+    def save_incremental(self, filename: str,
+                         compact: bool = False) -> None:
+        '''Saves the world in time proportional to the changes made since
+        the previous call. The first call for a file writes a snapshot of
+        the whole world, later calls append additions and removals of
+        objects and transformations of the world to the journal next to it
+        (see WorldJournal). When the journal outgrows the snapshot, it is
+        compacted in background, compact=True compacts it right away'''
+        if self._journal is None or self._journal.filename != Path(filename):
+            self._journal = WorldJournal(filename)
+            self._pending = []
+            self._journal.create(self.snapshot_content())
+            return
+        self._journal.append([self._change_dict(c) for c in self._pending])
+        self._pending = []
+        if compact:
+            self._journal.compact(self.snapshot_content())
+        elif self._journal.journal_size() > self._journal.snapshot_size():
+            self._journal.compact(self.snapshot_content(), background=True)
+
+    def wait_for_compaction(self) -> None:
+        if self._journal is not None:
+            self._journal.wait()
+
+    @classmethod
+    def from_journal(cls, filename: str) -> 'World':
+        '''Loads world saved by save_incremental: reads the snapshot and
+        replays the journal. Later save_incremental calls with the same
+        filename continue the journal'''
+        journal = WorldJournal(filename)
+        content, changes = journal.load()
+        result = cls(content['precision'])
+        result.parts = content['parts']
+        result.part_bounds = np.array([cls._part_bounds(p) for p in
+                                       result.parts]).reshape(-1, 2, 3)
+        result._rebuild_description()
+        result.description.moves = content['moves']
+        result.description.rotations = {k: Angle(v) for k, v in
+                                        content['rotations'].items()}
+        for change in changes:
+            result._apply_change(change)
+        result._journal = journal
+        return result
+
+    def object_mass_properties(self, density: float = 1.0
+                               ) -> List[mass.MassProperties]:
+        '''Returns mass properties of every object of the world (in order
+        of add_object) with queued world transformations applied, computed
+        in one pass over all faces'''
+        vertices, faces, groups = [], [], []
+        offset = 0
+        for i, part in enumerate(self.parts):
+            moved = part.clone()
+            moved.moves = dict(self.description.moves)
+            moved.rotations = dict(self.description.rotations)
+            vertices.append(moved.get_transformed_vertex_array())
+            faces.append(part.get_face_array() + offset)
+            groups.append(np.full(len(faces[-1]), i))
+            offset += len(vertices[-1])
+        if not self.parts:
+            return []
+        return mass.grouped_mass_properties(
+                np.concatenate(vertices), np.concatenate(faces),
+                np.concatenate(groups), len(self.parts), density)
+
+    def _get_part_bvh(self, index: int) -> BVH:
+        bvh = self._part_bvh.get(index)
+        if bvh is None:
+            bvh = self._part_bvh[index] = BVH.from_collection(
+                    self.parts[index])
+        return bvh
+
+    def overlapping_parts(self) -> np.ndarray:
+        '''Pairs (i, j) of added objects whose bounding boxes overlap,
+        found by sweep and prune'''
+        return collision.sweep_and_prune(self.part_bounds[:, 0],
+                                         self.part_bounds[:, 1])
+
+    def find_contacts(self) -> List[collision.Contact]:
+        '''Finds intersecting pairs of added objects. Objects are numbered
+        in the order of add_object, face ids are row numbers of
+        get_face_array of the corresponding parts. Hierarchies of objects
+        are built only for candidate pairs of the broad phase and reused by
+        later calls'''
+        contacts = []
+        for i, j in self.overlapping_parts():
+            faces, other_faces = collision.intersecting_faces(
+                    self._get_part_bvh(i), self._get_part_bvh(j))
+            if len(faces):
+                contacts.append(collision.Contact(int(i), int(j), faces,
+                                                  other_faces))
+        return contacts
@@ -0,0 +1,89 @@
+from typing import Optional, Sequence, Tuple
+import numpy as np
+
+
+def _normals(vertices: np.ndarray, faces: np.ndarray) -> np.ndarray:
+    triangles = vertices[faces]
+    return np.cross(triangles[:, 1] - triangles[:, 0],
+                    triangles[:, 2] - triangles[:, 0])
+
+
+def view_angles(view_direction: Sequence[float]) -> Tuple[float, float]:
+    '''Elevation and azimuth (degrees, as in Axes3D.view_init) of the camera
+    looking along view_direction'''
+    d = -np.asarray(view_direction, dtype=np.float64)
+    d /= np.linalg.norm(d)
+    return (float(np.degrees(np.arcsin(np.clip(d[2], -1, 1)))),
+            float(np.degrees(np.arctan2(d[1], d[0]))))
+
+
+def back_faces(vertices: np.ndarray, faces: np.ndarray,
+               view_direction: Sequence[float]) -> np.ndarray:
+    '''Mask of faces turned away from the camera looking along
+    view_direction (orthographic view). Meaningful for closed outward
+    oriented surfaces only'''
+    return _normals(vertices, faces) @ np.asarray(view_direction,
+                                                  dtype=np.float64) >= 0
+
+
+def outside_box(vertices: np.ndarray, faces: np.ndarray,
+                box_min: Sequence[float],
+                box_max: Sequence[float]) -> np.ndarray:
+    '''Mask of faces whose bounding boxes do not overlap the given box, such
+    as the view volume of axes limits'''
+    triangles = vertices[faces]
+    return (np.any(triangles.min(axis=1) > box_max, axis=1) |
+            np.any(triangles.max(axis=1) < box_min, axis=1))
+
+
+def cluster_vertices(vertices: np.ndarray, faces: np.ndarray,
+                     cell_size: float) -> Tuple[np.ndarray, np.ndarray]:
+    '''Decimates mesh by vertex clustering: vertices in the same cubic cell
+    of the grid are replaced by their mean, faces which become degenerate
+    or duplicated are dropped. Details smaller than a cell disappear, but
+    no holes appear in the surface. Returns (vertices, faces) of the
+    result, only vertices used by faces are kept'''
+    if not len(faces):
+        return np.empty((0, 3)), np.empty((0, 3), dtype=np.int64)
+    used, inverse = np.unique(faces, return_inverse=True)
+    cells = np.floor(vertices[used] / cell_size).astype(np.int64)
+    _, cluster = np.unique(cells, axis=0, return_inverse=True)
+    cluster = cluster.reshape(-1)
+    count = np.bincount(cluster)
+    result = np.stack([np.bincount(cluster, vertices[used][:, k]) / count
+                       for k in range(3)], axis=1)
+    faces = cluster[inverse.reshape(faces.shape)]
+    valid = ((faces[:, 0] != faces[:, 1]) & (faces[:, 1] != faces[:, 2]) &
+             (faces[:, 0] != faces[:, 2]))
+    faces = faces[valid]
+    _, first = np.unique(np.sort(faces, axis=1), axis=0, return_index=True)
+    return result, faces[np.sort(first)]
+
+
+def unique_edges(faces: np.ndarray) -> np.ndarray:
+    '''(E, 2) array of edges of faces, every edge shared by several faces is
+    listed once'''
+    edges = np.sort(faces[:, [0, 1, 1, 2, 2, 0]].reshape(-1, 2), axis=1)
+    return np.unique(edges, axis=0)
+
+
+def prepare_mesh(vertices: np.ndarray, faces: np.ndarray,
+                 view_direction: Optional[Sequence[float]] = None,
+                 limits: Optional[Tuple[Sequence[float],
+                                        Sequence[float]]] = None,
+                 cell_size: float = 0) -> Tuple[np.ndarray, np.ndarray]:
+    '''Culls faces for plotting: faces outside limits (min corner, max
+    corner) and, if view_direction is given, back faces are removed, then
+    the rest is decimated by vertex clustering with cell_size (when it is
+    positive)'''
+    vertices = np.asarray(vertices, dtype=np.float64).reshape(-1, 3)
+    faces = np.asarray(faces, dtype=np.int64).reshape(-1, 3)
+    culled = np.zeros(len(faces), dtype=bool)
+    if limits is not None:
+        culled |= outside_box(vertices, faces, *limits)
+    if view_direction is not None:
+        culled |= back_faces(vertices, faces, view_direction)
+    faces = faces[~culled]
+    if cell_size > 0:
+        vertices, faces = cluster_vertices(vertices, faces, cell_size)
+    return vertices, faces
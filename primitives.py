@@ -1,8 +1,23 @@
-from typing import List, Iterable, NamedTuple
+from collections.abc import Mapping
+from itertools import islice
+from typing import Iterator, List, Iterable, NamedTuple, Tuple
 import json
-from collections import namedtuple
+import hashlib
+import os
 import numpy as np
 
+from topology import MeshAdjacency, consistent_orientation
+from mass import MassProperties, mass_properties
+from shared_mesh import SharedMesh
+
+
+# Number of decimal digits which are taken into account when points are
+# compared with each other
+POINT_DECIMALS = 10
+# Storage precisions of FaceCollection: dtypes of vertex and index arrays
+PRECISIONS = {'double': (np.float64, np.int64),
+              'single': (np.float32, np.int32)}
+
 
 class Angle:
     '''Simple class that guaranties that stored value will be between (0, 2*pi)
@@ -41,19 +56,69 @@ class Angle:
         return str(self)
 
     @staticmethod
-    def convert(data: Iterable) -> List['Angle']:
-        return [Angle(val) for val in data]
+    def convert(data: Iterable) -> 'AngleArray':
+        return AngleArray(list(data))
 
     @staticmethod
     def linspace(lo: 'Angle', hi: 'Angle', pt_num: int,
-                 endpoint=True) -> List['Angle']:
+                 endpoint=True) -> 'AngleArray':
+        return AngleArray.linspace(lo, hi, pt_num, endpoint=endpoint)
+
+
+def _normalize_angles(values: np.ndarray) -> np.ndarray:
+    '''Vectorized version of Angle normalization into (0, 2*pi)'''
+    values = values - np.trunc(values/(2*np.pi))*2*np.pi
+    return np.where(values < 0, values + 2*np.pi, values)
+
+
+class AngleArray:
+    '''Array of angles. Guaranties that stored values will be between
+    (0, 2*pi) exactly as for Angle. Indexing with integer returns Angle'''
+    def __init__(self, values: Iterable = ()) -> None:
+        self.value = _normalize_angles(
+                np.asarray(values, dtype=np.float64).reshape(-1))
+
+    def __len__(self) -> int:
+        return len(self.value)
+
+    def __iter__(self):
+        return map(Angle, self.value.tolist())
+
+    def __getitem__(self, index):
+        if isinstance(index, (int, np.integer)):
+            return Angle(float(self.value[index]))
+        return AngleArray(self.value[index])
+
+    def __eq__(self, other: 'AngleArray') -> bool:
+        return np.array_equal(self.value, other.value)
+
+    def __add__(self, other) -> 'AngleArray':
+        return AngleArray(self.value + other.value)
+
+    def __sub__(self, other) -> 'AngleArray':
+        return AngleArray(self.value - other.value)
+
+    def __str__(self) -> str:
+        return str(self.value)
+
+    def __repr__(self) -> str:
+        return str(self)
+
+    def to_angles(self) -> List[Angle]:
+        return list(self)
+
+    @staticmethod
+    def linspace(lo: Angle, hi: Angle, pt_num: int,
+                 endpoint=True) -> 'AngleArray':
+        '''Evenly spaced angles from lo to hi. Zero hi angle is treated as
+        2*pi, so that the full circle can be covered'''
         if hi.value != 0 and lo.value > hi.value:
             raise RuntimeError("Incorrect boundaries for creating set")
         top_val = hi.value
         if hi.value == 0 and lo.value >= 0:
             top_val = 2*np.pi
-        return Angle.convert(np.linspace(lo.value, top_val, pt_num,
-                                         endpoint=endpoint))
+        return AngleArray(np.linspace(lo.value, top_val, pt_num,
+                                      endpoint=endpoint))
 
 
 class Point(NamedTuple):
@@ -63,16 +128,18 @@ class Point(NamedTuple):
 
     @staticmethod
     def _round(num: float) -> float:
-        return round(num, 10)
+        return round(num, POINT_DECIMALS)
 
     def __hash__(self) -> int:
-        return hash((self._round(self.x), self._round(self.y),
-                     self._round(self.z)))
+        digits = POINT_DECIMALS
+        return hash((round(self.x, digits), round(self.y, digits),
+                     round(self.z, digits)))
 
     def __eq__(self, other: 'Point') -> bool:
-        lhs = (self._round(self.x), self._round(self.y), self._round(self.z))
-        rhs = (self._round(other.x), self._round(other.y), self._round(other.z))
-        return lhs == rhs
+        digits = POINT_DECIMALS
+        return (round(self.x, digits) == round(other.x, digits) and
+                round(self.y, digits) == round(other.y, digits) and
+                round(self.z, digits) == round(other.z, digits))
 
     @property
     def r(self) -> float:
@@ -139,11 +206,189 @@ class Vector(NamedTuple):
         return Vector(x, y, z)
 
 
+def _angle_values(angle) -> np.ndarray:
+    '''Returns radian values of Angle, AngleArray or array-like of floats'''
+    if isinstance(angle, (Angle, AngleArray)):
+        return angle.value
+    return np.asarray(angle, dtype=np.float64)
+
+
+class PointArray:
+    '''Batch of points stored as (N, 3) array of coordinates. Provides the
+    same operations as Point, but performs them for all points at once'''
+    def __init__(self, coords: Iterable = ()) -> None:
+        self.coords = np.asarray(coords, dtype=np.float64).reshape(-1, 3)
+
+    def __len__(self) -> int:
+        return len(self.coords)
+
+    def __iter__(self):
+        return map(Point._make, self.coords.tolist())
+
+    def __getitem__(self, index):
+        if isinstance(index, (int, np.integer)):
+            return Point._make(self.coords[index].tolist())
+        return PointArray(self.coords[index])
+
+    def __str__(self) -> str:
+        return str(self.coords)
+
+    def __repr__(self) -> str:
+        return str(self)
+
+    @classmethod
+    def from_points(cls, points: Iterable[Point]) -> 'PointArray':
+        return cls(list(points))
+
+    def to_points(self) -> List[Point]:
+        return list(self)
+
+    @property
+    def x(self) -> np.ndarray:
+        return self.coords[:, 0]
+
+    @property
+    def y(self) -> np.ndarray:
+        return self.coords[:, 1]
+
+    @property
+    def z(self) -> np.ndarray:
+        return self.coords[:, 2]
+
+    @property
+    def r(self) -> np.ndarray:
+        return np.sqrt(self.x**2 + self.y**2 + self.z**2)
+
+    @property
+    def phi(self) -> AngleArray:
+        return AngleArray(np.arctan2(self.y, self.x))
+
+    @property
+    def theta(self) -> AngleArray:
+        return AngleArray(np.arctan2(np.sqrt(self.x**2 + self.y**2), self.z))
+
+    @classmethod
+    def from_spherical(cls, r, phi, theta) -> 'PointArray':
+        '''Arguments can be scalars, Angles, AngleArrays or arrays. They are
+        broadcasted against each other'''
+        r = np.asarray(r, dtype=np.float64)
+        phi = _angle_values(phi)
+        theta = _angle_values(theta)
+        return cls(np.stack(np.broadcast_arrays(
+                r * np.cos(phi) * np.sin(theta),
+                r * np.sin(phi) * np.sin(theta),
+                r * np.cos(theta)), axis=-1))
+
+    def move(self, x: float = 0, y: float = 0, z: float = 0) -> 'PointArray':
+        '''Creates new array with coordinates shifted according to the
+        arguments.
+        '''
+        return PointArray(self.coords + (x, y, z))
+
+    def rotate_x(self, angle: Angle) -> 'PointArray':
+        '''Rotates all points around x axis according to the right hand
+        rule. Result of rotation is returned as new array'''
+        cos, sin = np.cos(angle.value), np.sin(angle.value)
+        return PointArray(np.stack((self.x,
+                                    cos*self.y - sin*self.z,
+                                    sin*self.y + cos*self.z), axis=1))
+
+    def rotate_y(self, angle: Angle) -> 'PointArray':
+        '''Rotates all points around y axis according to the right hand
+        rule. Result of rotation is returned as new array'''
+        cos, sin = np.cos(angle.value), np.sin(angle.value)
+        return PointArray(np.stack((cos*self.x + sin*self.z,
+                                    self.y,
+                                    -sin*self.x + cos*self.z), axis=1))
+
+    def rotate_z(self, angle: Angle) -> 'PointArray':
+        '''Rotates all points around z axis according to the right hand
+        rule. Result of rotation is returned as new array'''
+        cos, sin = np.cos(angle.value), np.sin(angle.value)
+        return PointArray(np.stack((cos*self.x - sin*self.y,
+                                    sin*self.x + cos*self.y,
+                                    self.z), axis=1))
+
+
+class VectorArray:
+    '''Batch of vectors stored as (N, 3) array of coordinates'''
+    def __init__(self, coords: Iterable = ()) -> None:
+        self.coords = np.asarray(coords, dtype=np.float64).reshape(-1, 3)
+
+    def __len__(self) -> int:
+        return len(self.coords)
+
+    def __iter__(self):
+        return map(Vector._make, self.coords.tolist())
+
+    def __getitem__(self, index):
+        if isinstance(index, (int, np.integer)):
+            return Vector._make(self.coords[index].tolist())
+        return VectorArray(self.coords[index])
+
+    def __str__(self) -> str:
+        return str(self.coords)
+
+    def __repr__(self) -> str:
+        return str(self)
+
+    @classmethod
+    def from_vectors(cls, vectors: Iterable[Vector]) -> 'VectorArray':
+        return cls(list(vectors))
+
+    @classmethod
+    def from_points(cls, start: PointArray, end: PointArray) -> 'VectorArray':
+        return cls(end.coords - start.coords)
+
+    def to_vectors(self) -> List[Vector]:
+        return list(self)
+
+    def dot(self, other: 'VectorArray') -> np.ndarray:
+        return (self.coords * other.coords).sum(axis=1)
+
+    def cross(self, other: 'VectorArray') -> 'VectorArray':
+        return VectorArray(np.cross(self.coords, other.coords))
+
+    def norm(self) -> np.ndarray:
+        return np.sqrt(self.dot(self))
+
+    def angle(self, other: 'VectorArray') -> np.ndarray:
+        '''Returns angles between corresponding vectors in range (0, pi)'''
+        return np.arctan2(self.cross(other).norm(), self.dot(other))
+
+
 class PointCollection:
+    '''Points numbered in the order of addition, equal points share one
+    index. Collections created by from_array keep the array and build the
+    lookup of indices by point only when it is needed'''
 
     def __init__(self) -> None:
         self.next_index = 0
-        self.point_to_index = {}
+        self._point_to_index = {}
+        # read-only (N, 3) array of points while the lookup is not built
+        self._coords = None
+        # collections shared by FaceCollection clones are not modified
+        self.read_only = False
+
+    @property
+    def point_to_index(self) -> dict:
+        if self._coords is not None:
+            index = dict(zip(map(Point._make, self._coords.tolist()),
+                             range(len(self._coords))))
+            if len(index) != len(self._coords):
+                raise ValueError("Coordinates contain coinciding points")
+            self.point_to_index = index
+        return self._point_to_index
+
+    @point_to_index.setter
+    def point_to_index(self, point_to_index: dict) -> None:
+        self._point_to_index = point_to_index
+        self._coords = None
+
+    def _check_writable(self) -> None:
+        if self.read_only:
+            raise ValueError("PointCollection is shared by FaceCollection "
+                             "clones and cannot be modified, use its copy.")
 
     def __eq__(self, other: 'PointCollection') -> bool:
         return (self.next_index == other.next_index and
@@ -156,51 +401,363 @@ class PointCollection:
         return str(self)
 
     def __iter__(self):
-        return iter(self.point_to_index)
+        if self._coords is not None:
+            return map(Point._make, self._coords.tolist())
+        return iter(self._point_to_index)
 
     def __len__(self):
-        return len(self.point_to_index)
+        if self._coords is not None:
+            return len(self._coords)
+        return len(self._point_to_index)
 
     def add_point(self, p: Point) -> int:
         if not isinstance(p, Point):
             raise TypeError("PointCollection should contain only Points")
-        if p not in self.point_to_index:
-            self.point_to_index[p] = self.next_index
+        self._check_writable()
+        index = self.point_to_index.setdefault(p, self.next_index)
+        if index == self.next_index:
             self.next_index += 1
-        return self.point_to_index[p]
+        return index
 
     def get_point(self, index: int) -> Point:
-        return list(self.point_to_index)[index]
+        if self._coords is not None:
+            return Point._make(self._coords[index].tolist())
+        return list(self._point_to_index)[index]
+
+    def copy(self) -> 'PointCollection':
+        result = PointCollection()
+        result.next_index = self.next_index
+        if self._coords is not None:
+            result._coords = self._coords
+        else:
+            result.point_to_index = dict(self._point_to_index)
+        return result
+
+    @classmethod
+    def from_array(cls, coords: np.ndarray,
+                   dtype=np.float64) -> 'PointCollection':
+        '''Creates collection from (N, 3) array of coordinates. Point from
+        the row i receives index i, therefore rows should be distinct points.
+        The array is copied with the given dtype and the lookup of points is
+        built (and rows are checked) only when a point is added or
+        point_to_index is used
+        '''
+        result = cls()
+        result._coords = np.array(coords, dtype=dtype).reshape(-1, 3)
+        result._coords.flags.writeable = False
+        result.next_index = len(result._coords)
+        return result
+
+    def to_array(self, dtype=np.float64) -> np.ndarray:
+        '''Returns (N, 3) array of point coordinates ordered by point index'''
+        if self._coords is not None:
+            return self._coords.astype(dtype)
+        return np.array(list(self._point_to_index),
+                        dtype=dtype).reshape(-1, 3)
 
     def move(self, x: float = 0, y: float = 0, z: float = 0,
              inplace: bool = False) -> 'PointCollection':
+        if inplace:
+            self._check_writable()
         new_pc = PointCollection()
-        for p in self.point_to_index:
+        for p in self:
             new_pc.add_point(p.move(x, y, z))
         if inplace:
             self.point_to_index = new_pc.point_to_index
+            self.next_index = new_pc.next_index
         return new_pc
 
 
-class FaceCollection:
+def _check_precision(precision: str) -> None:
+    if precision not in PRECISIONS:
+        raise ValueError(f"precision is {precision}, but should be one of "
+                         f"{list(PRECISIONS)}.")
+
+
+def _point_keys(coords: np.ndarray) -> np.ndarray:
+    '''Rounds (N, 3) coordinates exactly as Point comparison does. numpy
+    rounds scaled values, which may differ from python only for values
+    whose scaled fraction is closer to 0.5 than the scaling error, such
+    values are rounded by python'''
+    keys = np.round(coords, POINT_DECIMALS)
+    scaled = np.abs(coords) * 10.0**POINT_DECIMALS
+    ties = np.abs(scaled - np.floor(scaled) - 0.5) <= np.spacing(scaled)
+    keys[ties] = [round(v, POINT_DECIMALS) for v in coords[ties].tolist()]
+    # adding zero turns -0.0 into 0.0, they are equal points
+    return keys + 0.0
+
+
+def _group_keys(keys: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    '''Groups equal values of 1d array, see _group_rows'''
+    order = np.argsort(keys)
+    ordered = keys[order]
+    starts = np.ones(len(keys), dtype=bool)
+    starts[1:] = ordered[1:] != ordered[:-1]
+    first = np.minimum.reduceat(order, np.flatnonzero(starts))
+    rank = np.empty(len(first), dtype=np.int64)
+    rank[np.argsort(first)] = np.arange(len(first))
+    inverse = np.empty(len(keys), dtype=np.int64)
+    inverse[order] = rank[np.cumsum(starts) - 1]
+    return inverse, np.sort(first)
+
+
+def _group_rows(rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    '''Finds equal rows of (N, K) array of 8 byte values. Returns group
+    number of every row and the first row of every group, groups are
+    numbered in the order of their first rows. Rows are grouped by their
+    hashes, which is much faster than lexicographic sorting, rows are
+    sorted only if different rows turn out to have equal hashes'''
+    if not len(rows):
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    bits = np.ascontiguousarray(rows).view(np.uint64)
+    hashes = np.zeros(len(bits), dtype=np.uint64)
+    for column in bits.T:
+        hashes ^= column
+        hashes *= np.uint64(0x9E3779B97F4A7C15)
+        hashes ^= hashes >> np.uint64(29)
+    inverse, first = _group_keys(hashes)
+    if np.array_equal(bits[first][inverse], bits):
+        return inverse, first
+    return _group_keys(bits.view(np.dtype((np.void, bits.strides[0])))
+                       .reshape(-1))
+
+
+class FaceView(Mapping):
+    '''Read-only view of faces of FaceCollection, which follows its
+    changes. Faces are tuples of point indices in insertion order, they
+    behave as keys of a dict with None values'''
+
+    def __init__(self, collection: 'FaceCollection') -> None:
+        self._collection = collection
+
+    def __len__(self) -> int:
+        return self._collection._face_num()
+
+    def __iter__(self) -> Iterator[tuple]:
+        return self._collection._iter_faces()
+
+    def __contains__(self, face) -> bool:
+        return face in self._collection._face_dict()
+
+    def __getitem__(self, face) -> None:
+        if face not in self:
+            raise KeyError(face)
+        return None
 
-    def __init__(self) -> None:
+    def __repr__(self) -> str:
+        return f'FaceView({list(self)})'
+
+
+class FaceCollection:
+    '''Triangle mesh stored as points and faces with queued
+    transformations. With 'single' precision all coordinates are rounded to
+    float32 values when they are stored, array accessors return float32
+    vertices and int32 faces. Points which become equal after this rounding
+    are welded together, so Point comparison keeps working on the stored
+    values.
+    Collections made by clone share points and faces, which are read-only
+    while they are shared: faces are returned as a read-only view and
+    shared points reject modifications. Every collection copies shared
+    buffers before it modifies them in place.
+    Collections built from arrays keep points and faces as arrays of the
+    storage dtypes, so 'single' precision halves their memory. Dicts used
+    for adding faces hold Python floats and ints in both precisions, they
+    are built only by the first modification'''
+
+    def __init__(self, precision: str = 'double') -> None:
+        _check_precision(precision)
+        self.precision = precision
         self.points = PointCollection()
-        self.faces = set()
+        self.faces = {}
         self.moves = {'x': 0, 'y': 0, 'z': 0}
         self.rotations = {'x': Angle(0), 'y': Angle(0), 'z': Angle(0)}
 
+    @property
+    def faces(self) -> FaceView:
+        '''Read-only view of faces as tuples of point indices. They are
+        stored as dict keys, which behaves as a set that keeps insertion
+        order'''
+        return FaceView(self)
+
+    @faces.setter
+    def faces(self, faces: Iterable) -> None:
+        self._faces = dict.fromkeys(faces)
+        self._face_rows = None
+        self._faces_shared = False
+        self._adjacency = None
+
+    def _set_face_rows(self, rows: np.ndarray) -> None:
+        '''Stores faces given as (F, 3) array of distinct rows without
+        building the dict of faces'''
+        self._face_rows = np.array(rows,
+                                   dtype=self.index_dtype).reshape(-1, 3)
+        self._face_rows.flags.writeable = False
+        self._faces = None
+        self._faces_shared = False
+        self._adjacency = None
+
+    def _face_dict(self) -> dict:
+        '''Returns dict of faces, builds it when faces are stored as array'''
+        if self._faces is None:
+            self._faces = dict.fromkeys(zip(*self._face_rows.T.tolist()))
+            self._face_rows = None
+        return self._faces
+
+    def _face_num(self) -> int:
+        if self._faces is None:
+            return len(self._face_rows)
+        return len(self._faces)
+
+    def _iter_faces(self) -> Iterator[tuple]:
+        if self._faces is None:
+            return zip(*self._face_rows.T.tolist())
+        return iter(self._faces)
+
+    def clone(self) -> 'FaceCollection':
+        '''Returns copy of the collection in O(1). Points and faces are
+        shared with the copy and duplicated only by the first in place
+        modification (add_face, extend) of either collection, so read-only
+        users never copy the geometry. Queued transformations are copied'''
+        result = FaceCollection.__new__(FaceCollection)
+        result.precision = self.precision
+        result.points = self.points
+        result._faces, result._face_rows = self._faces, self._face_rows
+        self.points.read_only = True
+        # face arrays are never modified, so only dicts are shared
+        self._faces_shared = result._faces_shared = self._faces is not None
+        result._adjacency = self._adjacency
+        result.moves = dict(self.moves)
+        result.rotations = dict(self.rotations)
+        return result
+
+    def shares_geometry(self, other: 'FaceCollection') -> bool:
+        '''Checks whether the collection uses the same points and faces as
+        other, see clone'''
+        return (self.points is other.points and
+                self._faces is other._faces and
+                self._face_rows is other._face_rows)
+
+    def _own_buffers(self) -> None:
+        '''Copies points and faces shared with clones before they are
+        modified in place'''
+        if self.points.read_only:
+            self.points = self.points.copy()
+        if self._faces_shared:
+            self._faces = dict(self._faces)
+            self._faces_shared = False
+
+    def get_adjacency(self) -> MeshAdjacency:
+        '''Returns adjacency tables of the collection. Face ids of the
+        tables are row numbers of get_face_array. Tables are built once and
+        reused until faces of the collection are changed'''
+        if self._adjacency is None:
+            self._adjacency = MeshAdjacency(self.get_face_array(),
+                                            len(self.points))
+        return self._adjacency
+
     def faced_points(self):
         '''Iterates over faces returning vertex points'''
+        points = list(self.points)
         for f in self.faces:
-            yield (self.points.get_point(f[0]),
-                   self.points.get_point(f[1]),
-                   self.points.get_point(f[2]))
+            yield (points[f[0]], points[f[1]], points[f[2]])
+
+    @property
+    def vertex_dtype(self):
+        return PRECISIONS[self.precision][0]
+
+    @property
+    def index_dtype(self):
+        return PRECISIONS[self.precision][1]
+
+    def _quantize(self, coords: np.ndarray) -> np.ndarray:
+        '''Rounds coordinates to values representable with the storage
+        precision'''
+        return np.asarray(coords, dtype=self.vertex_dtype).astype(np.float64)
+
+
+    def get_vertex_array(self) -> np.ndarray:
+        '''Returns (N, 3) array of stored (not transformed) points'''
+        return self.points.to_array(self.vertex_dtype)
+
+    def get_transformed_vertex_array(self) -> np.ndarray:
+        '''Returns (N, 3) array of points with all queued transformations
+        applied. Rows are ordered the same way as in get_vertex_array'''
+        points = PointArray(self.points.to_array())
+        return self._transform(points).coords.astype(self.vertex_dtype)
+
+    def _transform(self, points: PointArray) -> PointArray:
+        '''Applies queued rotations (x -> y -> z) and then moves to points'''
+        points = points.rotate_x(self.rotations['x'])
+        points = points.rotate_y(self.rotations['y'])
+        points = points.rotate_z(self.rotations['z'])
+        return points.move(self.moves['x'], self.moves['y'], self.moves['z'])
+
+    def iter_vertex_arrays(self, chunk_size: int,
+                           transformed: bool = True) -> Iterator[np.ndarray]:
+        '''Generates rows of get_transformed_vertex_array (or of
+        get_vertex_array if transformed is False) in arrays of at most
+        chunk_size rows without building the whole array'''
+        points = iter(self.points)
+        while True:
+            chunk = list(islice(points, chunk_size))
+            if not chunk:
+                return
+            coords = PointArray(np.array(chunk, dtype=np.float64))
+            if transformed:
+                coords = self._transform(coords)
+            yield coords.coords.astype(self.vertex_dtype)
+
+    def iter_face_arrays(self, chunk_size: int) -> Iterator[np.ndarray]:
+        '''Generates rows of get_face_array in arrays of at most chunk_size
+        rows without building the whole array'''
+        if self._faces is None:
+            for start in range(0, len(self._face_rows), chunk_size):
+                yield self._face_rows[start:start+chunk_size].astype(
+                        self.index_dtype)
+            return
+        faces = iter(self._faces)
+        while True:
+            chunk = list(islice(faces, chunk_size))
+            if not chunk:
+                return
+            yield np.array(chunk, dtype=self.index_dtype)
+
+    def get_face_array(self) -> np.ndarray:
+        '''Returns (F, 3) array of point indices of every face'''
+        if self._faces is None:
+            return self._face_rows.astype(self.index_dtype)
+        return np.array(list(self._faces),
+                        dtype=self.index_dtype).reshape(-1, 3)
+
+    def share(self, transformed: bool = True) -> SharedMesh:
+        '''Publishes vertex and face arrays in shared memory. Worker
+        processes receive the small handle of the result (or the result
+        itself, which is pickled as the handle) and get read-only views of
+        the arrays without copying. Queued transformations are applied to
+        the vertices unless transformed is False. The caller owns the shared
+        memory and should close the result when workers are done'''
+        vertices = (self.get_transformed_vertex_array() if transformed
+                    else self.get_vertex_array())
+        return SharedMesh(vertices, self.get_face_array())
+
+    def mass_properties(self, density: float = 1.0,
+                        transformed: bool = True) -> MassProperties:
+        '''Returns volume, surface area, centroid and inertia tensor of the
+        solid bounded by the collection, see mass.MassProperties. Queued
+        transformations are applied unless transformed is False'''
+        vertices = (self.get_transformed_vertex_array() if transformed
+                    else self.get_vertex_array())
+        return mass_properties(vertices, self.get_face_array(), density)
 
     def add_face(self, p1: Point, p2: Point, p3: Point) -> None:
-        self.faces.add((self.points.add_point(p1),
-                        self.points.add_point(p2),
-                        self.points.add_point(p3)))
+        if self.precision != 'double':
+            p1, p2, p3 = map(Point._make, np.array(
+                (p1, p2, p3), dtype=self.vertex_dtype).tolist())
+        self._own_buffers()
+        self._face_dict()[(self.points.add_point(p1),
+                     self.points.add_point(p2),
+                     self.points.add_point(p3))] = None
+        self._adjacency = None
 
     def move(self, x: float = 0, y: float = 0,
              z: float = 0) -> 'FaceCollection':
@@ -218,7 +775,22 @@ class FaceCollection:
 
     def invert(self) -> None:
         '''Inverts orientation of all faces in the collection'''
-        self.faces = set(((f3, f2, f1) for (f1, f2, f3) in self.faces))
+        if self._faces is None:
+            self._set_face_rows(self._face_rows[:, ::-1])
+        else:
+            self.faces = ((f3, f2, f1) for (f1, f2, f3) in self._faces)
+
+    def repair_orientation(self) -> int:
+        '''Makes orientation of faces consistent inside every connected
+        part of the collection. Closed parts get faces oriented outwards,
+        open parts keep orientation of the majority of their faces.
+        Returns number of inverted faces'''
+        faces = self.get_face_array()
+        flips = consistent_orientation(self.get_adjacency(),
+                                       self.get_vertex_array())
+        faces[flips] = faces[flips, ::-1]
+        self.faces = zip(*faces.T.tolist())
+        return int(flips.sum())
 
     def accept_transformations(self) -> None:
         '''This method applies saved transformations into current
@@ -228,10 +800,16 @@ class FaceCollection:
             move transformations. Also rotations are done in the following
             order x-> y -> z
         '''
+        if not self.has_transformations():
+            return
         self.points = self.get_transformed_points()
         self.moves = {'x': 0, 'y': 0, 'z': 0}
         self.rotations = {'x': Angle(0), 'y': Angle(0), 'z': Angle(0)}
 
+    def has_transformations(self) -> bool:
+        return (any(x != 0 for x in self.moves.values()) or
+                any(x != Angle(0) for x in self.rotations.values()))
+
     def get_transformed_points(self) -> PointCollection:
         '''Returns transformed PointCollection without affecting instance
         state. Transformed points order is the same as initial points order.
@@ -239,31 +817,75 @@ class FaceCollection:
         Also rotations are done in the following order x-> y -> z
         '''
         moved_points = PointCollection()
-        for p in self.points.point_to_index:
-            mp = p.rotate_x(self.rotations['x'])
-            mp = mp.rotate_y(self.rotations['y'])
-            mp = mp.rotate_z(self.rotations['z'])
-            mp = mp.move(self.moves['x'], self.moves['y'], self.moves['z'])
-            moved_points.add_point(mp)
+        coords = self._transform(PointArray(self.points.to_array())).coords
+        for mp in self._quantize(coords).tolist():
+            moved_points.add_point(Point._make(mp))
         return moved_points
 
-    def save_to_file(self, filename: str) -> None:
+    def content_hash(self) -> str:
+        '''Returns hex digest of the collection content: points (rounded in
+        the same way as in Point comparison), faces in their order, queued
+        transformations and storage precision other than 'double'. Equal
+        collections built in the same way produce the same hash in every run
+        '''
+        digest = hashlib.blake2b(digest_size=16)
+        if self.precision != 'double':
+            digest.update(self.precision.encode('ascii'))
+        vertices = np.round(self.points.to_array(), POINT_DECIMALS) + 0.0
+        digest.update(vertices.astype('<f8').tobytes())
+        digest.update(self.get_face_array().astype('<i8').tobytes())
+        transforms = [self.moves[k] for k in 'xyz']
+        transforms += [self.rotations[k].value for k in 'xyz']
+        digest.update(np.array(transforms, dtype='<f8').tobytes())
+        return digest.hexdigest()
+
+    @staticmethod
+    def _json_prefix(content_hash: str) -> str:
+        return f'{{"hash": "{content_hash}"'
+
+    def is_saved_in(self, filename: str) -> bool:
+        '''Checks whether json file written by save_to_file contains
+        collection with the same content hash'''
+        if not os.path.exists(filename):
+            return False
+        prefix = self._json_prefix(self.content_hash())
+        with open(filename, 'r') as fin:
+            return fin.read(len(prefix)) == prefix
+
+    def save_to_file(self, filename: str,
+                     skip_unchanged: bool = False) -> bool:
         '''Save current collection into given file.
         File is rewritten. File has json format with dictionary names:
+            hash
+            precision
             moves
             rotations
             points
             faces
+        hash is the content_hash of the collection.
         Not applied modifications are stored in moves and rotations fields.
         Points are saved in real coordinate form only
         Saving and reading operation with collection does not cause the loss
         of data
+        If skip_unchanged is set and the file already contains collection
+        with the same hash, the file is not rewritten.
+        Returns True if the file was written.
         '''
+        if skip_unchanged and self.is_saved_in(filename):
+            return False
         with open(filename, 'w') as fout:
-            json.dump({"moves": self.moves,
-                       "rotations": {k: a.value for k, a in self.rotations.items()},
-                       "points": list(self.points),
-                       "faces": list(self.faces)}, fout)
+            json.dump(self.to_dict(), fout)
+        return True
+
+    def to_dict(self) -> dict:
+        '''Returns json serializable content of the collection in the format
+        of save_to_file'''
+        return {"hash": self.content_hash(),
+                "precision": self.precision,
+                "moves": self.moves,
+                "rotations": {k: a.value for k, a in self.rotations.items()},
+                "points": list(self.points),
+                "faces": list(self.faces)}
 
     @classmethod
     def from_json_file(cls, filename: str) -> "FaceCollection":
@@ -271,40 +893,101 @@ class FaceCollection:
         It is expected that json file has the same format as described in
         save_to_file'''
         with open(filename, 'r') as fin:
-            content = json.load(fin)
-        result = cls()
+            return cls.from_dict(json.load(fin))
+
+    @classmethod
+    def from_dict(cls, content: dict) -> "FaceCollection":
+        '''Constructs FaceCollection from the content returned by to_dict'''
+        result = cls(content.get('precision', 'double'))
         result.moves = content['moves']
         result.rotations = {k: Angle(v) for k, v in content['rotations'].items()}
         result.points = PointCollection()
         for p in content['points']:
             result.points.add_point(Point._make(p))
-        result.faces = set(tuple(f) for f in content["faces"])
+        result.faces = map(tuple, content["faces"])
+        return result
+
+    @classmethod
+    def from_arrays(cls, vertices: np.ndarray, faces: np.ndarray,
+                    weld: bool = True,
+                    precision: str = 'double') -> 'FaceCollection':
+        '''Constructs FaceCollection from (N, 3) array of vertex coordinates
+        and (F, 3) array of vertex indices. Vertices which are equal in the
+        sense of Point comparison are welded together in one batch, faces
+        which become degenerate after welding are dropped. Order of the
+        remaining vertices is preserved.
+        If weld is False, vertices are expected to be distinct already (e.g.
+        arrays taken from another FaceCollection) and are used as they are.
+        With 'single' precision vertices are rounded to float32 before
+        welding.
+        '''
+        result = cls(precision)
+        vertices = result._quantize(vertices).reshape(-1, 3)
+        faces = np.asarray(faces, dtype=np.int64).reshape(-1, 3)
+        if weld:
+            inverse, first = _group_rows(_point_keys(vertices))
+            vertices, faces = vertices[first], inverse[faces]
+            valid = ((faces[:, 0] != faces[:, 1]) &
+                     (faces[:, 1] != faces[:, 2]) &
+                     (faces[:, 0] != faces[:, 2]))
+            faces = faces[valid]
+        result.points = PointCollection.from_array(vertices,
+                                                   result.vertex_dtype)
+        # repeated faces are stored once as by add_face
+        result._set_face_rows(faces[_group_rows(faces)[1]])
         return result
 
+    def with_precision(self, precision: str) -> 'FaceCollection':
+        '''Returns copy of the collection stored with the given precision.
+        Points which coincide after rounding to lower precision are welded,
+        faces which become degenerate are dropped'''
+        result = FaceCollection.from_arrays(self.points.to_array(),
+                                            self.get_face_array(),
+                                            precision=precision)
+        result.moves = dict(self.moves)
+        result.rotations = dict(self.rotations)
+        return result
+
+    def extend(self, other: 'FaceCollection') -> None:
+        '''Appends all faces of other collection in place. Points of other
+        are converted to the precision of the collection in one batch. Both
+        collections should have same transformation settings'''
+        if self.moves != other.moves:
+            raise ValueError(f"Cannot merge collections with different move "
+                             f"transformations: "
+                             f"lhs = {self.moves}, rhs = {other.moves}")
+        if self.rotations != other.rotations:
+            raise ValueError(f"Cannot merge collections with different "
+                             f"rotations: lhs = {self.rotations}, "
+                             f"rhs = {other.rotations}")
+        if not other.faces:
+            return
+        coords = other.points.to_array()
+        if self.precision != 'double':
+            coords = self._quantize(coords)
+        self._own_buffers()
+        add_point = self.points.add_point
+        remap = np.array([add_point(Point._make(p)) for p in coords.tolist()],
+                         dtype=np.int64)
+        faces = remap[other.get_face_array()]
+        self._face_dict().update(dict.fromkeys(zip(*faces.T.tolist())))
+        self._adjacency = None
+
     @staticmethod
     def merge(lhs: 'FaceCollection',
               rhs: 'FaceCollection') -> 'FaceCollection':
         '''Creates FaceCollection which contains all faces from both
         collections. Both input collections should have same transformation
-        settings.
+        settings. Result has the precision of lhs. It is a clone of lhs
+        extended by rhs, so points and faces of lhs are copied once without
+        rebuilding them
         '''
-        if lhs.moves != rhs.moves:
-            raise ValueError(f"Cannot merge collections with different move"
-                             "transformations: "
-                             "lhs = {lhs.moves}, rhs = {rhs.moves}")
-        if lhs.rotations != rhs.rotations:
-            raise ValueError(f"Cannot merge collections with different"
-                             "rotateions: lhs = {lhs.rotations}, "
-                             "rhs = {rhs.rotations}")
-        new_col = FaceCollection()
-        for f in lhs.faces:
-            new_col.add_face(lhs.points.get_point(f[0]),
-                             lhs.points.get_point(f[1]),
-                             lhs.points.get_point(f[2]))
-        for f in rhs.faces:
-            new_col.add_face(rhs.points.get_point(f[0]),
-                             rhs.points.get_point(f[1]),
-                             rhs.points.get_point(f[2]))
-        new_col.moves = lhs.moves
-        new_col.rotations = lhs.rotations
-        return new_col
+        if not lhs.faces and lhs.moves == rhs.moves and \
+                lhs.rotations == rhs.rotations:
+            # nothing to merge, result shares geometry of rhs
+            if rhs.precision != lhs.precision:
+                return rhs.with_precision(lhs.precision)
+            return rhs.clone()
+        result = lhs.clone()
+        result.extend(rhs)
+        return result
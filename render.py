@@ -0,0 +1,150 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, NamedTuple, Sequence, Tuple
+import numpy as np
+import matplotlib.pyplot as plt
+
+from primitives import FaceCollection
+from shared_mesh import SharedMeshHandle
+from bvh import BVH, shared_bvh
+
+
+DEFAULT_TILE_SIZE = 64
+
+
+def _unit(vector: np.ndarray) -> np.ndarray:
+    return vector / np.linalg.norm(vector)
+
+
+class Camera(NamedTuple):
+    '''Pinhole camera looking from position to target. fov is the vertical
+    field of view in degrees'''
+    position: Tuple[float, float, float]
+    target: Tuple[float, float, float]
+    up: Tuple[float, float, float] = (0, 0, 1)
+    fov: float = 60
+    width: int = 320
+    height: int = 240
+
+    def basis(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        '''Returns unit (forward, right, up) vectors of the image plane'''
+        forward = _unit(np.subtract(self.target, self.position, dtype=float))
+        right = np.cross(forward, self.up)
+        if np.allclose(right, 0):
+            raise ValueError("Camera up vector is parallel to the view "
+                             "direction.")
+        right = _unit(right)
+        return forward, right, np.cross(right, forward)
+
+    def rays(self, rows: slice, cols: slice) -> Tuple[np.ndarray, np.ndarray]:
+        '''Returns origins and unit directions of rays through centers of the
+        given pixels in row-major order. Row 0 is the top of the image'''
+        forward, right, up = self.basis()
+        half_height = np.tan(np.radians(self.fov) / 2)
+        pixel = 2 * half_height / self.height
+        y = half_height - (np.arange(self.height)[rows] + 0.5) * pixel
+        x = (np.arange(self.width)[cols] + 0.5 - self.width / 2) * pixel
+        x, y = np.meshgrid(x, y)
+        directions = (forward + x.reshape(-1, 1) * right +
+                      y.reshape(-1, 1) * up)
+        directions /= np.linalg.norm(directions, axis=1, keepdims=True)
+        origins = np.broadcast_to(np.asarray(self.position, dtype=float),
+                                  directions.shape)
+        return origins, directions
+
+
+def orbit(target: Sequence[float], radius: float, elevation: float,
+          frame_num: int, **camera_parameters) -> List[Camera]:
+    '''Cameras evenly placed on a horizontal circle of the given radius
+    elevated above target and looking at it'''
+    angles = np.linspace(0, 2*np.pi, frame_num, endpoint=False)
+    return [Camera((target[0] + radius*np.cos(a), target[1] + radius*np.sin(a),
+                    target[2] + elevation), tuple(target), **camera_parameters)
+            for a in angles]
+
+
+def shade(bvh: BVH, origins: np.ndarray, directions: np.ndarray,
+          ambient: float = 0.2, background: float = 0.0) -> np.ndarray:
+    '''Intensity of every ray: Lambert shading with light coming from the
+    camera. Both sides of faces are lit'''
+    _, face = bvh.intersect(origins, directions)
+    result = np.full(len(origins), background, dtype=np.float32)
+    hit = face >= 0
+    normals = bvh.face_normals(face[hit])
+    cos = np.abs(np.einsum('ij,ij->i', normals, directions[hit]))
+    result[hit] = ambient + (1 - ambient) * cos
+    return result
+
+
+class Tile(NamedTuple):
+    frame: int
+    rows: slice
+    cols: slice
+
+
+def _tiles(frame: int, camera: Camera, tile_size: int) -> List[Tile]:
+    return [Tile(frame, slice(r, min(r + tile_size, camera.height)),
+                 slice(c, min(c + tile_size, camera.width)))
+            for r in range(0, camera.height, tile_size)
+            for c in range(0, camera.width, tile_size)]
+
+
+def _render_tile(bvh: BVH, camera: Camera, tile: Tile, ambient: float,
+                 background: float) -> np.ndarray:
+    origins, directions = camera.rays(tile.rows, tile.cols)
+    pixels = shade(bvh, origins, directions, ambient, background)
+    return pixels.reshape(tile.rows.stop - tile.rows.start,
+                          tile.cols.stop - tile.cols.start)
+
+
+def _render_shared_tile(handle: SharedMeshHandle, camera: Camera,
+                        tile: Tile, ambient: float,
+                        background: float) -> Tuple[Tile, np.ndarray]:
+    return tile, _render_tile(shared_bvh(handle), camera, tile, ambient,
+                              background)
+
+
+def render_frames(scene, cameras: Sequence[Camera],
+                  tile_size: int = DEFAULT_TILE_SIZE,
+                  max_workers: int = None, ambient: float = 0.2,
+                  background: float = 0.0) -> List[np.ndarray]:
+    '''Renders scene (Object or FaceCollection) from every camera. Images
+    are split into tiles which are rendered by a pool of max_workers
+    processes (all cores by default). The mesh is published in shared memory
+    once and every worker builds its BVH over it once for all frames.
+    max_workers=1 renders in the current process. Returns (height, width)
+    float32 images with intensities in [0, 1]'''
+    collection: FaceCollection = getattr(scene, 'description', scene)
+    images = [np.empty((c.height, c.width), dtype=np.float32)
+              for c in cameras]
+    tiles = [tile for frame, camera in enumerate(cameras)
+             for tile in _tiles(frame, camera, tile_size)]
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    if max_workers == 1:
+        bvh = BVH.from_collection(collection)
+        for tile in tiles:
+            images[tile.frame][tile.rows, tile.cols] = _render_tile(
+                    bvh, cameras[tile.frame], tile, ambient, background)
+        return images
+    with collection.share() as shared, \
+            ProcessPoolExecutor(max_workers) as pool:
+        chunksize = max(1, len(tiles) // (4 * max_workers))
+        results = pool.map(_render_shared_tile,
+                           *zip(*[(shared.handle, cameras[t.frame], t,
+                                   ambient, background) for t in tiles]),
+                           chunksize=chunksize)
+        for tile, pixels in results:
+            images[tile.frame][tile.rows, tile.cols] = pixels
+    return images
+
+
+def render(scene, camera: Camera, **kwargs) -> np.ndarray:
+    '''Renders single image, see render_frames'''
+    return render_frames(scene, [camera], **kwargs)[0]
+
+
+def save_image(image: np.ndarray, filename: str) -> None:
+    '''Saves rendered image as grayscale picture, format is chosen by
+    matplotlib according to the filename extension'''
+    plt.imsave(filename, image, cmap='gray', vmin=0, vmax=1)
@@ -0,0 +1,78 @@
+from typing import Iterator, NamedTuple
+import numpy as np
+
+from primitives import FaceCollection
+
+
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+
+class SurfaceSamples(NamedTuple):
+    '''Sampled points with unit normals of faces they lie on and face ids
+    (row numbers of get_face_array)'''
+    positions: np.ndarray
+    normals: np.ndarray
+    faces: np.ndarray
+
+
+class SurfaceSampler:
+    '''Draws points uniformly distributed over the surface of a collection
+    (with applied queued transformations). Faces are chosen with
+    probability proportional to their area by binary search in the
+    cumulative area table, points inside faces are drawn with uniform
+    barycentric coordinates. The same seed gives the same points no matter
+    how they are split into chunks'''
+    def __init__(self, collection: FaceCollection) -> None:
+        vertices = collection.get_transformed_vertex_array().astype(np.float64)
+        triangles = vertices[collection.get_face_array()]
+        self._corner = triangles[:, 0]
+        self._edge1 = triangles[:, 1] - triangles[:, 0]
+        self._edge2 = triangles[:, 2] - triangles[:, 0]
+        normals = np.cross(self._edge1, self._edge2)
+        double_areas = np.linalg.norm(normals, axis=1)
+        self._normals = np.divide(normals, double_areas[:, None],
+                                  out=np.zeros_like(normals),
+                                  where=double_areas[:, None] > 0)
+        self._cumulative_area = np.cumsum(double_areas / 2)
+        if not len(triangles) or self.total_area <= 0:
+            raise ValueError("Cannot sample surface with zero area.")
+
+    @property
+    def total_area(self) -> float:
+        return float(self._cumulative_area[-1])
+
+    def _draw(self, random: np.ndarray) -> SurfaceSamples:
+        '''Converts (N, 3) array of uniform numbers into samples'''
+        faces = np.searchsorted(self._cumulative_area,
+                                random[:, 0] * self.total_area, side='right')
+        faces = np.minimum(faces, len(self._cumulative_area) - 1)
+        root = np.sqrt(random[:, 1:2])
+        b = root * (1 - random[:, 2:3])
+        c = root * random[:, 2:3]
+        positions = (self._corner[faces] + b * self._edge1[faces] +
+                     c * self._edge2[faces])
+        return SurfaceSamples(positions, self._normals[faces], faces)
+
+    def sample(self, num: int, seed=None) -> SurfaceSamples:
+        '''Draws num samples at once. seed is anything accepted by
+        np.random.default_rng, including a Generator'''
+        if num < 0:
+            raise ValueError(f"num is {num}, but should not be negative.")
+        return self._draw(np.random.default_rng(seed).random((num, 3)))
+
+    def iter_samples(self, num: int, seed=None,
+                     chunk_size: int = DEFAULT_CHUNK_SIZE
+                     ) -> Iterator[SurfaceSamples]:
+        '''Draws num samples in chunks of at most chunk_size, so that memory
+        does not grow with num'''
+        if num < 0:
+            raise ValueError(f"num is {num}, but should not be negative.")
+        rng = np.random.default_rng(seed)
+        for start in range(0, num, chunk_size):
+            yield self._draw(rng.random((min(chunk_size, num - start), 3)))
+
+
+def sample_surface(collection: FaceCollection, num: int,
+                   seed=None) -> SurfaceSamples:
+    '''Draws num points uniformly distributed over the surface'''
+    return SurfaceSampler(collection).sample(num, seed)
@@ -0,0 +1,231 @@
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Mapping, NamedTuple, Optional, Tuple
+import numpy as np
+
+from primitives import FaceCollection, Angle
+from mesh_cache import MeshCache
+from object_collection import (Object, World, Plane, Box, CircleSegment,
+                               Circle, Tube, Cylinder, ConeNoBase, Cone,
+                               Sphere)
+
+
+# Increase when meaning of scene files changes, so that nodes cached by
+# previous versions are not reused
+SCENE_FORMAT_VERSION = 1
+
+PRIMITIVES = {cls.__name__: cls for cls in (Plane, Box, CircleSegment,
+                                            Circle, Tube, Cylinder,
+                                            ConeNoBase, Cone, Sphere)}
+# parameters given in radians which primitives expect as Angle
+_ANGLE_PARAMETERS = ('phi_from', 'phi_to')
+_NODE_FIELDS = ('name', 'primitive', 'parameters', 'instance_of',
+                'transforms', 'invert', 'add')
+_STEP_FIELDS = ('rotate', 'move')
+
+
+class Scene(NamedTuple):
+    '''Result of build_scene: objects of all nodes by name, world with nodes
+    marked for adding, and names of nodes which were built (not taken from
+    the cache)'''
+    objects: Dict[str, Object]
+    world: World
+    built: List[str]
+
+
+class _Node(NamedTuple):
+    '''Node with resolved instancing: its primitive and all transformation
+    steps, steps of base nodes first'''
+    name: str
+    primitive: str
+    parameters: Tuple[Tuple[str, Any], ...]
+    steps: Tuple[Tuple[Tuple[float, ...], Tuple[float, ...]], ...]
+    invert: bool
+    add: bool
+
+    def primitive_key(self) -> str:
+        return _hash(['primitive', self.primitive, self.parameters])
+
+    def key(self) -> str:
+        return _hash(['node', self.primitive, self.parameters, self.steps,
+                      self.invert])
+
+
+def _hash(content) -> str:
+    text = json.dumps([SCENE_FORMAT_VERSION, content])
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def load_scene(filename: str) -> dict:
+    '''Reads scene description from json file, see build_scene'''
+    with open(filename, 'r', encoding='utf-8') as fin:
+        return json.load(fin)
+
+
+def _parse_step(node: str, step: Mapping) -> Tuple[Tuple[float, ...],
+                                                   Tuple[float, ...]]:
+    unknown = set(step) - set(_STEP_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown transformation {sorted(unknown)} of node "
+                         f"'{node}'. Expected {list(_STEP_FIELDS)}.")
+    rotate = step.get('rotate', {})
+    move = step.get('move', {})
+    return (tuple(float(rotate.get(k, 0)) for k in 'xyz'),
+            tuple(float(move.get(k, 0)) for k in 'xyz'))
+
+
+def _resolve(spec: Mapping) -> List[_Node]:
+    '''Validates nodes of the scene and resolves their instancing. Instances
+    should refer to nodes defined before them'''
+    resolved: Dict[str, _Node] = {}
+    for raw in spec.get('nodes', []):
+        name = raw.get('name')
+        if not isinstance(name, str):
+            raise ValueError(f"Node {raw} has no name.")
+        if name in resolved:
+            raise ValueError(f"Node '{name}' is defined more than once.")
+        unknown = set(raw) - set(_NODE_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown fields {sorted(unknown)} of node "
+                             f"'{name}'.")
+        steps = tuple(_parse_step(name, s) for s in raw.get('transforms', []))
+        if 'instance_of' in raw:
+            if 'primitive' in raw or 'parameters' in raw:
+                raise ValueError(f"Instance '{name}' cannot define its own "
+                                 "primitive.")
+            base = resolved.get(raw['instance_of'])
+            if base is None:
+                raise ValueError(f"Node '{name}' is an instance of unknown "
+                                 f"node '{raw['instance_of']}'.")
+            primitive, parameters = base.primitive, base.parameters
+            steps = base.steps + steps
+            invert = base.invert != bool(raw.get('invert', False))
+        else:
+            primitive = raw.get('primitive')
+            if primitive not in PRIMITIVES:
+                raise ValueError(f"Primitive of node '{name}' is {primitive}, "
+                                 f"but should be one of {sorted(PRIMITIVES)}.")
+            parameters = tuple(sorted(raw.get('parameters', {}).items()))
+            invert = bool(raw.get('invert', False))
+        resolved[name] = _Node(name, primitive, parameters, steps, invert,
+                               bool(raw.get('add', True)))
+    return list(resolved.values())
+
+
+def _tessellate(primitive: str,
+                parameters: Tuple[Tuple[str, Any], ...]) -> FaceCollection:
+    kwargs = {k: Angle(v) if k in _ANGLE_PARAMETERS else v
+              for k, v in parameters}
+    try:
+        return PRIMITIVES[primitive](**kwargs).description
+    except TypeError as error:
+        raise ValueError(f"Wrong parameters of {primitive}: {error}") from None
+
+
+def _build_group(primitive: str, parameters: Tuple[Tuple[str, Any], ...],
+                 mesh: Optional[Tuple[np.ndarray, np.ndarray]],
+                 variants: List[Tuple]) -> Tuple[Tuple[np.ndarray, np.ndarray],
+                                                 List[Tuple[np.ndarray,
+                                                            np.ndarray]]]:
+    '''Builds all variants (steps, invert) of one primitive. The primitive
+    is tessellated once, unless its mesh is given. Returns arrays of the
+    primitive and of every variant'''
+    if mesh is None:
+        base = _tessellate(primitive, parameters)
+        mesh = (base.get_vertex_array(), base.get_face_array())
+    results = []
+    for steps, invert in variants:
+        collection = FaceCollection.from_arrays(*mesh, weld=False)
+        for rotate, move in steps:
+            collection.rotate(*map(Angle, rotate))
+            collection.move(*move)
+            collection.accept_transformations()
+        if invert:
+            collection.invert()
+        results.append((collection.get_vertex_array(),
+                        collection.get_face_array()))
+    return mesh, results
+
+
+def build_scene(spec, cache_dir: Optional[str] = None,
+                max_workers: Optional[int] = 1) -> Scene:
+    '''Builds scene from its declarative description (dict or json file
+    name):
+
+        {"precision": "double",
+         "nodes": [{"name": "wheel", "primitive": "Cylinder",
+                    "parameters": {"radius": 1, "height": 0.5,
+                                   "r_layer_num": 3, "h_layer_num": 3},
+                    "transforms": [{"rotate": {"y": 1.5707963}},
+                                   {"move": {"x": 2, "z": 1}}]},
+                   {"name": "wheel_2", "instance_of": "wheel",
+                    "transforms": [{"move": {"y": 4}}]}]}
+
+    Every transformation step queues rotation (radians, x -> y -> z) and
+    then move, and accepts them, as in scripts calling move, rotate and
+    accept_transformations. Instances start from the mesh of their base
+    node. Nodes may also set "invert" and "add" (false keeps the node out of
+    the world). Angle parameters of CircleSegment are given in radians.
+    Identical primitives are tessellated once. With cache_dir, meshes of
+    primitives and transformed nodes are stored there, so that a rebuild
+    only builds nodes whose resolved description changed. Groups of nodes
+    sharing a primitive are built by a pool of max_workers processes (all
+    cores for None)'''
+    if isinstance(spec, (str, os.PathLike)):
+        spec = load_scene(spec)
+    nodes = _resolve(spec)
+    cache = MeshCache(cache_dir) if cache_dir is not None else None
+    meshes: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+    if cache is not None:
+        for node in nodes:
+            collection = cache.load(node.key())
+            if collection is not None:
+                meshes[node.key()] = (collection.get_vertex_array(),
+                                      collection.get_face_array())
+    # missing nodes grouped by primitive, equal nodes are built once
+    groups: Dict[str, Dict[str, _Node]] = {}
+    for node in nodes:
+        if node.key() not in meshes:
+            groups.setdefault(node.primitive_key(), {})[node.key()] = node
+    tasks = []
+    for primitive_key, group in groups.items():
+        first = next(iter(group.values()))
+        mesh = None
+        if cache is not None:
+            collection = cache.load(primitive_key)
+            if collection is not None:
+                mesh = (collection.get_vertex_array(),
+                        collection.get_face_array())
+        tasks.append((first.primitive, first.parameters, mesh,
+                      [(n.steps, n.invert) for n in group.values()]))
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    if max_workers == 1 or len(tasks) < 2:
+        results = [_build_group(*task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(min(max_workers, len(tasks))) as pool:
+            results = list(pool.map(_build_group, *zip(*tasks)))
+    for (primitive_key, group), (mesh, variants) in zip(groups.items(),
+                                                        results):
+        if cache is not None:
+            cache.store(primitive_key,
+                        FaceCollection.from_arrays(*mesh, weld=False))
+        for key, arrays in zip(group, variants):
+            meshes[key] = arrays
+            if cache is not None:
+                cache.store(key, FaceCollection.from_arrays(*arrays,
+                                                            weld=False))
+    built = [n.name for n in nodes
+             if n.key() in groups.get(n.primitive_key(), {})]
+    objects = {}
+    world = World(spec.get('precision', 'double'))
+    for node in nodes:
+        obj = Object()
+        obj.description = FaceCollection.from_arrays(*meshes[node.key()],
+                                                     weld=False)
+        objects[node.name] = obj
+        if node.add:
+            world.add_object(obj)
+    return Scene(objects, world, built)
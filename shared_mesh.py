@@ -0,0 +1,113 @@
+import sys
+from multiprocessing import shared_memory
+from typing import Dict, NamedTuple, Tuple
+import numpy as np
+
+
+# Offset of the face array inside the block is aligned to this size
+_ALIGNMENT = 64
+
+
+class SharedMeshHandle(NamedTuple):
+    '''Small picklable description of mesh arrays placed in shared memory.
+    It is passed to worker processes instead of the mesh itself'''
+    name: str
+    vertex_num: int
+    face_num: int
+    vertex_dtype: str
+    index_dtype: str
+
+    def layout(self) -> Tuple[int, int]:
+        '''Returns offset of the face array and total size of the block'''
+        vertex_bytes = (self.vertex_num * 3 *
+                        np.dtype(self.vertex_dtype).itemsize)
+        face_offset = -(-vertex_bytes // _ALIGNMENT) * _ALIGNMENT
+        face_bytes = self.face_num * 3 * np.dtype(self.index_dtype).itemsize
+        return face_offset, max(face_offset + face_bytes, 1)
+
+
+def _open_block(name: str) -> shared_memory.SharedMemory:
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    # Before 3.13 attaching registers the block in the resource tracker.
+    # Processes started by multiprocessing share the tracker of their parent,
+    # so the registration is a no-op and the owner still removes the block.
+    return shared_memory.SharedMemory(name=name)
+
+
+class SharedMesh:
+    '''Vertex and face arrays of a mesh stored in one shared memory block.
+    The process which creates SharedMesh owns the block and removes it in
+    close(). Other processes rehydrate the mesh from its handle with attach
+    and get read-only views without copying the data. Arrays taken from the
+    instance must not be used after close()'''
+    def __init__(self, vertices: np.ndarray, faces: np.ndarray) -> None:
+        vertices = np.ascontiguousarray(vertices).reshape(-1, 3)
+        faces = np.ascontiguousarray(faces).reshape(-1, 3)
+        probe = SharedMeshHandle('', len(vertices), len(faces),
+                                 vertices.dtype.str, faces.dtype.str)
+        self._block = shared_memory.SharedMemory(create=True,
+                                                 size=probe.layout()[1])
+        self.handle = probe._replace(name=self._block.name)
+        self._owner = True
+        self._map_arrays()
+        self.vertices[:] = vertices
+        self.faces[:] = faces
+        self.vertices.flags.writeable = False
+        self.faces.flags.writeable = False
+
+    @classmethod
+    def attach(cls, handle: SharedMeshHandle) -> 'SharedMesh':
+        '''Opens mesh published by another process. Returned arrays are
+        read-only views of the shared block'''
+        result = cls.__new__(cls)
+        result._block = _open_block(handle.name)
+        result.handle = handle
+        result._owner = False
+        result._map_arrays()
+        result.vertices.flags.writeable = False
+        result.faces.flags.writeable = False
+        return result
+
+    def _map_arrays(self) -> None:
+        face_offset, _ = self.handle.layout()
+        self.vertices = np.ndarray((self.handle.vertex_num, 3),
+                                   dtype=self.handle.vertex_dtype,
+                                   buffer=self._block.buf)
+        self.faces = np.ndarray((self.handle.face_num, 3),
+                                dtype=self.handle.index_dtype,
+                                buffer=self._block.buf, offset=face_offset)
+
+    def close(self) -> None:
+        '''Releases the block in this process. Owner also removes it, after
+        that the mesh cannot be attached anymore'''
+        if self._block is None:
+            return
+        self.vertices = self.faces = None
+        self._block.close()
+        if self._owner:
+            self._block.unlink()
+        self._block = None
+
+    def __enter__(self) -> 'SharedMesh':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def __reduce__(self):
+        # pickling transfers only the handle, the receiver attaches to it
+        return (get_attached, (self.handle,))
+
+
+_attached: Dict[str, SharedMesh] = {}
+
+
+def get_attached(handle: SharedMeshHandle) -> SharedMesh:
+    '''Returns mesh attached in the current process. Every block is attached
+    once per process and stays open until the process ends, which suits
+    workers of a process pool processing many tasks with the same mesh'''
+    mesh = _attached.get(handle.name)
+    if mesh is None:
+        mesh = _attached[handle.name] = SharedMesh.attach(handle)
+    return mesh
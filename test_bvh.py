@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+from object_collection import Box, Sphere
+from bvh import BVH, morton_codes
+
+
+def _brute_force(vertices, faces, origins, directions):
+    bvh = BVH(vertices, faces)
+    rays = np.repeat(np.arange(len(origins)), len(faces))
+    ids = np.tile(np.arange(len(faces)), len(origins))
+    hits = bvh._hit_distances(origins, directions, rays, ids)
+    return hits.reshape(len(origins), len(faces)).min(axis=1)
+
+
+def test_morton_codes_order():
+    points = np.array([[0, 0, 0], [1, 1, 1], [0, 0, 1], [1, 0, 0]])
+    codes = morton_codes(points)
+    assert codes[0] == 0
+    assert codes[1] == 2**30 - 1
+    assert codes[2] == 0x09249249
+    assert codes[3] == 0x09249249 << 2
+
+
+@pytest.mark.parametrize("leaf_size", [1, 3, 8])
+def test_bvh_bounds_contain_children(leaf_size):
+    sph = Sphere(radius=1, split_num=4)
+    sph.move(x=2)
+    bvh = BVH.from_collection(sph.description, leaf_size)
+    assert np.allclose(bvh.bounds[0], (1, -1, -1))
+    assert np.allclose(bvh.bounds[1], (3, 1, 1))
+    inner = np.arange(bvh.leaf_num - 1)
+    for child in (2*inner + 1, 2*inner + 2):
+        assert np.all(bvh.node_min[inner] <= bvh.node_min[child])
+        assert np.all(bvh.node_max[inner] >= bvh.node_max[child])
+    assert sorted(bvh.leaf_faces[bvh.leaf_faces >= 0]) == \
+        list(range(len(sph.description.faces)))
+
+
+def test_bvh_intersect_matches_brute_force():
+    sph = Sphere(radius=1, split_num=4)
+    vertices = sph.description.get_vertex_array()
+    faces = sph.description.get_face_array()
+    rng = np.random.default_rng(1)
+    origins = rng.uniform(-3, 3, (200, 3))
+    directions = rng.normal(size=(200, 3))
+    directions[:10, 1:] = 0
+    t, face = BVH(vertices, faces, leaf_size=4).intersect(
+            origins, directions, chunk_size=64)
+    expected = _brute_force(vertices, faces, origins, directions)
+    assert np.array_equal(np.isinf(t), np.isinf(expected))
+    assert np.allclose(t[face >= 0], expected[face >= 0])
+    assert np.all((face >= 0) == np.isfinite(t))
+
+
+def test_bvh_intersect_box():
+    box = Box(width=2, height=2, depth=2)
+    bvh = BVH.from_collection(box.description)
+    t, face = bvh.intersect([[0, 0, 5], [0, 0, 5], [5, 5, 5], [0, 0, 0]],
+                            [[0, 0, -1], [0, 0, 1], [0, 0, -1], [1, 0, 0]])
+    assert np.allclose(t[[0, 3]], [4, 1])
+    assert np.all(face[[1, 2]] == -1)
+    assert np.allclose(np.abs(bvh.face_normals(face[[0]])), [[0, 0, 1]])
+    t, face = bvh.intersect([[0, 0, 5]], [[0, 0, -1]], t_max=3)
+    assert face[0] == -1
+
+
+def test_bvh_counts_crossings_through_edges_and_vertices_once():
+    sph = Sphere(radius=1, split_num=4)
+    sph.move(x=0.3, y=-0.1)
+    bvh = BVH.from_collection(sph.description)
+    triangles = bvh.vertices[bvh.faces]
+    # rays from the center (some parallel to axes) through every vertex
+    # and every edge midpoint
+    targets = np.concatenate((bvh.vertices,
+                              (triangles + np.roll(triangles, 1, axis=1)
+                               ).reshape(-1, 3) / 2))
+    center = np.array([0.3, -0.1, 0])
+    counts = bvh.count_crossings(np.broadcast_to(center, targets.shape),
+                                 targets - center)
+    assert np.all(counts == 1)
+
+
+def test_bvh_of_empty_mesh():
+    bvh = BVH(np.zeros((0, 3)), np.zeros((0, 3)))
+    t, face = bvh.intersect([[0, 0, 0]], [[1, 0, 0]])
+    assert np.isinf(t[0]) and face[0] == -1
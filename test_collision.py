@@ -0,0 +1,48 @@
+import numpy as np
+from object_collection import Box, Sphere, Cylinder, World
+from bvh import BVH
+from collision import sweep_and_prune, triangles_intersect, find_contacts
+
+
+def test_sweep_and_prune_matches_brute_force():
+    rng = np.random.default_rng(1)
+    box_min = rng.uniform(0, 10, (300, 3))
+    box_max = box_min + rng.uniform(0, 1.5, (300, 3))
+    expected = [(i, j) for i in range(300) for j in range(i + 1, 300)
+                if np.all(box_min[i] <= box_max[j]) and
+                np.all(box_min[j] <= box_max[i])]
+    pairs = sweep_and_prune(box_min, box_max)
+    assert [tuple(p) for p in pairs] == expected
+    assert sweep_and_prune(np.empty((0, 3)), np.empty((0, 3))).shape == (0, 2)
+
+
+def test_triangles_intersect():
+    base = np.array([[[0, 0, 0], [2, 0, 0], [0, 2, 0]]] * 3, dtype=float)
+    other = np.array([[[0.5, 0.5, -1], [0.5, 0.5, 1], [1, 0.2, 1]],
+                      [[0.5, 0.5, 0.1], [0.5, 0.5, 1], [1, 0.2, 1]],
+                      [[3, 3, -1], [3, 3, 1], [4, 3, 1]]])
+    assert list(triangles_intersect(base, other)) == [True, False, False]
+    assert list(triangles_intersect(other, base)) == [True, False, False]
+
+
+def test_world_find_contacts():
+    world = World()
+    hull = Box(width=4, height=2, depth=2)
+    wheel = Cylinder(radius=0.6, height=0.5, r_layer_num=2, h_layer_num=1)
+    wheel.move(x=1, y=-1.2, z=-1)
+    inside = Sphere(radius=0.5, split_num=3)
+    far = Sphere(radius=1, split_num=3)
+    far.move(x=10)
+    for obj in (hull, wheel, inside, far):
+        world.add_object(obj)
+    assert world.part_bounds.shape == (4, 2, 3)
+    assert [tuple(p) for p in world.overlapping_parts()] == [(0, 1), (0, 2)]
+    contacts = world.find_contacts()
+    assert [(c.first, c.second) for c in contacts] == [(0, 1)]
+    hull_faces = world.parts[0].get_face_array()[contacts[0].faces]
+    hull_points = world.parts[0].get_vertex_array()[hull_faces]
+    # only the bottom and the side faces of the hull touch the wheel
+    assert np.all((np.isclose(hull_points[..., 2], -1).all(axis=1)) |
+                  (np.isclose(hull_points[..., 1], -1).all(axis=1)))
+    meshes = [BVH.from_collection(p) for p in world.parts]
+    assert [(c.first, c.second) for c in find_contacts(meshes)] == [(0, 1)]
@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+from object_collection import Box, Sphere, Cylinder
+from bvh import BVH
+from containment import contains, winding_numbers, INSIDE_RAY
+
+
+def _grid(lo, hi, num):
+    axes = [np.linspace(lo, hi, num)] * 3
+    return np.stack(np.meshgrid(*axes, indexing='ij'), axis=-1).reshape(-1, 3)
+
+
+@pytest.mark.parametrize("method", ['parity', 'winding'])
+def test_contains_box_on_grid(method):
+    box = Box(width=2, height=4, depth=6)
+    box.move(x=1)
+    # grid points lie on planes of faces and edges of the box
+    points = _grid(-4, 4, 17)
+    expected = ((np.abs(points[:, 0] - 1) < 1) & (np.abs(points[:, 1]) < 3) &
+                (np.abs(points[:, 2]) < 2))
+    strict = ((np.abs(points[:, 0] - 1) != 1) & (np.abs(points[:, 1]) != 3) &
+              (np.abs(points[:, 2]) != 2))
+    inside = box.contains(points, method)
+    assert np.array_equal(inside[strict], expected[strict])
+
+
+def test_contains_cylinder_and_sphere():
+    cyl = Cylinder(radius=1, height=2, r_layer_num=8, h_layer_num=2)
+    points = np.random.default_rng(1).uniform(-1.5, 2.5, (5000, 3))
+    radius = np.linalg.norm(points[:, :2], axis=1)
+    expected = (radius < 0.97) & (points[:, 2] > 0) & (points[:, 2] < 2)
+    clear = ((np.abs(radius - 0.985) > 0.02) & (np.abs(points[:, 2]) > 1e-3) &
+             (np.abs(points[:, 2] - 2) > 1e-3))
+    assert np.array_equal(cyl.contains(points)[clear], expected[clear])
+    sph = Sphere(radius=1, split_num=4)
+    w = winding_numbers(sph.description.get_vertex_array(),
+                        sph.description.get_face_array(),
+                        [[0, 0, 0], [0.3, 0.2, 0.1], [3, 0, 0]])
+    assert np.allclose(w, [1, 1, 0])
+
+
+def test_contains_points_whose_rays_pass_through_edges():
+    box = Box(width=2, height=2, depth=2)
+    triangles = box.description.get_transformed_vertex_array()[
+            box.description.get_face_array()]
+    targets = np.concatenate((triangles.reshape(-1, 3),
+                              (triangles + np.roll(triangles, 1, axis=1)
+                               ).reshape(-1, 3) / 2))
+    points = targets - 0.1*INSIDE_RAY
+    points = points[np.all(np.abs(points) < 1, axis=1)]
+    assert len(points) and contains(box, points).all()
+
+
+def test_contains_in_processes_matches_serial():
+    sph = Sphere(radius=1, split_num=4)
+    points = np.random.default_rng(2).uniform(-1.5, 1.5, (3000, 3))
+    serial = contains(BVH.from_collection(sph.description), points)
+    parallel = contains(sph, points, chunk_size=500, max_workers=2)
+    assert np.array_equal(serial, parallel)
+    radius = np.linalg.norm(points, axis=1)
+    clear = np.abs(radius - 1) > 0.01
+    assert np.array_equal(serial[clear], radius[clear] < 1)
+    with pytest.raises(ValueError):
+        contains(sph, points, method='rays')
@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+from object_collection import Sphere, Circle, Plane
+from primitives import FaceCollection
+from decimation import decimate
+
+
+def test_decimate_sphere_to_target():
+    sph = Sphere(radius=2, split_num=5)
+    sph.move(x=3)
+    res = decimate(sph.description, target_faces=300)
+    assert len(res.faces) <= 300
+    assert len(res.points) == len(np.unique(res.get_face_array()))
+    assert res.moves == sph.description.moves
+    vertices = res.get_vertex_array()
+    assert np.allclose(np.linalg.norm(vertices, axis=1), 2, atol=0.05)
+    adjacency = res.get_adjacency()
+    assert adjacency.is_watertight()
+    assert adjacency.is_consistently_oriented()
+
+
+def test_decimate_keeps_boundary():
+    circle = Circle(radius=2, layer_num=5)
+    res = decimate(circle.description, target_faces=30)
+    assert len(res.faces) <= 30
+    vertices = res.get_vertex_array()
+    assert np.allclose(vertices[:, 2], 0)
+    boundary = res.get_adjacency().boundary_edges()
+    radii = np.linalg.norm(vertices[boundary.reshape(-1)], axis=1)
+    assert np.allclose(radii, 2)
+
+
+def test_decimate_flat_surface_without_error():
+    plane = FaceCollection.from_arrays(
+            *_grid(10), weld=False)
+    res = decimate(plane, max_error=1e-9)
+    assert len(res.faces) == 2
+    assert np.isclose(np.abs(res.get_vertex_array()).max(), 1)
+
+
+def _grid(n):
+    x, y = np.meshgrid(np.linspace(-1, 1, n + 1), np.linspace(-1, 1, n + 1))
+    vertices = np.stack((x.ravel(), y.ravel(), np.zeros(x.size)), axis=1)
+    idx = np.arange(x.size).reshape(n + 1, n + 1)
+    a, b = idx[:-1, :-1].ravel(), idx[:-1, 1:].ravel()
+    c, d = idx[1:, 1:].ravel(), idx[1:, :-1].ravel()
+    faces = np.concatenate((np.stack((a, b, c), axis=1),
+                            np.stack((a, c, d), axis=1)))
+    return vertices, faces
+
+
+def test_decimate_stops_at_error_bound():
+    sph = Sphere(radius=1, split_num=4)
+    coarse = decimate(sph.description, max_error=0.2)
+    fine = decimate(sph.description, max_error=0.05)
+    assert len(coarse.faces) < len(fine.faces) < len(sph.description.faces)
+
+
+def test_decimate_rejects_negative_target():
+    with pytest.raises(ValueError):
+        decimate(Plane(1, 1).description, target_faces=-1)
+
+
+def test_lod_chain_is_cached():
+    sph = Sphere(radius=1, split_num=4)
+    chain = sph.lod_chain((0.5, 0.25))
+    assert chain[0] is sph.description
+    assert [len(level.faces) for level in chain] == [512, 256, 128]
+    assert sph.lod_chain((0.5, 0.25)) is chain
+    assert sph.get_lod(2, (0.5, 0.25)) is chain[2]
+    sph.move(z=1)
+    rebuilt = sph.lod_chain((0.5, 0.25))
+    assert rebuilt is not chain
+    assert rebuilt[1].moves == sph.description.moves
+    with pytest.raises(ValueError):
+        sph.lod_chain((0.5, 0))
@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+from object_collection import Box, Sphere
+from bvh import BVH
+from distance import closest_points, signed_distance, bake_sdf
+from containment import contains
+
+
+def _brute_force(bvh, points):
+    triangles = bvh.vertices[bvh.faces]
+    best = np.full(len(points), np.inf)
+    for i in range(len(triangles)):
+        faces = np.full(len(points), i)
+        diff = points - bvh._closest_on_faces(points, faces)
+        best = np.minimum(best, np.linalg.norm(diff, axis=1))
+    return best
+
+
+def test_closest_points_match_brute_force():
+    sph = Sphere(radius=1, split_num=3)
+    sph.move(x=1, z=-2)
+    bvh = BVH.from_collection(sph.description, leaf_size=4)
+    points = np.random.default_rng(1).uniform(-3, 3, (500, 3)) + (1, 0, -2)
+    result = closest_points(bvh, points, chunk_size=128)
+    assert np.allclose(result.distances, _brute_force(bvh, points))
+    assert np.allclose(np.linalg.norm(points - result.points, axis=1),
+                       result.distances)
+    # closest points lie on the reported faces
+    on_face = bvh._closest_on_faces(result.points, result.faces)
+    assert np.allclose(on_face, result.points)
+
+
+def test_signed_distance_of_box():
+    box = Box(width=2, height=4, depth=6)
+    # x in [-1, 1], y in [-3, 3], z in [-2, 2]
+    points = np.array([[0, 0, 0], [0.5, 1, 1.5], [3, 0, 0], [0, 0, -5],
+                       [2, 4, 0], [1, 0, 0]])
+    expected = [-1, -0.5, 2, 3, np.sqrt(2), 0]
+    assert np.allclose(box.signed_distance(points), expected)
+    assert list(contains(box, points[:5])) == [True, True, False, False, False]
+    assert np.all(box.closest_points(points).faces >= 0)
+
+
+def test_signed_distance_of_sphere():
+    sph = Sphere(radius=1, split_num=5)
+    points = np.random.default_rng(2).uniform(-2, 2, (1000, 3))
+    exact = np.linalg.norm(points, axis=1) - 1
+    assert np.allclose(signed_distance(sph, points), exact, atol=0.01)
+
+
+def test_bake_sdf_interpolates_distances():
+    sph = Sphere(radius=1, split_num=4)
+    grid = bake_sdf(sph, 0.1)
+    assert grid.values.shape == (25, 25, 25)
+    nodes = grid.origin + np.argwhere(np.ones_like(grid.values)) * 0.1
+    assert np.allclose(grid(nodes), grid.values.ravel())
+    points = np.random.default_rng(3).uniform(-1.2, 1.2, (1000, 3))
+    assert np.allclose(grid(points), signed_distance(sph, points), atol=0.02)
+    with pytest.raises(ValueError):
+        bake_sdf(sph, 0)
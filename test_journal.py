@@ -0,0 +1,115 @@
+import numpy as np
+import pytest
+from object_collection import Box, Sphere, Cylinder, World
+from primitives import Angle
+from journal import WorldJournal
+
+
+def _objects():
+    box = Box(width=2, height=2, depth=2)
+    sph = Sphere(radius=1, split_num=2)
+    sph.move(x=5)
+    cyl = Cylinder(radius=1, height=2, r_layer_num=2, h_layer_num=1)
+    cyl.move(y=5)
+    return box, sph, cyl
+
+
+def test_save_incremental_appends_changes(tmp_path):
+    filename = tmp_path / "world.json"
+    box, sph, cyl = _objects()
+    world = World()
+    world.add_object(box)
+    world.save_incremental(filename)
+    snapshot_size = filename.stat().st_size
+    world.add_object(sph)
+    world.save_incremental(filename)
+    # only the journal grows
+    assert filename.stat().st_size == snapshot_size
+    world.move(z=1)
+    world.rotate(z=Angle(np.pi/2))
+    world.accept_transformations()
+    world.add_object(cyl)
+    world.remove_object(0)
+    world.save_incremental(filename)
+    world.wait_for_compaction()
+    loaded = World.from_journal(filename)
+    assert loaded.content_hash() == world.content_hash()
+    assert len(loaded.parts) == 2
+    assert np.allclose(loaded.part_bounds, world.part_bounds)
+    # loaded world continues the journal
+    loaded.remove_object(-1)
+    loaded.save_incremental(filename)
+    assert World.from_journal(filename).content_hash() == \
+        loaded.content_hash()
+
+
+def test_compaction_and_interrupted_append(tmp_path):
+    filename = tmp_path / "world.json"
+    box, sph, cyl = _objects()
+    world = World()
+    world.save_incremental(filename)
+    for obj in (box, sph):
+        world.add_object(obj)
+        world.save_incremental(filename)
+    world.wait_for_compaction()
+    world.add_object(cyl)
+    world.save_incremental(filename, compact=True)
+    journal = WorldJournal(filename)
+    assert journal.journal_size() == 0
+    world.move(x=1)
+    world.save_incremental(filename)
+    expected = world.content_hash()
+    with open(journal.journal_filename, 'a') as fout:
+        fout.write('{"op": "remove", "ind')
+    loaded = World.from_journal(filename)
+    assert loaded.content_hash() == expected
+    loaded.move(x=1)
+    loaded.save_incremental(filename)
+    assert World.from_journal(filename).description.moves['x'] == 2
+
+
+def test_new_storage_drops_old_journal(tmp_path):
+    filename = tmp_path / "world.json"
+    box, sph, _ = _objects()
+    world = World()
+    world.save_incremental(filename)
+    world.add_object(box)
+    world.save_incremental(filename)
+    world.wait_for_compaction()
+    other = World()
+    other.add_object(sph)
+    other.save_incremental(filename)
+    assert World.from_journal(filename).content_hash() == other.content_hash()
+
+
+def test_remove_object():
+    box, sph, cyl = _objects()
+    world = World()
+    for obj in (box, sph, cyl):
+        world.add_object(obj)
+    world.remove_object(1)
+    expected = World()
+    for obj in (box, cyl):
+        expected.add_object(obj)
+    assert len(world.description.faces) == len(expected.description.faces)
+    assert set(world.description.points) == set(expected.description.points)
+    assert np.allclose(world.part_bounds, expected.part_bounds)
+    with pytest.raises(IndexError):
+        world.remove_object(2)
+
+
+def test_remove_object_equals_adding_remaining_objects():
+    box, sph, cyl = _objects()
+    touching = Box(width=2, height=2, depth=2)
+    touching.move(x=2)
+    for removed in range(4):
+        objects = [box, sph, touching, cyl]
+        world = World()
+        for obj in objects:
+            world.add_object(obj)
+        world.remove_object(removed)
+        del objects[removed]
+        expected = World()
+        for obj in objects:
+            expected.add_object(obj)
+        assert world.content_hash() == expected.content_hash()
@@ -0,0 +1,60 @@
+import numpy as np
+from object_collection import Box, Sphere, Cylinder, Plane, World
+from primitives import Angle
+from mass import mass_properties
+
+
+def test_box_mass_properties():
+    box = Box(width=1, height=2, depth=3)
+    box.rotate(z=Angle(np.pi/2))
+    box.move(x=100, z=-1)
+    props = box.mass_properties(density=2)
+    assert np.isclose(props.volume, 6)
+    assert np.isclose(props.area, 22)
+    assert np.isclose(props.mass, 12)
+    assert np.allclose(props.centroid, (100, 0, -1))
+    # x and y extents are swapped by the rotation
+    assert np.allclose(props.inertia, np.diag((5, 13, 10)))
+
+
+def test_sphere_mass_properties_and_orientation():
+    sph = Sphere(radius=2, split_num=5)
+    props = sph.mass_properties()
+    assert np.isclose(props.volume, 32/3*np.pi, rtol=1e-2)
+    assert np.isclose(props.area, 16*np.pi, rtol=1e-2)
+    assert np.allclose(props.centroid, 0, atol=1e-9)
+    assert np.allclose(props.inertia, np.eye(3) * 0.4*props.mass*4,
+                       rtol=1e-2)
+    sph.invert()
+    inverted = sph.mass_properties()
+    assert np.isclose(inverted.volume, -props.volume)
+    assert np.allclose(inverted.inertia, props.inertia)
+
+
+def test_open_surface_has_no_centroid():
+    props = Plane(width=2, height=3).mass_properties()
+    assert props.volume == 0 and np.isclose(props.area, 6)
+    assert np.all(np.isnan(props.centroid))
+    assert np.all(np.isnan(props.inertia))
+
+
+def test_world_object_mass_properties():
+    sph = Sphere(radius=1, split_num=3)
+    sph.move(x=5)
+    cyl = Cylinder(radius=1, height=2, r_layer_num=3, h_layer_num=2)
+    world = World()
+    world.add_object(sph)
+    world.add_object(cyl)
+    world.move(y=1)
+    result = world.object_mass_properties()
+    for obj, props in zip((sph, cyl), result):
+        obj.move(y=1)
+        expected = obj.mass_properties()
+        assert np.isclose(props.volume, expected.volume)
+        assert np.isclose(props.area, expected.area)
+        assert np.allclose(props.centroid, expected.centroid)
+        assert np.allclose(props.inertia, expected.inertia)
+    assert np.allclose(result[1].centroid, (0, 1, 1), atol=1e-9)
+    assert World().object_mass_properties() == []
+    empty = mass_properties(np.empty((0, 3)), np.empty((0, 3), dtype=int))
+    assert empty.volume == 0 and empty.area == 0
@@ -0,0 +1,83 @@
+import os
+import numpy as np
+import pytest
+from object_collection import Sphere, Cylinder, Cone, CircleSegment, Plane
+from primitives import Angle
+from mesh_cache import MeshCache, set_mesh_cache, get_mesh_cache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = MeshCache(tmp_path / "cache")
+    set_mesh_cache(cache)
+    yield cache
+    set_mesh_cache(None)
+
+
+def test_cache_is_disabled_by_default():
+    assert get_mesh_cache() is None
+
+
+def test_make_key():
+    assert MeshCache.make_key("Sphere", [1, 2]) == \
+        MeshCache.make_key("Sphere", [1.0, np.int64(2)])
+    assert MeshCache.make_key("Sphere", [1, 2]) != \
+        MeshCache.make_key("Sphere", [1, 3])
+    assert MeshCache.make_key("Sphere", [1, 2]) != \
+        MeshCache.make_key("Circle", [1, 2])
+    assert MeshCache.make_key("Seg", [Angle(1)]) == \
+        MeshCache.make_key("Seg", [Angle(1 + 2*np.pi)])
+
+
+def test_primitives_are_taken_from_cache(cache):
+    for make in (lambda: Sphere(radius=2, split_num=3),
+                 lambda: Cylinder(radius=1, height=2, r_layer_num=2,
+                                  h_layer_num=3),
+                 lambda: Cone(radius=1, height=2, layer_num=2),
+                 lambda: CircleSegment(Angle(0), Angle(1), 2, 2)):
+        built = make()
+        built.description
+        files = set(os.listdir(cache.directory))
+        assert files
+        cached = make()
+        cached.description
+        assert set(os.listdir(cache.directory)) == files
+        assert cached.description.content_hash() == \
+            built.description.content_hash()
+        assert list(cached.description.faces) == list(built.description.faces)
+
+
+def test_cached_description_is_independent(cache):
+    first = Sphere(radius=1, split_num=2)
+    first.move(x=5)
+    first.accept_transformations()
+    second = Sphere(radius=1, split_num=2)
+    assert np.isclose(second.get_max_x(), 1)
+
+
+def test_simple_primitives_are_not_cached(cache):
+    Plane(width=1, height=2).description
+    assert cache.size() == 0
+
+
+def test_cache_eviction(tmp_path):
+    cache = MeshCache(tmp_path, max_bytes=1)
+    cache.store("a", Sphere(1, 2).description)
+    assert "a" not in cache
+    cache.max_bytes = 1 << 20
+    cache.store("a", Sphere(1, 2).description)
+    os.utime(tmp_path / "a.npz", (0, 0))
+    cache.store("b", Sphere(1, 3).description)
+    cache.max_bytes = cache.size() - 1
+    cache.evict()
+    assert "a" not in cache
+    assert "b" in cache
+    assert [p.suffix for p in tmp_path.iterdir()] == [".npz"]
+
+
+def test_damaged_file_is_a_miss(tmp_path):
+    cache = MeshCache(tmp_path)
+    (tmp_path / "a.npz").write_bytes(b"garbage")
+    assert cache.load("a") is None
+    assert "a" not in cache
+    assert cache.load("missing") is None
@@ -0,0 +1,265 @@
+import os
+import stat
+import numpy as np
+import pytest
+from object_collection import Object, Box, Sphere, World
+from primitives import Point, FaceCollection, Vector, Angle
+from mesh_io import (save_stl, save_ply, save_obj, save_mesh, read_stl,
+                     read_ply, read_obj, load_mesh, save_many,
+                     open_temp_file)
+
+
+def _single_face():
+    fc = FaceCollection()
+    fc.add_face(Point(0, 0, 0), Point(1, 0, 0), Point(0, 1, 0))
+    return fc
+
+
+def test_save_stl(tmp_path):
+    box = Box(width=2, height=4, depth=6)
+    filename = tmp_path / "box.stl"
+    save_stl(box.description, filename, chunk_size=5)
+    data = filename.read_bytes()
+    assert len(data) == 84 + 50*12
+    assert np.frombuffer(data, dtype='<u4', count=1, offset=80)[0] == 12
+    records = np.frombuffer(data, dtype=[('n', '<f4', (3,)),
+                                         ('v', '<f4', (3, 3)),
+                                         ('a', '<u2')], offset=84)
+    assert np.allclose(np.abs(records['v'][:, :, 0]), 1)
+    assert np.allclose(np.abs(records['v'][:, :, 1]), 3)
+    assert np.allclose(np.abs(records['v'][:, :, 2]), 2)
+    assert np.allclose(np.linalg.norm(records['n'], axis=1), 1)
+    centers = records['v'].mean(axis=1)
+    assert all((records['n'] * centers).sum(axis=1) > 0)
+
+
+def test_save_stl_applies_transformations(tmp_path):
+    fc = _single_face()
+    fc.move(z=5)
+    filename = tmp_path / "face.stl"
+    save_stl(fc, filename)
+    records = np.frombuffer(filename.read_bytes(), dtype='<f4',
+                            count=12, offset=84).reshape(4, 3)
+    assert np.allclose(records[0], (0, 0, 1))
+    assert np.allclose(records[1:, 2], 5)
+
+
+def test_save_ply(tmp_path):
+    sph = Sphere(radius=3, split_num=2)
+    filename = tmp_path / "sphere.ply"
+    save_ply(sph.description, filename, chunk_size=7)
+    data = filename.read_bytes()
+    end = data.index(b'end_header\n') + len(b'end_header\n')
+    header = data[:end].decode('ascii')
+    assert 'element vertex 18' in header
+    assert 'element face 32' in header
+    vertices = np.frombuffer(data, dtype='<f8', count=18*3,
+                             offset=end).reshape(-1, 3)
+    assert np.allclose(np.linalg.norm(vertices, axis=1), 3)
+    faces = np.frombuffer(data, dtype=[('c', 'u1'), ('i', '<i4', (3,))],
+                          offset=end + vertices.nbytes)
+    assert len(faces) == 32
+    assert all(faces['c'] == 3)
+    assert faces['i'].max() == 17
+
+
+def test_save_obj(tmp_path):
+    fc = _single_face()
+    filename = tmp_path / "face.obj"
+    save_obj(fc, filename)
+    lines = [ln.split() for ln in filename.read_text().splitlines()
+             if not ln.startswith('#')]
+    assert [ln[0] for ln in lines] == ['v', 'v', 'v', 'f']
+    assert [float(v) for v in lines[1][1:]] == [1, 0, 0]
+    assert lines[3][1:] == ['1', '2', '3']
+
+
+def test_save_mesh_unknown_format(tmp_path):
+    with pytest.raises(ValueError):
+        save_mesh(_single_face(), tmp_path / "face.xyz")
+
+
+@pytest.mark.parametrize("suffix", [".stl", ".ply", ".obj"])
+def test_saved_file_does_not_depend_on_chunk_size(tmp_path, suffix):
+    sph = Sphere(radius=2, split_num=3)
+    sph.rotate(z=Angle(1))
+    description = sph.description
+    chunks = list(description.iter_vertex_arrays(7))
+    assert len(chunks) == 10
+    assert np.array_equal(np.concatenate(chunks),
+                          description.get_transformed_vertex_array())
+    assert np.array_equal(np.concatenate(list(
+        description.iter_face_arrays(7))), description.get_face_array())
+    save_mesh(description, tmp_path / ("whole" + suffix))
+    save_mesh(description, tmp_path / ("chunked" + suffix), chunk_size=7)
+    assert (tmp_path / ("whole" + suffix)).read_bytes() == \
+        (tmp_path / ("chunked" + suffix)).read_bytes()
+
+
+@pytest.mark.parametrize("suffix", [".stl", ".ply", ".obj"])
+def test_save_load_round_trip(tmp_path, suffix):
+    sph = Sphere(radius=2, split_num=3)
+    sph.move(x=1)
+    filename = tmp_path / ("sphere" + suffix)
+    sph.save_mesh(filename)
+    res = load_mesh(filename)
+    assert len(res.faces) == 128
+    assert len(res.points) == 66
+    assert np.allclose(np.linalg.norm(res.get_vertex_array() - (1, 0, 0),
+                                      axis=1), 2, atol=1e-6)
+    for p1, p2, p3 in res.faced_points():
+        test = Vector.from_points(Point(1, 0, 0), p1)
+        lhs = Vector.from_points(p1, p2)
+        rhs = Vector.from_points(p1, p3)
+        assert lhs.cross(rhs).dot(test) > 0
+
+
+def test_read_ascii_stl(tmp_path):
+    filename = tmp_path / "face.stl"
+    filename.write_text("solid test\n"
+                        "facet normal 0 0 1\n outer loop\n"
+                        "  vertex 0 0 0\n  vertex 1 0 0\n  vertex 0 1 0\n"
+                        " endloop\nendfacet\n"
+                        "facet normal 0 0 1\n outer loop\n"
+                        "  vertex 1 0 0\n  vertex 1 1 0\n  vertex 0 1 0\n"
+                        " endloop\nendfacet\n"
+                        "endsolid test\n")
+    res = read_stl(filename)
+    assert len(res.points) == 4
+    assert list(res.faces) == [(0, 1, 2), (1, 3, 2)]
+
+
+def test_read_ascii_ply_with_quad(tmp_path):
+    filename = tmp_path / "quad.ply"
+    filename.write_text("ply\nformat ascii 1.0\n"
+                        "element vertex 4\n"
+                        "property float x\nproperty float y\n"
+                        "property float z\nproperty uchar red\n"
+                        "element face 1\n"
+                        "property list uchar int vertex_indices\n"
+                        "end_header\n"
+                        "0 0 0 1\n1 0 0 1\n1 1 0 1\n0 1 0 1\n"
+                        "4 0 1 2 3\n")
+    res = read_ply(filename)
+    assert len(res.points) == 4
+    assert list(res.faces) == [(0, 1, 2), (0, 2, 3)]
+
+
+def test_read_obj_polygons_and_negative_indices(tmp_path):
+    filename = tmp_path / "mesh.obj"
+    filename.write_text("# comment\n"
+                        "v 0 0 0\nv 1 0 0\nv 1 1 0\nv 0 1 0\n"
+                        "vn 0 0 1\n"
+                        "f 1//1 2//1 3//1 4//1\n"
+                        "v 0 0 0\n"
+                        "f -1 -2 -4\n")
+    res = read_obj(filename, chunk_size=3)
+    assert len(res.points) == 4
+    assert list(res.faces) == [(0, 1, 2), (0, 2, 3), (0, 3, 1)]
+
+
+@pytest.mark.parametrize("extra", [" 1", " 0.5 0.25 1"])
+def test_read_obj_ignores_extra_vertex_values(tmp_path, extra):
+    filename = tmp_path / "mesh.obj"
+    filename.write_text(f"v 0 0 0{extra}\nv 1 0 0{extra}\nv 0 1 0{extra}\n"
+                        "f 1 2 3\n")
+    res = read_obj(filename)
+    assert np.allclose(res.get_vertex_array(), [[0, 0, 0], [1, 0, 0],
+                                                [0, 1, 0]])
+    assert list(res.faces) == [(0, 1, 2)]
+
+
+def test_read_obj_keeps_face_order_of_mixed_polygons(tmp_path):
+    filename = tmp_path / "mesh.obj"
+    filename.write_text("v\t0 0 0\nv\t1 0 0\nv 1 1 0  # corner\n"
+                        "v 0 1 0\r\nv 0 0 1\n"
+                        "f 1/1 2/2 5/3\nf\t1 2 3 4\r\n"
+                        "f 2 3 5 # side\nvt 0 0\n")
+    res = read_obj(filename, chunk_size=4)
+    assert len(res.points) == 5
+    assert list(res.faces) == [(0, 1, 4), (0, 1, 2), (0, 2, 3), (1, 2, 4)]
+
+
+@pytest.mark.parametrize("content", ["v 0 0\n", "v 0 0 0\nf 1 2\n",
+                                     "v 0 0 0\nf 1 1 4\n",
+                                     "v 0 x 0\n"])
+def test_read_obj_rejects_malformed_lines(tmp_path, content):
+    filename = tmp_path / "mesh.obj"
+    filename.write_text(content)
+    with pytest.raises(ValueError):
+        read_obj(filename)
+
+
+def test_from_arrays_welds_vertices():
+    vertices = np.array([[0, 0, 0], [1, 0, 0], [0, 1, 0],
+                         [1e-12, 0, 0], [0, 1, 0], [-1, 0, 0]])
+    res = FaceCollection.from_arrays(vertices, [[0, 1, 2], [3, 4, 5],
+                                                [0, 3, 4]])
+    assert len(res.points) == 4
+    assert list(res.faces) == [(0, 1, 2), (0, 2, 3)]
+
+
+def test_object_from_mesh_file(tmp_path):
+    filename = tmp_path / "box.stl"
+    Box(width=2, height=2, depth=2).save_mesh(filename)
+    box = Object.from_mesh_file(filename)
+    box.move(z=10)
+    box.accept_transformations()
+    world = World()
+    world.add_object(box)
+    assert len(world.description.faces) == 12
+    assert np.isclose(world.get_min_z(), 9)
+
+
+@pytest.mark.parametrize("use_processes", [False, True])
+def test_save_many(tmp_path, use_processes):
+    items = {"sphere.json": Sphere(radius=1, split_num=2),
+             "box.stl": Box(width=1, height=2, depth=3),
+             "face.ply": _single_face(),
+             "face.obj": _single_face()}
+    report = save_many(items, tmp_path / "out", max_workers=2,
+                       use_processes=use_processes)
+    assert sorted(p.name for p in report.written) == sorted(items)
+    assert report.skipped == []
+    assert report.bytes_written == sum(p.stat().st_size
+                                       for p in report.written)
+    assert report.bytes_per_second > 0
+    assert sorted(p.name for p in (tmp_path / "out").iterdir()) == \
+        sorted(items)
+    res = FaceCollection.from_json_file(tmp_path / "out" / "sphere.json")
+    assert res.content_hash() == items["sphere.json"].content_hash()
+    # the same permissions as files written by save_to_file
+    items["sphere.json"].save_to_file(tmp_path / "plain.json")
+    assert {p.stat().st_mode for p in report.written} == \
+        {(tmp_path / "plain.json").stat().st_mode}
+    assert len(read_stl(tmp_path / "out" / "box.stl").faces) == 12
+
+
+@pytest.mark.skipif(os.name != 'posix', reason="needs posix permissions")
+def test_open_temp_file_applies_umask(tmp_path):
+    umask = os.umask(0o027)
+    try:
+        fd, name = open_temp_file(tmp_path, prefix='.a.', suffix='.tmp')
+        os.close(fd)
+    finally:
+        os.umask(umask)
+    assert stat.S_IMODE(os.stat(name).st_mode) == 0o640
+    assert os.path.basename(name).startswith('.a.')
+    assert name.endswith('.tmp')
+
+
+def test_save_many_skip_unchanged(tmp_path):
+    sph = Sphere(radius=1, split_num=2)
+    box = Box(width=1, height=2, depth=3)
+    save_many({"sphere.json": sph, "box.json": box}, tmp_path)
+    box.move(x=1)
+    report = save_many({"sphere.json": sph, "box.json": box}, tmp_path,
+                       skip_unchanged=True)
+    assert [p.name for p in report.written] == ["box.json"]
+    assert [p.name for p in report.skipped] == ["sphere.json"]
+
+
+def test_save_many_rejects_unknown_format(tmp_path):
+    with pytest.raises(ValueError):
+        save_many({"face.xyz": _single_face()}, tmp_path)
+    assert list(tmp_path.iterdir()) == []
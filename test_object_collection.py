@@ -1,6 +1,7 @@
 import numpy as np
+import pytest
 from object_collection import Plane, CircleSegment, Circle, Tube, Cylinder, Cone, ConeNoBase, Box, Sphere, World
-from primitives import Angle, Point, Vector
+from primitives import Angle, FaceCollection, Point, Vector
 
 
 def test_plane_creation():
@@ -324,6 +325,17 @@ def test_sphere_creation_split_3():
         assert lhs.cross(rhs).dot(test) > 0
 
 
+def test_sphere_tessellation_matches_split_faces():
+    sph = Sphere(radius=2, split_num=4)
+    faces = Sphere._octahedron(2)
+    for _ in range(3):
+        faces = Sphere._split_faces(faces)
+    expected = FaceCollection()
+    for face in faces:
+        expected.add_face(*(Point(*p) for p in face))
+    assert sph.description.content_hash() == expected.content_hash()
+
+
 def test_world_add_object():
     pl1 = Plane(width=3, height=5)
     pl1.rotate(x=Angle(np.pi/2))
@@ -344,3 +356,126 @@ def test_world_add_object():
     assert pl1.description.rotations['x'] == Angle(np.pi/2)
     assert pl1.description.rotations['y'] == Angle(0)
     assert pl1.description.rotations['z'] == Angle(0)
+    # objects without queued transformations are not copied
+    assert world.parts[1].shares_geometry(pl2.description)
+
+
+def _sphere_deviation(description, radius):
+    tri = description.get_vertex_array()[description.get_face_array()]
+    normals = np.cross(tri[:, 1] - tri[:, 0], tri[:, 2] - tri[:, 0])
+    normals /= np.linalg.norm(normals, axis=1, keepdims=True)
+    return radius - np.abs((normals * tri[:, 0]).sum(axis=1)).min()
+
+
+def test_sphere_from_tolerance():
+    for tolerance in (0.5, 0.05, 0.005):
+        sph = Sphere.from_tolerance(radius=3, tolerance=tolerance)
+        assert _sphere_deviation(sph.description, 3) <= tolerance
+        coarser = Sphere(radius=3, split_num=sph.split_num - 1) \
+            if sph.split_num > 1 else None
+        if coarser is not None:
+            assert _sphere_deviation(coarser.description, 3) > tolerance
+
+
+def test_circle_based_from_tolerance():
+    radius, tolerance = 2, 0.01
+    circle = Circle.from_tolerance(radius, tolerance)
+    outer = [p for p in circle.description.points if np.isclose(p.r, radius)]
+    assert radius*(1 - np.cos(np.pi/len(outer))) <= tolerance
+    assert radius*(1 - np.cos(np.pi/(len(outer) - 6))) > tolerance
+    # flat and ruled surfaces get one layer of faces per border chord
+    assert len(circle.description.faces) == len(outer)
+    cone = Cone.from_tolerance(radius, 1, tolerance)
+    assert len(cone.description.faces) == 2*len(outer)
+    assert cone.description.get_adjacency().is_watertight()
+    assert cone.layer_num == circle.layer_num
+    assert ConeNoBase.from_tolerance(radius, 1, tolerance).layer_num == \
+        circle.layer_num
+    cyl = Cylinder.from_tolerance(radius, 5, tolerance)
+    assert (cyl.r_layer_num, cyl.h_layer_num) == (circle.layer_num, 1)
+    assert len(cyl.description.faces) == 4*len(outer)
+    assert cyl.description.get_adjacency().is_watertight()
+    tube = Tube.from_tolerance(radius, 5, tolerance)
+    assert (tube.r_layer_num, tube.h_layer_num) == (circle.layer_num, 1)
+    seg = CircleSegment.from_tolerance(Angle(0), Angle(np.pi/2), radius,
+                                       tolerance)
+    assert radius*(1 - np.cos(np.pi/4/seg.layer_num)) <= tolerance
+    assert radius*(1 - np.cos(np.pi/4/(seg.layer_num - 1))) > tolerance
+
+
+def test_from_tolerance_rejects_bad_tolerance():
+    with pytest.raises(ValueError):
+        Sphere.from_tolerance(radius=1, tolerance=0)
+    with pytest.raises(ValueError):
+        Circle.from_tolerance(radius=1, tolerance=-1)
+    assert Circle.from_tolerance(radius=1, tolerance=5).layer_num == 1
+
+
+def test_world_single_precision():
+    world = World(precision='single')
+    sph = Sphere(radius=1, split_num=3)
+    sph.move(x=0.1)
+    world.add_object(sph)
+    assert world.description.precision == 'single'
+    assert len(world.description.faces) == len(sph.description.faces)
+    vertices = world.description.get_vertex_array()
+    assert vertices.dtype == np.float32
+    assert np.allclose(vertices,
+                       sph.description.get_transformed_vertex_array(),
+                       atol=1e-6)
+
+
+def test_primitives_are_tessellated_lazily():
+    sph = Sphere(radius=1, split_num=3)
+    sph.move(x=1)
+    sph.rotate(z=Angle(np.pi/2))
+    sph.accept_transformations()
+    sph.move(z=2)
+    assert not sph.is_tessellated()
+    # queued rotation is applied before the move
+    assert np.allclose(sph.analytic_bounds(), [[0, -1, 1], [2, 1, 3]])
+    eager = Sphere(radius=1, split_num=3)
+    eager.description.move(x=1)
+    eager.description.rotate(z=Angle(np.pi/2))
+    eager.description.accept_transformations()
+    eager.description.move(z=2)
+    assert sph.content_hash() == eager.content_hash()
+    assert sph.is_tessellated()
+    vertices = sph.description.get_transformed_vertex_array()
+    bounds = sph.analytic_bounds()
+    assert np.all(vertices >= bounds[0] - 1e-9)
+    assert np.all(vertices <= bounds[1] + 1e-9)
+
+
+@pytest.mark.parametrize("obj, area, volume", [
+    (Plane(width=2, height=3), 6, 0),
+    (Box(width=1, height=2, depth=3), 22, 6),
+    (CircleSegment(Angle(0), Angle(np.pi/2), 2, 1), np.pi, 0),
+    (Cylinder(radius=1, height=2, r_layer_num=1, h_layer_num=1),
+     6*np.pi, 2*np.pi),
+    (Cone(radius=3, height=4, layer_num=1), 24*np.pi, 12*np.pi),
+    (Sphere(radius=2, split_num=1), 16*np.pi, 32/3*np.pi),
+])
+def test_analytic_properties(obj, area, volume):
+    assert np.isclose(obj.analytic_area(), area)
+    assert np.isclose(obj.analytic_volume(), volume)
+    assert not obj.is_tessellated()
+    vertices = obj.description.get_vertex_array()
+    bounds = obj.analytic_bounds()
+    assert np.all(vertices >= bounds[0] - 1e-9)
+    assert np.all(vertices <= bounds[1] + 1e-9)
+    assert np.isclose(obj.analytic_area(), area)
+
+
+def test_analytic_bounds_follow_description():
+    sph = Sphere(radius=1, split_num=2)
+    sph.description.move(x=10)
+    assert np.allclose(sph.analytic_bounds()[:, 0], (9, 11))
+    world = World()
+    world.add_object(sph)
+    assert np.allclose(world.analytic_bounds(), sph.analytic_bounds())
+    assert np.isclose(world.analytic_volume(), sph.mass_properties().volume)
+    with pytest.raises(TypeError):
+        world._local_bounds()
+    with pytest.raises(TypeError, match="World has no tessellation"):
+        world._tessellate()
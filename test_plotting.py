@@ -0,0 +1,54 @@
+import numpy as np
+from object_collection import Box, Sphere
+from plotting import (view_angles, back_faces, outside_box, cluster_vertices,
+                      unique_edges, prepare_mesh)
+
+
+def _arrays(obj):
+    return (obj.description.get_vertex_array(),
+            obj.description.get_face_array())
+
+
+def test_view_angles():
+    assert np.isclose(view_angles((0, 0, -1))[0], 90)
+    assert np.allclose(view_angles((-1, 0, 0)), (0, 0))
+    assert np.allclose(view_angles((0, -1, 0)), (0, 90))
+
+
+def test_back_faces_of_box():
+    vertices, faces = _arrays(Box(width=1, height=1, depth=1))
+    back = back_faces(vertices, faces, (0, 0, -1))
+    # only the top face is visible from above
+    assert np.allclose(vertices[faces[~back]][..., 2], 0.5)
+    assert back.sum() == len(faces) - 2
+
+
+def test_outside_box():
+    vertices, faces = _arrays(Sphere(radius=1, split_num=3))
+    outside = outside_box(vertices, faces, (-2, -2, 0.5), (2, 2, 2))
+    assert np.all(vertices[faces[outside]][..., 2].max(axis=1) < 0.5)
+    assert np.all(vertices[faces[~outside]][..., 2].max(axis=1) >= 0.5)
+
+
+def test_cluster_vertices_keeps_closed_surface():
+    vertices, faces = _arrays(Sphere(radius=1, split_num=5))
+    small_vertices, small_faces = cluster_vertices(vertices, faces, 0.2)
+    assert len(small_faces) < len(faces) / 2
+    assert np.allclose(np.linalg.norm(small_vertices, axis=1), 1, atol=0.1)
+    # every edge of the decimated surface is still shared by two faces
+    edges = np.sort(small_faces[:, [0, 1, 1, 2, 2, 0]].reshape(-1, 2), axis=1)
+    _, counts = np.unique(edges, axis=0, return_counts=True)
+    assert np.all(counts == 2)
+    assert len(unique_edges(small_faces)) == len(edges) // 2
+
+
+def test_prepare_mesh_and_plot():
+    sph = Sphere(radius=1, split_num=4)
+    vertices, faces = _arrays(sph)
+    front = prepare_mesh(vertices, faces, view_direction=(1, 0, 0))[1]
+    assert abs(len(front) - len(faces) / 2) < len(faces) * 0.05
+    fig = sph.plot(view_direction=(1, 1, -1), min_face_pixels=3)
+    ax = fig.axes[0]
+    assert len(ax.collections) == 2
+    assert np.allclose((ax.elev, ax.azim), view_angles((1, 1, -1)))
+    assert np.isinf(ax._focal_length)
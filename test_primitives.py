@@ -1,5 +1,10 @@
+import os
+import subprocess
+import sys
 import numpy as np
-from primitives import Point, PointCollection, FaceCollection, Angle, Vector
+import pytest
+from primitives import (Point, PointCollection, FaceCollection, Angle, Vector,
+                        PointArray, VectorArray, AngleArray)
 
 
 
@@ -266,3 +271,250 @@ def test_vector_cross():
     assert x.cross(x) == zero
     assert y.cross(y) == zero
     assert z.cross(z) == zero
+
+
+def test_point_array_conversion():
+    points = [Point(1, 2, 3), Point(4, 5, 6)]
+    arr = PointArray.from_points(points)
+    assert arr.coords.shape == (2, 3)
+    assert arr.to_points() == points
+    assert arr[1] == Point(4, 5, 6)
+    assert len(arr[:1]) == 1
+
+
+def test_point_array_spherical():
+    arr = PointArray.from_spherical([5, 5], [np.pi/2, np.pi/2],
+                                    [np.pi, np.pi/2])
+    assert np.allclose(arr.coords, [(0, 0, -5), (0, 5, 0)])
+    assert np.allclose(arr.r, 5)
+    points = [Point(1, -1, 2), Point(-3, 0.5, -1), Point(0, 0, 1)]
+    arr = PointArray.from_points(points)
+    assert arr.phi.to_angles() == [p.phi for p in points]
+    assert arr.theta.to_angles() == [p.theta for p in points]
+    same = PointArray.from_spherical(3, Angle(np.pi), np.linspace(0, 1, 4))
+    assert len(same) == 4
+    assert np.allclose(same.r, 3)
+
+
+def test_point_array_matches_point_transformations():
+    points = [Point(1, 0, 0), Point(0, 1, 0), Point(0.3, -2, 5)]
+    arr = PointArray.from_points(points)
+    angle = Angle(np.pi/3)
+    for method in ('rotate_x', 'rotate_y', 'rotate_z'):
+        res = getattr(arr, method)(angle).to_points()
+        assert res == [getattr(p, method)(angle) for p in points]
+    assert arr.move(1, 2, 3).to_points() == [p.move(1, 2, 3) for p in points]
+
+
+def test_vector_array_operations():
+    lhs = VectorArray.from_vectors([Vector(1, 0, 0), Vector(0, 1, 0)])
+    rhs = VectorArray.from_vectors([Vector(0, 1, 0), Vector(0, 2, 0)])
+    assert list(lhs.dot(rhs)) == [0, 2]
+    assert lhs.cross(rhs).to_vectors() == [Vector(0, 0, 1), Vector(0, 0, 0)]
+    assert np.allclose(rhs.norm(), [1, 2])
+    assert np.allclose(lhs.angle(rhs), [np.pi/2, 0])
+    start = PointArray.from_points([Point(1, 2, 3)])
+    end = PointArray.from_points([Point(4, 9, 12)])
+    assert VectorArray.from_points(start, end)[0] == Vector(3, 7, 9)
+
+
+def test_angle_array_matches_angle():
+    values = [0, 1, 3, 2*np.pi, 3*np.pi, -1, -3, -2*np.pi, -3*np.pi]
+    arr = AngleArray(values)
+    assert len(arr) == len(values)
+    assert arr.to_angles() == [Angle(v) for v in values]
+    assert arr[4] == Angle(np.pi)
+    assert arr[1:3] == AngleArray([1, 3])
+
+
+def test_angle_array_arithmetic():
+    lhs = AngleArray([1, 6])
+    rhs = AngleArray([2*np.pi - 1, 1])
+    assert (lhs + rhs).to_angles() == [Angle(0), Angle(7)]
+    assert (lhs - rhs).to_angles() == [Angle(2 - 2*np.pi), Angle(5)]
+    assert (lhs + Angle(1)).to_angles() == [Angle(2), Angle(7)]
+
+
+def test_angle_linspace_returns_angle_array():
+    res = Angle.linspace(Angle(0), Angle(2*np.pi), 4, endpoint=True)
+    assert isinstance(res, AngleArray)
+    assert res == AngleArray(np.linspace(0, 2*np.pi, 4))
+    points = PointArray.from_spherical(2, res, Angle(np.pi/2))
+    assert np.allclose(points.r, 2)
+
+
+def test_face_collection_keeps_face_order():
+    test = FaceCollection()
+    test.add_face(Point(1, 0, 0), Point(0, 1, 0), Point(0, 0, 1))
+    test.add_face(Point(0, 1, 1), Point(0, 1, 0), Point(1, 0, 0))
+    test.add_face(Point(0, 0, 0), Point(0, 1, 0), Point(1, 0, 0))
+    test.add_face(Point(1, 0, 0), Point(0, 1, 0), Point(0, 0, 1))
+    assert list(test.faces) == [(0, 1, 2), (3, 1, 0), (4, 1, 0)]
+    test.invert()
+    assert list(test.faces) == [(2, 1, 0), (0, 1, 3), (0, 1, 4)]
+
+
+def test_face_collection_content_hash():
+    def build():
+        test = FaceCollection()
+        test.add_face(Point(1, 0, 0), Point(0, 1, 0), Point(0, 0, 1))
+        test.add_face(Point(1, 0, 0), Point(0, 1, 0), Point(0, 1, 1))
+        return test
+    lhs, rhs = build(), build()
+    assert lhs.content_hash() == rhs.content_hash()
+    rhs.move(x=1)
+    assert lhs.content_hash() != rhs.content_hash()
+    rhs.move(x=-1)
+    rhs.invert()
+    assert lhs.content_hash() != rhs.content_hash()
+
+
+def test_face_collection_content_hash_is_stable_between_runs():
+    script = ("from object_collection import Cylinder;"
+              "print(Cylinder(1, 2, 2, 2).description.content_hash())")
+    hashes = {subprocess.run([sys.executable, "-c", script],
+                             env={**os.environ, "PYTHONHASHSEED": seed},
+                             cwd=os.path.dirname(os.path.abspath(__file__)),
+                             capture_output=True, text=True,
+                             check=True).stdout
+              for seed in ("1", "2")}
+    assert len(hashes) == 1
+
+
+def test_face_collection_save_skip_unchanged(tmp_path):
+    test = FaceCollection()
+    test.add_face(Point(1, 0, 0), Point(0, 1, 0), Point(0, 0, 1))
+    filename = tmp_path / "test_file.json"
+    assert test.save_to_file(filename, skip_unchanged=True)
+    assert not test.save_to_file(filename, skip_unchanged=True)
+    assert test.save_to_file(filename)
+    test.move(z=1)
+    assert test.save_to_file(filename, skip_unchanged=True)
+    res = FaceCollection.from_json_file(filename)
+    assert res.content_hash() == test.content_hash()
+    assert list(res.faces) == list(test.faces)
+
+
+def test_face_collection_single_precision(tmp_path):
+    fc = FaceCollection(precision='single')
+    fc.add_face(Point(0.1, 0, 0), Point(0, 0.1, 0), Point(0, 0, 0.1))
+    fc.add_face(Point(0.1 + 1e-9, 0, 0), Point(0, 0, 0.1), Point(0, 0.1, 0))
+    assert len(fc.points) == 3
+    assert list(fc.points)[0] == Point(float(np.float32(0.1)), 0, 0)
+    assert fc.get_vertex_array().dtype == np.float32
+    assert fc.get_face_array().dtype == np.int32
+    fc.move(x=1)
+    assert fc.get_transformed_vertex_array().dtype == np.float32
+    filename = tmp_path / "single.json"
+    fc.save_to_file(filename)
+    res = FaceCollection.from_json_file(filename)
+    assert res.precision == 'single'
+    assert res.content_hash() == fc.content_hash()
+    assert fc.with_precision('double').content_hash() != fc.content_hash()
+
+
+def test_face_collection_with_precision_welds_points():
+    vertices = np.array([[0, 0, 0], [1, 0, 0], [0, 1, 0], [1 + 1e-9, 0, 0]])
+    fc = FaceCollection.from_arrays(vertices, [[0, 1, 2], [0, 3, 2]])
+    assert len(fc.points) == 4
+    res = fc.with_precision('single')
+    assert len(res.points) == 3
+    assert list(res.faces) == [(0, 1, 2)]
+    double = FaceCollection.merge(FaceCollection(), res)
+    assert double.precision == 'double'
+    single = FaceCollection.merge(res, fc)
+    assert len(single.points) == 3
+
+
+def test_single_precision_arrays_are_stored_compactly():
+    vertices = np.random.default_rng(0).random((30, 3))
+    faces = np.arange(30).reshape(-1, 3)
+    double = FaceCollection.from_arrays(vertices, faces)
+    single = double.with_precision('single')
+    assert single.points._coords.dtype == np.float32
+    assert single._face_rows.dtype == np.int32
+    assert single.points._coords.nbytes * 2 == double.points._coords.nbytes
+    single.add_face(*next(double.faced_points()))
+    assert len(single.faces) == 10 and len(single.points) == 30
+
+
+def test_single_precision_overflows_to_infinity():
+    fc = FaceCollection('single')
+    with pytest.warns(RuntimeWarning):
+        fc.add_face(Point(1e39, 0, 0), Point(0, 1, 0), Point(0, 0, 1))
+    assert list(fc.points)[0] == Point(np.inf, 0, 0)
+
+
+def test_face_collection_rejects_unknown_precision():
+    with pytest.raises(ValueError):
+        FaceCollection(precision='half')
+
+
+def test_face_collection_clone_copies_on_write():
+    fc = FaceCollection()
+    fc.add_face(Point(0, 0, 0), Point(1, 0, 0), Point(0, 1, 0))
+    clone = fc.clone()
+    assert clone.shares_geometry(fc)
+    clone.move(x=1)
+    clone.get_vertex_array()
+    assert fc.moves['x'] == 0 and clone.shares_geometry(fc)
+    clone.add_face(Point(0, 0, 0), Point(0, 1, 0), Point(0, 0, 1))
+    assert len(fc.faces) == 1 and len(fc.points) == 3
+    assert len(clone.faces) == 2 and len(clone.points) == 4
+    fc.add_face(Point(0, 0, 0), Point(0, 0, 1), Point(1, 0, 0))
+    assert len(fc.faces) == 2 and len(clone.faces) == 2
+    assert not clone.shares_geometry(fc)
+
+
+def test_face_collection_clone_buffers_are_read_only():
+    fc = FaceCollection()
+    fc.add_face(Point(0, 0, 0), Point(1, 0, 0), Point(0, 1, 0))
+    clone = fc.clone()
+    with pytest.raises(TypeError):
+        clone.faces[(0, 2, 1)] = None
+    with pytest.raises(ValueError):
+        clone.points.add_point(Point(0, 0, 1))
+    with pytest.raises(ValueError):
+        fc.points.move(x=1, inplace=True)
+    clone.invert()
+    clone.move(x=1)
+    clone.accept_transformations()
+    assert list(fc.faces) == [(0, 1, 2)]
+    assert list(fc.points) == [Point(0, 0, 0), Point(1, 0, 0), Point(0, 1, 0)]
+
+
+def test_face_collection_merge_extends_clone_of_lhs():
+    lhs = FaceCollection()
+    lhs.add_face(Point(0, 0, 0), Point(1, 0, 0), Point(0, 1, 0))
+    rhs = FaceCollection()
+    rhs.add_face(Point(1, 0, 0), Point(0, 0, 0), Point(0, 0, 1))
+    merged = FaceCollection.merge(lhs, rhs)
+    assert list(merged.faces) == [(0, 1, 2), (1, 0, 3)]
+    assert len(lhs.faces) == 1 and len(lhs.points) == 3
+    single = FaceCollection('single')
+    single.extend(rhs)
+    assert single.precision == 'single' and len(single.faces) == 1
+    rhs.move(x=1)
+    with pytest.raises(ValueError):
+        lhs.extend(rhs)
+
+
+def test_replaced_buffers_are_not_shared():
+    fc = FaceCollection()
+    fc.add_face(Point(0, 0, 0), Point(1, 0, 0), Point(0, 1, 0))
+    clone = fc.clone()
+    fc.points = fc.points.copy()
+    fc.faces = list(fc.faces)
+    fc.add_face(Point(0, 0, 0), Point(0, 1, 0), Point(0, 0, 1))
+    clone.add_face(Point(1, 0, 0), Point(0, 0, 0), Point(0, 0, 1))
+    assert list(fc.faces) == [(0, 1, 2), (0, 2, 3)]
+    assert list(clone.faces) == [(0, 1, 2), (1, 0, 3)]
+
+
+def test_face_collection_merge_with_empty_shares_geometry():
+    fc = FaceCollection()
+    fc.add_face(Point(0, 0, 0), Point(1, 0, 0), Point(0, 1, 0))
+    merged = FaceCollection.merge(FaceCollection(), fc)
+    assert merged.shares_geometry(fc)
+    assert merged.content_hash() == fc.content_hash()
+    assert FaceCollection.merge(fc, FaceCollection()).shares_geometry(fc)
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+from object_collection import Box, Sphere
+from render import Camera, orbit, render, render_frames, save_image
+
+
+def test_camera_rays():
+    camera = Camera((0, -5, 0), (0, 0, 0), width=4, height=2, fov=90)
+    origins, directions = camera.rays(slice(None), slice(None))
+    assert origins.shape == directions.shape == (8, 3)
+    assert np.allclose(np.linalg.norm(directions, axis=1), 1)
+    assert np.all(directions[:, 1] > 0)
+    assert np.all(directions[:4, 2] > 0) and np.all(directions[4:, 2] < 0)
+    assert np.all(np.diff(directions[:4, 0]) > 0)
+    with pytest.raises(ValueError):
+        Camera((0, 0, 5), (0, 0, 0)).basis()
+
+
+def test_orbit():
+    cameras = orbit((1, 0, 0), radius=2, elevation=1, frame_num=4, width=8)
+    assert len(cameras) == 4
+    assert np.allclose(cameras[1].position, (1, 2, 1))
+    assert all(c.target == (1, 0, 0) and c.width == 8 for c in cameras)
+
+
+def test_render_sphere(tmp_path):
+    sph = Sphere(radius=1, split_num=4)
+    sph.move(x=1)
+    camera = Camera((1, -4, 0), (1, 0, 0), width=40, height=30)
+    image = render(sph, camera, tile_size=16, max_workers=1)
+    assert image.shape == (30, 40)
+    assert image[15, 20] > 0.95
+    assert image[0, 0] == 0
+    assert image.max() <= 1
+    save_image(image, tmp_path / "sphere.png")
+    assert (tmp_path / "sphere.png").stat().st_size > 0
+
+
+def test_render_frames_in_processes_matches_serial():
+    box = Box(width=1, height=2, depth=3)
+    cameras = orbit((0, 0, 0), radius=6, elevation=2, frame_num=3,
+                    width=24, height=20)
+    serial = render_frames(box, cameras, tile_size=7, max_workers=1)
+    parallel = render_frames(box.description, cameras, tile_size=7,
+                             max_workers=2)
+    for lhs, rhs in zip(serial, parallel):
+        assert np.array_equal(lhs, rhs)
+        assert lhs.max() > 0
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+from object_collection import Box, Sphere, Plane
+from primitives import FaceCollection, Point
+from sampling import SurfaceSampler, sample_surface
+
+
+def test_sample_box_surface():
+    box = Box(width=2, height=4, depth=6)
+    box.move(z=10)
+    samples = box.sample_surface(30000, seed=1)
+    assert samples.positions.shape == samples.normals.shape == (30000, 3)
+    pos = samples.positions - (0, 0, 10)
+    on_face = np.isclose(np.abs(pos), (1, 3, 2)).any(axis=1)
+    assert on_face.all()
+    assert np.all(np.abs(pos) <= np.array([1, 3, 2]) + 1e-9)
+    # area of faces orthogonal to x, y and z axes is 24, 8 and 12
+    fractions = np.abs(samples.normals).mean(axis=0)
+    assert np.allclose(fractions, np.array([24, 8, 12]) / 44, atol=0.02)
+    centers = np.einsum('ij,ij->i', samples.normals, pos)
+    assert np.all(centers > 0)
+    faces = samples.faces
+    assert faces.min() >= 0 and faces.max() < 12
+
+
+def test_sample_is_seedable_and_chunked():
+    sph = Sphere(radius=1, split_num=3)
+    sampler = SurfaceSampler(sph.description)
+    full = sampler.sample(1000, seed=7)
+    chunks = list(sampler.iter_samples(1000, seed=7, chunk_size=300))
+    assert [len(c.faces) for c in chunks] == [300, 300, 300, 100]
+    for field in range(3):
+        assert np.array_equal(np.concatenate([c[field] for c in chunks]),
+                              full[field])
+    assert not np.array_equal(sampler.sample(1000, seed=8).positions,
+                              full.positions)
+
+
+def test_sample_inside_faces_is_uniform():
+    plane = Plane(width=2, height=2)
+    samples = plane.sample_surface(40000, seed=3)
+    assert np.allclose(samples.positions[:, 2], 0)
+    hist, _, _ = np.histogram2d(samples.positions[:, 0],
+                                samples.positions[:, 1], bins=4)
+    assert np.allclose(hist / 2500, 1, atol=0.1)
+
+
+def test_sample_skips_degenerate_faces():
+    fc = FaceCollection()
+    fc.add_face(Point(0, 0, 0), Point(1, 0, 0), Point(2, 0, 0))
+    fc.add_face(Point(0, 0, 0), Point(1, 0, 0), Point(0, 1, 0))
+    assert np.all(sample_surface(fc, 100, seed=0).faces == 1)
+    with pytest.raises(ValueError):
+        sample_surface(FaceCollection(), 10)
@@ -0,0 +1,97 @@
+import copy
+import json
+import numpy as np
+import pytest
+from object_collection import Cylinder, Sphere, World
+from primitives import Angle
+from scene import build_scene
+
+
+SPEC = {
+    "nodes": [
+        {"name": "wheel", "primitive": "Cylinder",
+         "parameters": {"radius": 1, "height": 0.5, "r_layer_num": 2,
+                        "h_layer_num": 1},
+         "transforms": [{"move": {"z": -0.25}},
+                        {"rotate": {"y": np.pi/2}, "move": {"x": 2}}]},
+        {"name": "wheel_2", "instance_of": "wheel",
+         "transforms": [{"move": {"y": 3}}]},
+        {"name": "ball", "primitive": "Sphere",
+         "parameters": {"radius": 0.5, "split_num": 2},
+         "transforms": [{"move": {"z": 2}}]},
+        {"name": "same_ball", "primitive": "Sphere",
+         "parameters": {"split_num": 2, "radius": 0.5},
+         "transforms": [{"move": {"z": 2}}], "add": False},
+        {"name": "segment", "primitive": "CircleSegment",
+         "parameters": {"phi_from": 0, "phi_to": 1, "radius": 1,
+                        "layer_num": 1}, "invert": True},
+    ]
+}
+
+
+def _arrays(obj):
+    return (obj.description.get_vertex_array(),
+            obj.description.get_face_array())
+
+
+def test_build_scene_matches_imperative_construction(tmp_path):
+    filename = tmp_path / "scene.json"
+    filename.write_text(json.dumps(SPEC))
+    scene = build_scene(str(filename))
+    wheel = Cylinder(radius=1, height=0.5, r_layer_num=2, h_layer_num=1)
+    wheel.move(z=-0.25)
+    wheel.accept_transformations()
+    wheel.rotate(y=Angle(np.pi/2))
+    wheel.move(x=2)
+    wheel.accept_transformations()
+    ball = Sphere(radius=0.5, split_num=2)
+    ball.move(z=2)
+    ball.accept_transformations()
+    for name, expected in (("wheel", wheel), ("ball", ball),
+                           ("same_ball", ball)):
+        vertices, faces = _arrays(scene.objects[name])
+        assert np.allclose(vertices, expected.description.get_vertex_array())
+        assert np.array_equal(faces, expected.description.get_face_array())
+    wheel_2 = scene.objects["wheel_2"].description.get_vertex_array()
+    assert np.allclose(wheel_2, _arrays(scene.objects["wheel"])[0] + (0, 3, 0))
+    world = World()
+    for name in ("wheel", "wheel_2", "ball", "segment"):
+        world.add_object(scene.objects[name])
+    assert scene.world.content_hash() == world.content_hash()
+    assert sorted(scene.built) == sorted(scene.objects)
+
+
+def test_build_scene_rebuilds_only_changed_nodes(tmp_path):
+    cache = tmp_path / "cache"
+    first = build_scene(SPEC, cache_dir=cache)
+    again = build_scene(SPEC, cache_dir=cache)
+    assert again.built == []
+    assert again.world.content_hash() == first.world.content_hash()
+    changed = copy.deepcopy(SPEC)
+    changed["nodes"][0]["transforms"][1]["move"]["x"] = 3
+    rebuilt = build_scene(changed, cache_dir=cache)
+    # instance follows its base node
+    assert rebuilt.built == ["wheel", "wheel_2"]
+    assert np.allclose(_arrays(rebuilt.objects["wheel"])[0],
+                       _arrays(first.objects["wheel"])[0] + (1, 0, 0))
+
+
+def test_build_scene_in_processes_matches_serial():
+    serial = build_scene(SPEC)
+    parallel = build_scene(SPEC, max_workers=2)
+    assert parallel.world.content_hash() == serial.world.content_hash()
+
+
+@pytest.mark.parametrize("nodes", [
+    [{"name": "a", "primitive": "Teapot"}],
+    [{"name": "a", "instance_of": "b"}],
+    [{"name": "a", "primitive": "Sphere",
+      "parameters": {"radius": 1, "split_num": 1}}] * 2,
+    [{"name": "a", "primitive": "Sphere", "parameters": {"radius": 1}}],
+    [{"name": "a", "primitive": "Sphere",
+      "parameters": {"radius": 1, "split_num": 1},
+      "transforms": [{"scale": 2}]}],
+])
+def test_build_scene_rejects_wrong_description(nodes):
+    with pytest.raises(ValueError):
+        build_scene({"nodes": nodes})
@@ -0,0 +1,62 @@
+import multiprocessing
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pytest
+from object_collection import Sphere, World
+from shared_mesh import SharedMesh, get_attached
+
+
+def _vertex_sum(handle):
+    mesh = get_attached(handle)
+    return mesh.vertices.sum(axis=0).tolist(), int(mesh.faces.max())
+
+
+def _is_writeable(shared):
+    mesh = get_attached(shared.handle)
+    return mesh.vertices.flags.writeable or mesh.faces.flags.writeable
+
+
+def test_shared_mesh_round_trip():
+    sph = Sphere(radius=1, split_num=3)
+    sph.move(z=2)
+    with sph.share() as shared:
+        assert shared.handle.vertex_num == 66
+        assert shared.handle.face_num == 128
+        assert np.array_equal(
+                shared.vertices,
+                sph.description.get_transformed_vertex_array())
+        assert np.array_equal(shared.faces, sph.description.get_face_array())
+        with pytest.raises(ValueError):
+            shared.vertices[0, 0] = 1
+        attached = SharedMesh.attach(pickle.loads(pickle.dumps(
+                shared.handle)))
+        assert np.array_equal(attached.faces, shared.faces)
+        attached.close()
+    with pytest.raises(FileNotFoundError):
+        SharedMesh.attach(shared.handle)
+
+
+def test_shared_mesh_keeps_precision():
+    world = World(precision='single')
+    world.add_object(Sphere(radius=1, split_num=2))
+    with world.share() as shared:
+        assert shared.vertices.dtype == np.float32
+        assert shared.faces.dtype == np.int32
+
+
+@pytest.mark.parametrize("method", ["fork", "spawn"])
+def test_shared_mesh_in_worker_processes(method):
+    if method not in multiprocessing.get_all_start_methods():
+        pytest.skip(f"{method} is not available")
+    sph = Sphere(radius=2, split_num=3)
+    sph.move(x=1)
+    expected = sph.description.get_transformed_vertex_array().sum(axis=0)
+    context = multiprocessing.get_context(method)
+    with sph.share() as shared, \
+            ProcessPoolExecutor(2, mp_context=context) as pool:
+        results = list(pool.map(_vertex_sum, [shared.handle] * 4))
+        assert not pool.submit(_is_writeable, shared).result()
+    for vertex_sum, max_index in results:
+        assert np.allclose(vertex_sum, expected)
+        assert max_index == 65
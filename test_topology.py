@@ -0,0 +1,116 @@
+import numpy as np
+from object_collection import Plane, Circle, Box, Sphere, Cylinder, Tube
+from topology import MeshAdjacency, propagate_orientation
+
+
+def test_adjacency_of_plane():
+    adj = MeshAdjacency([[0, 1, 2], [0, 2, 3]])
+    assert adj.face_num == 2
+    assert adj.edge_num == 5
+    assert list(adj.edge_face_count()) == [1, 2, 1, 1, 1]
+    assert list(adj.face_neighbours(0)) == [1]
+    assert list(adj.vertex_faces(2)) == [0, 1]
+    assert list(adj.vertex_faces(1)) == [0]
+    assert list(adj.vertex_valence()) == [3, 2, 3, 2]
+    assert sorted(map(tuple, adj.boundary_edges())) == [(0, 1), (1, 2),
+                                                        (2, 3), (3, 0)]
+    assert adj.is_edge_manifold()
+    assert not adj.is_watertight()
+    assert adj.is_consistently_oriented()
+
+
+def test_adjacency_detects_inconsistent_orientation():
+    adj = MeshAdjacency([[0, 1, 2], [0, 3, 2]])
+    assert not adj.is_consistently_oriented()
+
+
+def test_adjacency_detects_non_manifold_edge():
+    adj = MeshAdjacency([[0, 1, 2], [1, 0, 3], [0, 1, 4]])
+    assert not adj.is_edge_manifold()
+    assert list(map(tuple, adj.non_manifold_edges())) == [(0, 1)]
+    assert sorted(adj.face_neighbours(0)) == [1, 2]
+
+
+def test_closed_primitives_are_watertight():
+    for obj in (Box(1, 2, 3), Sphere(1, 3), Cylinder(1, 2, 2, 2)):
+        adj = obj.description.get_adjacency()
+        assert adj.is_watertight()
+        assert adj.is_consistently_oriented()
+        assert len(adj.boundary_edges()) == 0
+
+
+def test_open_primitives_have_boundary():
+    circle = Circle(radius=3, layer_num=2).description.get_adjacency()
+    assert len(circle.boundary_edges()) == 12
+    assert circle.is_consistently_oriented()
+    tube = Tube(radius=1, height=2, r_layer_num=1,
+                h_layer_num=3).description.get_adjacency()
+    assert len(tube.boundary_edges()) == 12
+    assert np.all(tube.vertex_valence() >= 3)
+
+
+def test_adjacency_is_cached_until_faces_change():
+    pl = Plane(width=1, height=1)
+    adj = pl.description.get_adjacency()
+    assert pl.description.get_adjacency() is adj
+    pl.invert()
+    inverted = pl.description.get_adjacency()
+    assert inverted is not adj
+    assert inverted.face_num == 2
+    pl.description.add_face(*next(pl.description.faced_points())[::-1])
+    assert pl.description.get_adjacency().face_num == 3
+
+
+def _outward(obj, center=(0, 0, 0)):
+    vertices = obj.description.get_vertex_array()
+    tri = vertices[obj.description.get_face_array()]
+    normals = np.cross(tri[:, 1] - tri[:, 0], tri[:, 2] - tri[:, 0])
+    return np.all(np.einsum('ij,ij->i', normals, tri[:, 0] - center) > 0)
+
+
+def _scramble(obj, seed):
+    faces = obj.description.get_face_array()
+    flip = np.random.default_rng(seed).random(len(faces)) < 0.5
+    faces[flip] = faces[flip, ::-1]
+    obj.description.faces = map(tuple, faces.tolist())
+    return int(flip.sum())
+
+
+def test_propagate_orientation_components():
+    adj = MeshAdjacency([[0, 1, 2], [0, 3, 2], [4, 5, 6], [7, 8, 9]])
+    flips, labels = propagate_orientation(adj)
+    assert list(flips) == [False, True, False, False]
+    assert len(set(labels[:2])) == 1
+    assert len(set(labels)) == 3
+
+
+def test_repair_orientation_of_closed_objects():
+    objects = ((Box(1, 2, 3), 10), (Sphere(2, 3), 10),
+               (Cylinder(1, 2, 2, 2), 11))
+    for i, (obj, center) in enumerate(objects):
+        obj.move(z=10)
+        obj.accept_transformations()
+        flipped = _scramble(obj, i)
+        assert obj.repair_orientation() == flipped
+        assert _outward(obj, (0, 0, center))
+        assert obj.description.get_adjacency().is_consistently_oriented()
+
+
+def test_repair_orientation_of_inverted_closed_object():
+    sph = Sphere(1, 2)
+    sph.invert()
+    assert sph.repair_orientation() == 32
+    assert _outward(sph)
+
+
+def test_repair_orientation_of_open_object_keeps_majority():
+    circle = Circle(radius=2, layer_num=2)
+    faces = circle.description.get_face_array()
+    faces[:3] = faces[:3, ::-1]
+    circle.description.faces = map(tuple, faces.tolist())
+    assert circle.repair_orientation() == 3
+    z = np.array([0, 0, 1])
+    tri = circle.description.get_vertex_array()[
+            circle.description.get_face_array()]
+    normals = np.cross(tri[:, 1] - tri[:, 0], tri[:, 2] - tri[:, 0])
+    assert np.all(normals @ z > 0)
@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+from object_collection import Box, Sphere, Plane, World
+from bvh import BVH
+from primitives import Angle
+from voxelize import voxelize
+
+
+def _voxel_centers(grid):
+    cells = np.argwhere(np.ones_like(grid.occupancy))
+    centers = grid.origin + (cells + 0.5) * grid.voxel_size
+    return centers.reshape(grid.occupancy.shape + (3,))
+
+
+def test_voxelize_box_surface_and_fill():
+    box = Box(width=2, height=2, depth=2)
+    surface = box.voxelize(0.25)
+    assert surface.occupancy.shape == (10, 10, 10)
+    assert np.allclose(surface.origin, -1.25)
+    # faces lie on voxel borders and touch voxels on both sides
+    assert surface.occupancy.sum() == 10**3 - 6**3
+    assert not surface.occupancy[2:8, 2:8, 2:8].any()
+    solid = box.voxelize(0.25, fill='parity')
+    assert solid.occupancy.all()
+
+
+def test_voxelize_sphere_fill_matches_inside_test():
+    sph = Sphere(radius=1, split_num=5)
+    sph.move(x=3)
+    for fill in ('parity', 'winding'):
+        grid = voxelize(sph, 0.1, fill=fill, chunk_size=500)
+        surface = voxelize(sph.description, 0.1)
+        radius = np.linalg.norm(_voxel_centers(grid) - (3, 0, 0), axis=-1)
+        assert np.all(grid.occupancy[radius < 0.99])
+        assert not np.any(grid.occupancy & ~surface.occupancy &
+                          (radius > 1))
+    assert np.allclose(grid.centers().mean(axis=0), (3, 0, 0), atol=0.01)
+    assert np.all(grid.index_of(grid.centers()) ==
+                  np.argwhere(grid.occupancy))
+
+
+def test_voxelize_surface_voxels_touch_faces():
+    plane = Plane(width=1, height=1)
+    plane.rotate(x=Angle(np.pi/5))
+    grid = voxelize(plane, 0.1, padding=2)
+    centers = grid.centers()
+    normal = plane.description.get_transformed_vertex_array()
+    normal = np.cross(normal[1] - normal[0], normal[2] - normal[0])
+    normal /= np.linalg.norm(normal)
+    distance = np.abs(centers @ normal)
+    assert np.all(distance <= 0.1 * np.sqrt(3) / 2 + 1e-12)
+    assert len(centers) > 100
+
+
+def test_voxelize_winding_fills_overlaps():
+    world = World()
+    for x in (0, 1):
+        box = Box(width=2, height=2, depth=2)
+        box.move(x=x)
+        box.accept_transformations()
+        world.add_object(box)
+    parity = world.voxelize(0.25, fill='parity').occupancy
+    winding = world.voxelize(0.25, fill='winding').occupancy
+    assert winding[1:-1, 1:-1, 1:-1].all()
+    assert not parity[6, 5, 5]
+
+
+def test_voxelize_region_with_bvh():
+    sph = Sphere(radius=1, split_num=4)
+    full = voxelize(sph, 0.1, fill='parity')
+    lo = full.origin + (0, 0, 1.2)
+    region = voxelize(sph, 0.1, fill='parity', region=(lo, lo + 1.0),
+                      bvh=BVH.from_collection(sph.description))
+    assert region.occupancy.shape == (10, 10, 10)
+    assert np.array_equal(region.occupancy, full.occupancy[:10, :10, 12:22])
+
+
+def test_voxelize_rejects_bad_arguments():
+    box = Box(width=1, height=1, depth=1)
+    with pytest.raises(ValueError):
+        voxelize(box, 0)
+    with pytest.raises(ValueError):
+        voxelize(box, 0.1, fill='flood')
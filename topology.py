@@ -0,0 +1,199 @@
+import numpy as np
+
+
+def _csr(keys: np.ndarray, values: np.ndarray, size: int):
+    '''Groups values by integer keys in range(size). Returns offsets array
+    of length size+1 and values sorted by key, so that values of key k are
+    sorted_values[offsets[k]:offsets[k+1]]'''
+    order = np.argsort(keys, kind='stable')
+    offsets = np.zeros(size + 1, dtype=np.int64)
+    np.cumsum(np.bincount(keys, minlength=size), out=offsets[1:])
+    return offsets, values[order]
+
+
+class MeshAdjacency:
+    '''Adjacency tables of triangle mesh built from (F, 3) array of vertex
+    indices. Face f has half-edges 3*f, 3*f+1 and 3*f+2 going from
+    faces[f, i] to faces[f, (i+1) % 3]. Half-edges which connect the same
+    pair of vertices share one undirected edge. Edge to face and vertex to
+    face relations are stored in CSR form (offsets + flat ids)'''
+    def __init__(self, faces: np.ndarray, vertex_num: int = None) -> None:
+        self.faces = np.asarray(faces, dtype=np.int64).reshape(-1, 3)
+        if vertex_num is None:
+            vertex_num = int(self.faces.max()) + 1 if len(self.faces) else 0
+        self.vertex_num = vertex_num
+        self.half_edge_start = self.faces.reshape(-1)
+        self.half_edge_end = np.roll(self.faces, -1, axis=1).reshape(-1)
+        lo = np.minimum(self.half_edge_start, self.half_edge_end)
+        hi = np.maximum(self.half_edge_start, self.half_edge_end)
+        keys = lo * max(vertex_num, 1) + hi
+        order = np.argsort(keys, kind='stable')
+        is_first = np.ones(len(order), dtype=bool)
+        is_first[1:] = keys[order][1:] != keys[order][:-1]
+        self.half_edge_edge = np.empty(len(order), dtype=np.int64)
+        self.half_edge_edge[order] = np.cumsum(is_first) - 1
+        first = order[is_first]
+        self.edges = np.stack((lo[first], hi[first]), axis=1)
+        self.edge_offsets = np.zeros(len(first) + 1, dtype=np.int64)
+        self.edge_offsets[:-1] = np.flatnonzero(is_first)
+        self.edge_offsets[-1] = len(order)
+        self.edge_half_edges = order
+        self.vertex_offsets, self.vertex_faces_flat = _csr(
+                self.half_edge_start,
+                np.repeat(np.arange(len(self.faces)), 3), vertex_num)
+
+    @property
+    def face_num(self) -> int:
+        return len(self.faces)
+
+    @property
+    def edge_num(self) -> int:
+        return len(self.edges)
+
+    def edge_face_count(self) -> np.ndarray:
+        '''Number of faces adjacent to every edge'''
+        return np.diff(self.edge_offsets)
+
+    def edge_faces(self, edge: int) -> np.ndarray:
+        '''Faces which contain the edge'''
+        half_edges = self.edge_half_edges[self.edge_offsets[edge]:
+                                          self.edge_offsets[edge + 1]]
+        return half_edges // 3
+
+    def face_edges(self, face: int) -> np.ndarray:
+        '''Edges of the face in the order of its half-edges'''
+        return self.half_edge_edge[3*face:3*face + 3]
+
+    def face_neighbours(self, face: int) -> np.ndarray:
+        '''Faces which share an edge with the given face'''
+        neighbours = [self.edge_faces(e) for e in self.face_edges(face)]
+        neighbours = np.unique(np.concatenate(neighbours))
+        return neighbours[neighbours != face]
+
+    def face_pairs(self) -> np.ndarray:
+        '''Returns (K, 2) array of half-edge pairs which belong to the same
+        edge. Every edge with n adjacent faces produces n-1 pairs which
+        connect its first half-edge with the others'''
+        counts = self.edge_face_count()
+        starts = np.repeat(self.edge_offsets[:-1], counts)
+        position = np.arange(len(starts))
+        others = position != starts
+        return np.stack((self.edge_half_edges[starts[others]],
+                         self.edge_half_edges[position[others]]), axis=1)
+
+    def vertex_faces(self, vertex: int) -> np.ndarray:
+        '''Faces which contain the vertex'''
+        return self.vertex_faces_flat[self.vertex_offsets[vertex]:
+                                      self.vertex_offsets[vertex + 1]]
+
+    def vertex_valence(self) -> np.ndarray:
+        '''Number of edges incident to every vertex'''
+        return np.bincount(self.edges.reshape(-1), minlength=self.vertex_num)
+
+    def boundary_half_edges(self) -> np.ndarray:
+        '''Half-edges which do not have a neighbouring face'''
+        boundary = self.edge_face_count() == 1
+        return self.edge_half_edges[self.edge_offsets[:-1][boundary]]
+
+    def boundary_edges(self) -> np.ndarray:
+        '''Returns (B, 2) array of boundary edges as vertex pairs directed
+        according to the orientation of their faces'''
+        half_edges = self.boundary_half_edges()
+        return np.stack((self.half_edge_start[half_edges],
+                         self.half_edge_end[half_edges]), axis=1)
+
+    def non_manifold_edges(self) -> np.ndarray:
+        '''Returns (K, 2) array of edges shared by more than two faces'''
+        return self.edges[self.edge_face_count() > 2]
+
+    def is_edge_manifold(self) -> bool:
+        return bool(np.all(self.edge_face_count() <= 2))
+
+    def is_watertight(self) -> bool:
+        '''True if every edge is shared by exactly two faces'''
+        return bool(np.all(self.edge_face_count() == 2))
+
+    def is_consistently_oriented(self) -> bool:
+        '''True if every pair of faces sharing an edge traverses it in
+        opposite directions'''
+        pairs = self.face_pairs()
+        return bool(np.all(self.half_edge_start[pairs[:, 0]] ==
+                           self.half_edge_end[pairs[:, 1]]))
+
+
+def _face_graph(adjacency: MeshAdjacency):
+    '''Returns CSR face graph (offsets, neighbours, relation). Relation is
+    True if two faces traverse their common edge in the same direction, i.e.
+    one of them has to be flipped to make their orientation consistent'''
+    pairs = adjacency.face_pairs()
+    same = (adjacency.half_edge_start[pairs[:, 0]] ==
+            adjacency.half_edge_start[pairs[:, 1]])
+    src = np.concatenate((pairs[:, 0] // 3, pairs[:, 1] // 3))
+    dst = np.concatenate((pairs[:, 1] // 3, pairs[:, 0] // 3))
+    offsets, order = _csr(src, np.arange(len(src)), adjacency.face_num)
+    return offsets, dst[order], np.concatenate((same, same))[order]
+
+
+def propagate_orientation(adjacency: MeshAdjacency):
+    '''Breadth first traversal over faces connected by edges. Returns
+    (flips, labels): flips marks faces which have to be inverted to get the
+    same orientation as the first face of their component, labels contains
+    connected component number of every face. The whole frontier of the
+    traversal is processed at once, so total work is linear in the number
+    of faces'''
+    offsets, neighbours, relation = _face_graph(adjacency)
+    degree = np.diff(offsets)
+    flips = np.zeros(adjacency.face_num, dtype=bool)
+    labels = np.full(adjacency.face_num, -1, dtype=np.int64)
+    isolated = np.flatnonzero(degree == 0)
+    labels[isolated] = np.arange(len(isolated))
+    component = len(isolated)
+    for seed in np.flatnonzero(degree > 0):
+        if labels[seed] >= 0:
+            continue
+        labels[seed] = component
+        frontier = np.array([seed])
+        while len(frontier):
+            counts = degree[frontier]
+            shift = np.repeat(offsets[frontier] - np.cumsum(counts) + counts,
+                              counts)
+            idx = shift + np.arange(counts.sum())
+            parents = np.repeat(frontier, counts)
+            fresh = labels[neighbours[idx]] < 0
+            idx, parents = idx[fresh], parents[fresh]
+            frontier, first = np.unique(neighbours[idx], return_index=True)
+            flips[frontier] = flips[parents[first]] ^ relation[idx[first]]
+            labels[frontier] = component
+        component += 1
+    return flips, labels
+
+
+def signed_volumes(vertices: np.ndarray, faces: np.ndarray) -> np.ndarray:
+    '''Signed volume of tetrahedron formed by every face and the origin.
+    Sum over a closed surface is positive when its faces are oriented
+    outwards'''
+    tri = vertices[faces]
+    return np.einsum('ij,ij->i', tri[:, 0],
+                     np.cross(tri[:, 1], tri[:, 2])) / 6
+
+
+def consistent_orientation(adjacency: MeshAdjacency,
+                           vertices: np.ndarray) -> np.ndarray:
+    '''Returns mask of faces which have to be inverted to make orientation
+    consistent within each connected component. Closed components are
+    oriented outwards according to their signed volume, open components keep
+    orientation of the majority of their faces'''
+    flips, labels = propagate_orientation(adjacency)
+    if not len(labels):
+        return flips
+    count = labels.max() + 1
+    sign = np.where(flips, -1.0, 1.0)
+    volume = np.bincount(labels, minlength=count,
+                         weights=sign*signed_volumes(vertices,
+                                                     adjacency.faces))
+    is_open = np.bincount(labels[adjacency.boundary_half_edges() // 3],
+                          minlength=count) > 0
+    flipped = np.bincount(labels, weights=flips, minlength=count)
+    size = np.bincount(labels, minlength=count)
+    invert = np.where(is_open, flipped > size / 2, volume < 0)
+    return flips ^ invert[labels]
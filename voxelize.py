@@ -0,0 +1,238 @@
+from typing import NamedTuple, Optional, Sequence, Tuple
+import numpy as np
+
+from primitives import FaceCollection
+from bvh import BVH
+
+
+# Maximal number of (triangle, voxel) or (triangle, column) pairs tested at
+# once. Bounds memory independently of the mesh and grid size.
+DEFAULT_CHUNK_SIZE = 1 << 16
+
+_FILL_MODES = (None, 'parity', 'winding')
+
+
+class VoxelGrid(NamedTuple):
+    '''Occupancy grid. Voxel (i, j, k) is the cube with minimal corner
+    origin + voxel_size*(i, j, k)'''
+    occupancy: np.ndarray
+    origin: np.ndarray
+    voxel_size: float
+
+    def centers(self) -> np.ndarray:
+        '''Returns (N, 3) array of centers of occupied voxels'''
+        return self.origin + (np.argwhere(self.occupancy) + 0.5) * \
+            self.voxel_size
+
+    def index_of(self, points: np.ndarray) -> np.ndarray:
+        '''Returns (N, 3) integer indices of voxels containing points. Points
+        outside the grid get indices out of the grid range'''
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        return np.floor((points - self.origin) / self.voxel_size).astype(
+                np.int64)
+
+
+def _expand_ranges(lo: np.ndarray, hi: np.ndarray,
+                   ) -> Tuple[np.ndarray, np.ndarray]:
+    '''For every row of inclusive integer ranges lo..hi (one column per
+    dimension) enumerates all cells inside. Returns owner row of every cell
+    and (P, dim) array of cell indices'''
+    sizes = np.maximum(hi - lo + 1, 0)
+    counts = np.prod(sizes, axis=1)
+    owner = np.repeat(np.arange(len(lo)), counts)
+    local = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts,
+                                                counts)
+    cells = np.empty((len(owner), lo.shape[1]), dtype=np.int64)
+    for d in reversed(range(lo.shape[1])):
+        size = sizes[owner, d]
+        cells[:, d] = lo[owner, d] + local % size
+        local //= size
+    return owner, cells
+
+
+def _chunks_by_count(counts: np.ndarray, chunk_size: int):
+    '''Splits rows into consecutive slices with at most chunk_size cells,
+    a row with more cells forms a slice of its own'''
+    total = np.cumsum(counts)
+    start = 0
+    while start < len(counts):
+        done = total[start - 1] if start else 0
+        stop = int(np.searchsorted(total, done + chunk_size, side='right'))
+        stop = max(stop, start + 1)
+        yield slice(start, stop)
+        start = stop
+
+
+def _triangle_box_overlap(triangles: np.ndarray, centers: np.ndarray,
+                          half_size: float) -> np.ndarray:
+    '''Separating axis test of triangles (P, 3, 3) against axis aligned cubes
+    with given centers (P, 3). Overlap of bounding boxes is expected to be
+    checked already, remaining axes are the triangle normal and 9 cross
+    products of triangle edges with coordinate axes'''
+    v = triangles - centers[:, None, :]
+    edges = np.roll(v, -1, axis=1) - v
+    normals = np.cross(edges[:, 0], edges[:, 1])
+    radius = half_size * np.abs(normals).sum(axis=1)
+    overlap = np.abs(np.einsum('ij,ij->i', normals, v[:, 0])) <= radius
+    axes = np.cross(edges[:, :, None, :], np.eye(3)[None, None, :, :])
+    axes = axes.reshape(len(v), 9, 3)
+    projections = np.einsum('pak,pvk->pav', axes, v)
+    radius = half_size * np.abs(axes).sum(axis=2)
+    separated = ((projections.min(axis=2) > radius) |
+                 (projections.max(axis=2) < -radius))
+    return overlap & ~separated.any(axis=1)
+
+
+def _edge_functions(triangles: np.ndarray, points: np.ndarray) -> np.ndarray:
+    '''2D edge functions of points (P, 2) against edges of counterclockwise
+    triangles (P, 3, 2), edge i goes from vertex i to vertex i+1. Every edge
+    is evaluated from its lexicographically smaller end, so two triangles
+    sharing an edge get exactly opposite values'''
+    a, b = triangles, np.roll(triangles, -1, axis=1)
+    swap = (a[..., 0] > b[..., 0]) | ((a[..., 0] == b[..., 0]) &
+                                      (a[..., 1] > b[..., 1]))
+    u = np.where(swap[..., None], b, a)
+    w = np.where(swap[..., None], a, b)
+    p = points[:, None, :]
+    values = ((w[..., 0] - u[..., 0]) * (p[..., 1] - u[..., 1]) -
+              (w[..., 1] - u[..., 1]) * (p[..., 0] - u[..., 0]))
+    return np.where(swap, -values, values)
+
+
+def _covers(triangles: np.ndarray, points: np.ndarray
+            ) -> Tuple[np.ndarray, np.ndarray]:
+    '''Checks which points lie in the XY projections of triangles. Points
+    on shared edges and vertices are assigned to exactly one triangle by the
+    top-left rule. Returns the mask and barycentric weights'''
+    values = _edge_functions(triangles, points)
+    direction = np.roll(triangles, -1, axis=1) - triangles
+    top_left = (direction[..., 1] > 0) | ((direction[..., 1] == 0) &
+                                          (direction[..., 0] < 0))
+    inside = np.all((values > 0) | ((values == 0) & top_left), axis=1)
+    # edge i + 1 is opposite to vertex i, its value is the weight of vertex i
+    weights = np.roll(values, -1, axis=1)
+    return inside, weights / weights.sum(axis=1, keepdims=True)
+
+
+class _Voxelizer:
+    def __init__(self, vertices: np.ndarray, faces: np.ndarray,
+                 origin: np.ndarray, shape: Tuple[int, int, int],
+                 voxel_size: float, chunk_size: int) -> None:
+        self.triangles = vertices[faces]
+        self.origin = origin
+        self.shape = np.array(shape)
+        self.voxel_size = voxel_size
+        self.chunk_size = chunk_size
+
+    def _cell_range(self, lo: np.ndarray, hi: np.ndarray, dims: slice,
+                    centers: bool) -> Tuple[np.ndarray, np.ndarray]:
+        '''Inclusive range of cells touching [lo, hi] (or with centers
+        inside it) along the given dimensions, clipped to the grid'''
+        shift = 0.5 if centers else 0.0
+        scaled_lo = (lo - self.origin[dims]) / self.voxel_size - shift
+        scaled_hi = (hi - self.origin[dims]) / self.voxel_size - shift
+        first = np.ceil(scaled_lo).astype(np.int64)
+        if not centers:
+            first -= 1
+        last = np.floor(scaled_hi).astype(np.int64)
+        return (np.maximum(first, 0),
+                np.minimum(last, self.shape[dims] - 1))
+
+    def surface(self, occupancy: np.ndarray) -> None:
+        lo, hi = self._cell_range(self.triangles.min(axis=1),
+                                  self.triangles.max(axis=1),
+                                  slice(None), centers=False)
+        counts = np.prod(np.maximum(hi - lo + 1, 0), axis=1)
+        half = self.voxel_size / 2 * (1 + 1e-9)
+        for chunk in _chunks_by_count(counts, self.chunk_size):
+            owner, cells = _expand_ranges(lo[chunk], hi[chunk])
+            centers = self.origin + (cells + 0.5) * self.voxel_size
+            hit = _triangle_box_overlap(self.triangles[chunk][owner],
+                                        centers, half)
+            occupancy[tuple(cells[hit].T)] = True
+
+    def crossings(self, winding: bool) -> np.ndarray:
+        '''Counts crossings of every Z column through voxel centers with the
+        surface below every voxel center. With winding, crossings are
+        counted with the sign of the face orientation'''
+        nx, ny, nz = self.shape
+        tri = self.triangles
+        area = ((tri[:, 1, 0] - tri[:, 0, 0]) * (tri[:, 2, 1] - tri[:, 0, 1]) -
+                (tri[:, 1, 1] - tri[:, 0, 1]) * (tri[:, 2, 0] - tri[:, 0, 0]))
+        valid = area != 0
+        tri, sign = tri[valid], np.sign(area[valid])
+        # make XY projections counterclockwise
+        tri = np.where((sign < 0)[:, None, None], tri[:, ::-1], tri)
+        lo, hi = self._cell_range(tri.min(axis=1)[:, :2],
+                                  tri.max(axis=1)[:, :2], slice(0, 2),
+                                  centers=True)
+        counts = np.prod(np.maximum(hi - lo + 1, 0), axis=1)
+        below = np.zeros((nx * ny, nz + 1), dtype=np.int64)
+        for chunk in _chunks_by_count(counts, self.chunk_size):
+            owner, cells = _expand_ranges(lo[chunk], hi[chunk])
+            columns = self.origin[:2] + (cells + 0.5) * self.voxel_size
+            triangles = tri[chunk][owner]
+            inside, weights = _covers(triangles[:, :, :2], columns)
+            z = np.einsum('ij,ij->i', weights[inside], triangles[inside, :, 2])
+            # first voxel whose center lies above the crossing
+            first = np.ceil((z - self.origin[2]) / self.voxel_size - 0.5)
+            first = np.clip(first, 0, nz).astype(np.int64)
+            column = cells[inside, 0] * ny + cells[inside, 1]
+            step = -sign[chunk][owner][inside] if winding else 1
+            np.add.at(below, (column, first),
+                      np.broadcast_to(step, column.shape).astype(np.int64))
+        return np.cumsum(below, axis=1)[:, :nz].reshape(nx, ny, nz)
+
+
+def voxelize(scene, voxel_size: float, fill: Optional[str] = None,
+             padding: int = 1,
+             region: Optional[Tuple[Sequence[float], Sequence[float]]] = None,
+             bvh: Optional[BVH] = None,
+             chunk_size: int = DEFAULT_CHUNK_SIZE) -> VoxelGrid:
+    '''Rasterizes surface of the scene (Object or FaceCollection with
+    applied queued transformations) into a grid of cubic voxels. A voxel is
+    occupied when some face overlaps it (exact triangle/box test).
+    fill='parity' or 'winding' also marks voxels whose centers lie inside
+    the closed surface, according to the number of crossings of a vertical
+    ray or their orientation. The grid covers the scene bounds plus padding
+    voxels, or the given region (min corner, max corner) only.
+    When a BVH of the scene is given, its arrays are reused and only faces
+    overlapping the region are visited. Faces are processed in chunks of at
+    most chunk_size tested pairs'''
+    if voxel_size <= 0:
+        raise ValueError(f"voxel_size is {voxel_size}, "
+                         "but should be larger than 0.")
+    if fill not in _FILL_MODES:
+        raise ValueError(f"fill is {fill}, but should be one of "
+                         f"{list(_FILL_MODES)}.")
+    if bvh is None:
+        collection: FaceCollection = getattr(scene, 'description', scene)
+        vertices = collection.get_transformed_vertex_array().astype(
+                np.float64)
+        faces = collection.get_face_array()
+    else:
+        vertices, faces = bvh.vertices, bvh.faces
+    if region is None:
+        if not len(faces):
+            raise ValueError("Cannot voxelize empty scene without region.")
+        used = vertices[faces].reshape(-1, 3)
+        lo = used.min(axis=0) - padding * voxel_size
+        hi = used.max(axis=0) + padding * voxel_size
+    else:
+        lo, hi = (np.asarray(c, dtype=np.float64) for c in region)
+    shape = tuple(np.maximum(np.ceil((hi - lo) / voxel_size - 1e-9),
+                             1).astype(int))
+    if bvh is not None and region is not None:
+        # parity needs all crossings below the region
+        query_lo = lo if fill is None else np.append(lo[:2], -np.inf)
+        _, selected = bvh.overlapping_faces(query_lo, hi)
+        faces = faces[np.unique(selected)]
+    voxelizer = _Voxelizer(vertices, faces, lo, shape, voxel_size,
+                           chunk_size)
+    occupancy = np.zeros(shape, dtype=bool)
+    voxelizer.surface(occupancy)
+    if fill == 'parity':
+        occupancy |= voxelizer.crossings(winding=False) % 2 == 1
+    elif fill == 'winding':
+        occupancy |= voxelizer.crossings(winding=True) != 0
+    return VoxelGrid(occupancy, lo, voxel_size)